@@ -0,0 +1,83 @@
+# Benchmark of detect_network_devices on a fake sysfs tree
+#
+# Runs a full detection with each PCI metadata backend and reports
+# the number of lspci processes started and the time taken. Before the
+# batched scan, lspci was run once per PF, VF netdev and VF without
+# a netdev. Now the lspci backend runs it once, and the sysfs backend
+# never runs it.
+#
+# lspci itself is replaced with the output it would give for the fake
+# tree, so only the number of runs is measured, not their cost.
+#
+# Usage: python3 benchmarks/bench_detection.py [--pfs=N] [--vfs=N] [--rounds=N]
+
+import os
+import sys
+import time
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests"))
+
+import detection as detection
+import ip_link as ip_link
+import pci_ids as pci_ids
+
+from fake_sysfs import build_sysfs
+
+def _lspci_output(devices_dir: str) -> str:
+    """Returns the `lspci -vmmk -D` output of the devices of the fake tree"""
+    blocks = []
+    for pci_address in sorted(os.listdir(devices_dir)):
+        pci_data = detection.read_sysfs_pci_data(pci_address)
+        blocks.append("Slot:\t{}\n{}".format(pci_address, "".join(f"{key}:\t{value}\n" for key, value in pci_data.items())))
+    return "\n".join(blocks)
+
+def main():
+    num_pfs = 4
+    num_vfs = 64
+    rounds = 5
+    for arg in sys.argv[1:]:
+        if arg.startswith("--pfs="):
+            num_pfs = int(arg[len("--pfs="):])
+        elif arg.startswith("--vfs="):
+            num_vfs = int(arg[len("--vfs="):])
+        elif arg.startswith("--rounds="):
+            rounds = int(arg[len("--rounds="):])
+
+    with tempfile.TemporaryDirectory() as root:
+        sysfs = build_sysfs(os.path.join(root, "sys"), num_pfs, num_vfs)
+        detection.NIC_DIR = sysfs['net_dir']
+        detection.PCI_DEVICES_DIR = sysfs['devices_dir']
+        detection.USE_DAEMON = False
+        detection.USE_CACHE = False
+        detection._get_mac_address = lambda device: open(os.path.join(sysfs['net_dir'], device, "address")).read().strip()
+        ip_link.get_ip_links = lambda names, stats=False: {name: sysfs['links'][name] for name in names if name in sysfs['links']}
+        pci_ids.PCI_IDS_PATHS = [sysfs['pci_ids']]
+
+        lspci_output = _lspci_output(sysfs['devices_dir'])
+        lspci_runs = []
+        def run(command, *args, **kwargs):
+            lspci_runs.append(command)
+            return subprocess.CompletedProcess(command, 0, lspci_output, "")
+        subprocess.run = run
+
+        num_devices = num_pfs * (num_vfs + 1)
+        print(f"Detecting {num_pfs} PFs with {num_vfs} VFs each ({rounds} rounds)")
+        print("  {:<22}{:>8} lspci runs".format("per device (before)", num_devices))
+        for backend in ["lspci", "sysfs"]:
+            detection.PCI_BACKEND = backend
+            del lspci_runs[:]
+            started = time.perf_counter()
+            for _ in range(rounds):
+                detection.detect_network_devices(use_cache=False)
+            elapsed = (time.perf_counter() - started) / rounds
+            print("  {:<22}{:>8} lspci runs{:>10.1f}ms per detection".format(backend, len(lspci_runs) // rounds, elapsed * 1000))
+
+        current = detection.get_inventory()
+        if len(current.pfs) != num_pfs or len(current.vfs) != num_pfs * num_vfs:
+            raise Exception("Detection did not find every device of the fake tree")
+
+if __name__ == "__main__":
+    main()
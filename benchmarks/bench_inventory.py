@@ -0,0 +1,91 @@
+# Benchmark of the lookups of the detection inventory
+#
+# Builds an inventory of PFs with 1k+ VFs in total and compares its
+# indexes with the linear scans (and deep copies) detection used before:
+# looking up VFs by PCI address, interface name, MAC address and VF
+# number, and matching the VFs of each PF to their `ip link` vfinfo.
+#
+# Usage: python3 benchmarks/bench_inventory.py [--pfs=N] [--vfs=N]
+
+import os
+import sys
+import copy
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import inventory as inventory
+
+def _build(num_pfs: int, num_vfs: int):
+    """Returns the inventory and the vfinfo list of each PF keyed by PCI address"""
+    current = inventory.Inventory()
+    vfinfo_lists = {}
+    for p in range(num_pfs):
+        pf_pci_address = f"0000:{1 + p:02x}:00.0"
+        current.add_pf(inventory.PhysicalNIC(pci_address=pf_pci_address, interface=f"enp{1 + p}s0", sriov_capable=True,
+                                             sriov_numvfs=num_vfs, sriov_totalvfs=num_vfs))
+        vfinfo_lists[pf_pci_address] = []
+        for v in range(num_vfs):
+            mac_address = f"02:00:00:{p:02x}:{v >> 8:02x}:{v & 0xff:02x}"
+            vfinfo_lists[pf_pci_address].append({'vf': v, 'address': mac_address})
+            current.add_vf(inventory.VFNIC(pci_address=f"0000:{0x40 + p:02x}:{v // 8:02x}.{v % 8}", interface=f"enp{1 + p}s0v{v}",
+                                           parent_pci_address=pf_pci_address, mac_address=mac_address, vf_num=v))
+    current.freeze()
+    return current, vfinfo_lists
+
+def _timed(function) -> float:
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started
+
+def _report(name: str, scan: float, index: float) -> None:
+    print("  {:<24}{:>10.2f}ms{:>10.2f}ms{:>9.0f}x".format(name, scan * 1000, index * 1000, scan / index if index else 0))
+
+def main():
+    num_pfs = 4
+    num_vfs = 256
+    for arg in sys.argv[1:]:
+        if arg.startswith("--pfs="):
+            num_pfs = int(arg[len("--pfs="):])
+        elif arg.startswith("--vfs="):
+            num_vfs = int(arg[len("--vfs="):])
+
+    started = time.perf_counter()
+    current, vfinfo_lists = _build(num_pfs, num_vfs)
+    print(f"Built an inventory of {len(current.pfs)} PFs and {len(current.vfs)} VFs in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    # the records as detection used to hold them: dicts, deep copied on every lookup
+    vf_dicts = {pci_address: vf.to_dict() for pci_address, vf in current.vfs.items()}
+    vfs = list(current.vfs.values())
+    # every 16th VF, so the scans cover the whole inventory
+    samples = vfs[::16]
+
+    print("  {:<24}{:>12}{:>12}{:>10}".format("lookup of {} VFs".format(len(samples)), "scan", "index", "speedup"))
+    _report("by PCI address",
+            _timed(lambda: [copy.deepcopy(next(vf for vf in vf_dicts.values() if vf['pci_address'] == sample.pci_address)) for sample in samples]),
+            _timed(lambda: [current.get_vf(sample.pci_address) for sample in samples]))
+    _report("by interface",
+            _timed(lambda: [copy.deepcopy(next(vf for vf in vf_dicts.values() if vf['interface'] == sample.interface)) for sample in samples]),
+            _timed(lambda: [current.get_vf(sample.interface) for sample in samples]))
+    _report("by MAC address",
+            _timed(lambda: [next(vf for vf in vf_dicts.values() if vf['mac_address'] == sample.mac_address) for sample in samples]),
+            _timed(lambda: [current.get_vf_by_mac(sample.mac_address) for sample in samples]))
+    _report("by VF number",
+            _timed(lambda: [next(vf for vf in vf_dicts.values() if vf['parent_pci_address'] == sample.parent_pci_address and vf['vf_num'] == sample.vf_num) for sample in samples]),
+            _timed(lambda: [current.get_vf_by_num(sample.parent_pci_address, sample.vf_num) for sample in samples]))
+
+    def match_nested():
+        for pf_pci_address, vfinfo_list in vfinfo_lists.items():
+            for vf in current.get_vfs_of_pf(pf_pci_address):
+                next(vfinfo for vfinfo in vfinfo_list if vfinfo['vf'] == vf.vf_num)
+
+    def match_indexed():
+        for pf_pci_address, vfinfo_list in vfinfo_lists.items():
+            vfinfo_by_num = {vfinfo['vf']: vfinfo for vfinfo in vfinfo_list}
+            for vf in current.get_vfs_of_pf(pf_pci_address):
+                vfinfo_by_num[vf.vf_num]
+
+    _report("match all to vfinfo", _timed(match_nested), _timed(match_indexed))
+
+if __name__ == "__main__":
+    main()
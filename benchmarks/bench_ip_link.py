@@ -0,0 +1,62 @@
+# Benchmark of the rtnetlink decoder against the `ip -j link show` path
+#
+# Dumps the links of this host over rtnetlink and with the ip command,
+# started as a subprocess with its JSON output parsed, as ip_link did
+# before the decoder and still does when netlink is not available.
+# The recorded PF reply of the tests (tests/fixtures/rtm_newlink_pf.bin)
+# is then decoded on its own, next to parsing the same link as JSON,
+# to separate the cost of the decoder from the cost of starting ip.
+# json.loads is implemented in C and beats the decoder on its own; the
+# gain of rtnetlink comes from not starting a process per query.
+#
+# Usage: python3 benchmarks/bench_ip_link.py [--rounds=N] [--stats]
+
+import os
+import sys
+import json
+import time
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import rtnetlink as rtnetlink
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests", "fixtures", "rtm_newlink_pf.bin")
+
+def _timed(function, rounds: int) -> float:
+    """Returns the average time of a call in seconds"""
+    started = time.perf_counter()
+    for _ in range(rounds):
+        function()
+    return (time.perf_counter() - started) / rounds
+
+def _ip_json(stats: bool) -> list:
+    command = ["ip", "-j", "-s", "link", "show"] if stats else ["ip", "-j", "link", "show"]
+    return json.loads(subprocess.run(command, capture_output=True, text=True, check=True).stdout)
+
+def _report(name: str, subprocess_time: float, netlink_time: float) -> None:
+    print("  {:<28}{:>10.3f}ms{:>10.3f}ms{:>9.1f}x".format(name, subprocess_time * 1000, netlink_time * 1000,
+                                                       subprocess_time / netlink_time if netlink_time else 0))
+
+def main():
+    rounds = 100
+    stats = False
+    for arg in sys.argv[1:]:
+        if arg.startswith("--rounds="):
+            rounds = int(arg[len("--rounds="):])
+        elif arg == "--stats":
+            stats = True
+
+    links = rtnetlink.get_links(stats=stats)
+    print(f"Dumping {len(links)} links, {sum(len(link.get('vfinfo_list', [])) for link in links)} VFs ({rounds} rounds)")
+    print("  {:<28}{:>12}{:>12}{:>10}".format("", "ip -j", "rtnetlink", "speedup"))
+    _report("dump all links", _timed(lambda: _ip_json(stats), rounds), _timed(lambda: rtnetlink.get_links(stats=stats), rounds))
+
+    with open(FIXTURE, "rb") as f:
+        reply = f.read()
+    link_json = json.dumps(rtnetlink.decode_link_messages(reply)[0])
+    _report("decode PF with 2 VFs", _timed(lambda: json.loads(link_json), rounds * 100),
+            _timed(lambda: rtnetlink.decode_link_messages(reply), rounds * 100))
+
+if __name__ == "__main__":
+    main()
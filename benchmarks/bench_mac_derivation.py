@@ -0,0 +1,76 @@
+# Benchmark of the MAC address derivation of set_vfs
+#
+# Derives the MAC addresses of the VFs of a PF with each registered
+# scheme (or only the one given), one after the other
+# (mac_generator.generate_mac) and in a process pool
+# (mac_generator.generate_macs), checks that both give the same
+# addresses and reports the total and per-VF time of each.
+#
+# The hmac-sha256 scheme is keyed with a temporary secret, so the
+# benchmark neither needs nor touches /etc/vfnet/mac.secret.
+#
+# Usage: python3 benchmarks/bench_mac_derivation.py [--vfs=N] [--workers=N] [--scheme=NAME]
+
+import os
+import sys
+import time
+import tempfile
+import importlib.util
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import install_vfnet as install_vfnet
+import mac_generator as mac_generator
+
+PF_MAC_ADDRESS = "d0:23:23:23:45:a0"
+PF_DEVICE_NAME = "Ethernet Controller 10G X550T"
+
+def _report(name: str, elapsed: float, count: int) -> None:
+    print("  {:<10}{:>8.2f}s total{:>10.3f}ms per VF".format(name, elapsed, elapsed / count * 1000))
+
+def _bench_scheme(scheme: str, num_vfs: int, workers) -> None:
+    missing = [module for module in mac_generator.get_scheme_modules(scheme) if importlib.util.find_spec(module) is None]
+    if missing:
+        print(f"Skipping the {scheme} scheme, missing python modules: {', '.join(missing)}")
+        return
+
+    vf_indexes = list(range(num_vfs))
+    print(f"Deriving {num_vfs} MAC addresses with the {scheme} scheme ({workers or os.cpu_count()} workers)")
+
+    started = time.perf_counter()
+    serial = {vf_index: mac_generator.generate_mac(PF_MAC_ADDRESS, vf_index, PF_DEVICE_NAME, scheme) for vf_index in vf_indexes}
+    _report("serial", time.perf_counter() - started, num_vfs)
+
+    started = time.perf_counter()
+    parallel = mac_generator.generate_macs(PF_MAC_ADDRESS, vf_indexes, PF_DEVICE_NAME, workers=workers, scheme=scheme)
+    _report("parallel", time.perf_counter() - started, num_vfs)
+
+    if parallel != serial:
+        raise Exception(f"The parallel derivation returned different MAC addresses with the {scheme} scheme")
+
+def main():
+    num_vfs = 16
+    workers = None
+    schemes = list(mac_generator.SCHEMES)
+    for arg in sys.argv[1:]:
+        if arg.startswith("--vfs="):
+            num_vfs = int(arg[len("--vfs="):])
+        elif arg.startswith("--workers="):
+            workers = int(arg[len("--workers="):])
+        elif arg.startswith("--scheme="):
+            schemes = [arg[len("--scheme="):]]
+
+    for scheme in schemes:
+        if scheme not in mac_generator.SCHEMES:
+            raise ValueError(f"Unknown MAC scheme '{scheme}'. Available: {', '.join(mac_generator.SCHEMES)}")
+
+    with tempfile.TemporaryDirectory() as secret_dir:
+        # created by the hmac-sha256 scheme on first use; the scheme is
+        # not slow, so it is never derived in the worker processes
+        install_vfnet._VFNET_MAC_SECRET_FILE_PATH = os.path.join(secret_dir, "mac.secret")
+        mac_generator._secret = None
+        for scheme in schemes:
+            _bench_scheme(scheme, num_vfs, workers)
+
+if __name__ == "__main__":
+    main()
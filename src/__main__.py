@@ -35,12 +35,21 @@
 import install_vfnet 
 import set_vfs
 import persist_vfs
+import up_vfs
+import reconcile
+import daemon
+import daemon_client
+import metrics
+import top
 import list_vfs
+import detection
+import mac_generator
 import text_help
 import sys
 import importlib
+import multiprocessing
 
-MODULE_DEPS = ['bcrypt']
+MODULE_DEPS = []
 
 version_number = "0.1.5-develop"
 
@@ -53,7 +62,11 @@ def print_help():
     print("\nOptions:")
     option_help = [
         ['-h, --help', 'Print help information'],
-        ['-v, --version', 'Print version information']
+        ['-v, --version', 'Print version information'],
+        ['--no-cache', 'Ignore the cached detection results and rescan all network devices'],
+        ['--jobs=N', 'Number of network devices to probe concurrently during detection (default: 1)'],
+        ['--json', 'List the network devices as JSON, versioned by its "schema" field'],
+        ['--ndjson', 'List the network devices as one JSON object per line, streamed as they are detected']
     ]
     for option in option_help:
         option_name = option[0]
@@ -68,7 +81,12 @@ def print_help():
         ['create', 'Create virtual functions for a network device. Alias for "set". Will throw errors if VFs already exist.'],
         ['set', 'Modifies the number of virtual functions for a network device'],
         ['persist', 'Persists the number of virtual functions for a network device across reboots'],
-        ['list', 'List detected network devices']
+        ['up', 'Creates the virtual functions persisted in the vfnet config file. Run on boot by the vfnet service'],
+        ['apply', 'Changes the virtual functions to match the vfnet config file, including the settings of single VFs. Use --plan for a dry run'],
+        ['list', 'List detected network devices'],
+        ['daemon', 'Keeps the network devices in memory and serves them over a Unix socket. Used automatically by the other commands when running'],
+        ['metrics', 'Serves the network devices and the counters of the VFs as OpenMetrics over HTTP'],
+        ['top', 'Shows the throughput and drop rates of the VFs, refreshed at an interval']
     ]
     for command in command_help:
         command_name = command[0]
@@ -83,7 +101,8 @@ def print_version():
 
 def check_module_dependencies():
     missing_modules = []
-    for module_name in MODULE_DEPS:
+    # the modules of the MAC derivation scheme are only needed if it is used
+    for module_name in MODULE_DEPS + mac_generator.get_scheme_modules():
         try:
             importlib.import_module(module_name)
         except ModuleNotFoundError:
@@ -110,7 +129,17 @@ def main():
         # If persist command is passed, defer to the persist command help
         if command == "persist":
             persist_vfs.print_help()
-        if command == "set" or command == "create":
+        elif command == "up":
+            up_vfs.print_help()
+        elif command == "apply":
+            reconcile.print_help()
+        elif command == "daemon":
+            daemon.print_help()
+        elif command == "metrics":
+            metrics.print_help()
+        elif command == "top":
+            top.print_help()
+        elif command == "set" or command == "create":
             set_vfs.print_help()
         else:
             print_help()
@@ -123,11 +152,28 @@ def main():
 
 
 
+    # Check if --no-cache is passed, force a full rescan of the network devices
+    if "--no-cache" in sys.argv:
+        detection.USE_CACHE = False
+
+    # Check if --jobs=N is passed, set the number of detection workers
+    for arg in sys.argv[1:]:
+        if arg.startswith("--jobs="):
+            try:
+                detection.DETECTION_WORKERS = max(1, int(arg[len("--jobs="):]))
+            except ValueError:
+                print("Error: --jobs must be a number.")
+                sys.exit(1)
+
     # If no arguments are passed or -l or --list is passed, detect network devices
-    if len(sys.argv) == 1 or command == "list":
+    if command is None or command == "list":
         check_module_dependencies()
-        # Run the 'install' function from the `install_vfnet` module
-        list_vfs.list_network_devices()
+        output_format = 'table'
+        if "--json" in sys.argv:
+            output_format = 'json'
+        elif "--ndjson" in sys.argv:
+            output_format = 'ndjson'
+        list_vfs.list_network_devices(output_format)
         sys.exit()
 
     if command == "install":
@@ -138,17 +184,43 @@ def main():
 
     elif command == "create" or command == "set":
         check_module_dependencies()
-        set_vfs.set_command(sys.argv[2:])
+        try:
+            set_vfs.set_command(sys.argv[2:])
+        finally:
+            # keep the inventory of the daemon current, even after a partial change
+            daemon_client.notify_changed()
 
     elif command == "persist":
         check_module_dependencies()
         persist_vfs.persist_command(sys.argv[2:])
 
+    elif command == "up":
+        check_module_dependencies()
+        up_vfs.up_command(sys.argv[2:])
+
+    elif command == "apply":
+        check_module_dependencies()
+        reconcile.apply_command(sys.argv[2:])
+
+    elif command == "daemon":
+        check_module_dependencies()
+        daemon.daemon_command(sys.argv[2:])
+
+    elif command == "metrics":
+        check_module_dependencies()
+        metrics.metrics_command(sys.argv[2:])
+
+    elif command == "top":
+        check_module_dependencies()
+        top.top_command(sys.argv[2:])
+
     else:
         print("Error: Invalid command. Use '-h' or '--help' to see the available commands.")
 
     sys.exit()
 
 if __name__ == '__main__':
+  # Required for the MAC generation process pool in the PyInstaller binary
+  multiprocessing.freeze_support()
   main()
   
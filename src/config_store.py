@@ -0,0 +1,335 @@
+# Transactional store for the vfnet config file (/etc/vfnet/vf.config)
+#
+# The file is parsed once into an index of its lines. Updates are
+# batched in memory and committed in a single write: a temporary file
+# is written and fsynced, then renamed over the config file, so a crash
+# never leaves a truncated config behind. Writers hold an exclusive lock
+# on a lock file next to the config (the config itself is replaced on
+# every commit, so it cannot carry the lock).
+#
+# Lines that are not understood (comments, blank and invalid lines) are
+# kept as they are.
+
+import os
+import re
+import fcntl
+import contextlib
+import install_vfnet as install_vfnet
+
+from typing import Dict, Iterator, List, Tuple, Union, Any
+
+# Settings of a single VF, in the same syntax as `ip link set <pf> vf <index> ...`
+# e.g. eth1 vf 0 mac 02:00:00:00:00:01 vlan 100 qos 0 spoofchk on trust off state auto
+_VF_LINK_STATES = ['auto', 'enable', 'disable']
+_MAC_ADDRESS = re.compile(r'^[0-9a-f]{2}(:[0-9a-f]{2}){5}$')
+
+def is_vf_settings_line(line: str) -> bool:
+    """
+    Checks if a line of the vfnet config file holds the settings of a single VF
+    (as opposed to the number of VFs of a PF).
+    """
+    fields = line.split()
+    return len(fields) >= 3 and fields[1] == "vf"
+
+def _parse_on_off(value: str) -> bool:
+    if value not in ("on", "off"):
+        raise ValueError(f"expected on or off, got '{value}'")
+    return value == "on"
+
+def parse_vf_settings_line(line: str) -> Tuple[str, int, Dict[str, Any]]:
+    """
+    Parses the settings of a single VF from a line of the vfnet config file.
+
+    Args:
+        line (str): The line (e.g. "eth1 vf 0 mac 02:00:00:00:00:01 vlan 100 trust on").
+
+    Returns:
+        tuple: The PF interface, the VF index and the settings of the VF
+               ('mac', 'vlan', 'qos', 'spoofchk', 'trust', 'link_state').
+
+    Raises:
+        ValueError: If the line is not valid.
+    """
+    fields = line.split()
+    if len(fields) < 3 or fields[1] != "vf" or not fields[2].isdigit():
+        raise ValueError(f"Invalid VF settings line: {line}")
+    if len(fields) % 2 == 0:
+        raise ValueError(f"Invalid VF settings line, missing value: {line}")
+
+    vf_settings: Dict[str, Any] = {}
+    try:
+        for name, value in zip(fields[3::2], fields[4::2]):
+            if name == "mac":
+                if not _MAC_ADDRESS.match(value.lower()):
+                    raise ValueError(f"invalid MAC address '{value}'")
+                vf_settings['mac'] = value.lower()
+            elif name == "vlan":
+                vf_settings['vlan'] = int(value)
+                if not 0 <= vf_settings['vlan'] <= 4095:
+                    raise ValueError(f"VLAN {value} is not between 0 and 4095")
+            elif name == "qos":
+                vf_settings['qos'] = int(value)
+                if not 0 <= vf_settings['qos'] <= 7:
+                    raise ValueError(f"QoS {value} is not between 0 and 7")
+            elif name == "spoofchk":
+                vf_settings['spoofchk'] = _parse_on_off(value)
+            elif name == "trust":
+                vf_settings['trust'] = _parse_on_off(value)
+            elif name == "state":
+                if value not in _VF_LINK_STATES:
+                    raise ValueError(f"state must be one of {', '.join(_VF_LINK_STATES)}")
+                vf_settings['link_state'] = value
+            else:
+                raise ValueError(f"unknown setting '{name}'")
+    except ValueError as e:
+        raise ValueError(f"Invalid VF settings line ({e}): {line}")
+    if 'qos' in vf_settings and 'vlan' not in vf_settings:
+        raise ValueError(f"Invalid VF settings line (qos requires vlan): {line}")
+
+    return fields[0], int(fields[2]), vf_settings
+
+def format_vf_settings_line(pf_interface: str, vf_index: int, vf_settings: Dict[str, Any]) -> str:
+    """
+    Formats the settings of a single VF as a line of the vfnet config file.
+    The reverse of parse_vf_settings_line.
+    """
+    fields = [pf_interface, "vf", str(vf_index)]
+    if 'mac' in vf_settings:
+        fields += ["mac", vf_settings['mac']]
+    if 'vlan' in vf_settings:
+        fields += ["vlan", str(vf_settings['vlan'])]
+    if 'qos' in vf_settings:
+        fields += ["qos", str(vf_settings['qos'])]
+    if 'spoofchk' in vf_settings:
+        fields += ["spoofchk", "on" if vf_settings['spoofchk'] else "off"]
+    if 'trust' in vf_settings:
+        fields += ["trust", "on" if vf_settings['trust'] else "off"]
+    if 'link_state' in vf_settings:
+        fields += ["state", vf_settings['link_state']]
+    return " ".join(fields)
+
+class ConfigStore:
+    """
+    The parsed lines of the vfnet config file, indexed by PF interface
+    (interface:number lines) and by PF interface and VF index (VF settings lines).
+
+    Get a store with read_config (read only) or open_config (to update it).
+    """
+
+    def __init__(self, path: str, text: str):
+        self.path = path
+        self.changed = False
+        # removed lines are set to None, so the other line numbers stay valid
+        self._lines: List[Union[str, None]] = list(text.splitlines())
+        self._pf_index: Dict[str, List[int]] = {}
+        self._vf_index: Dict[Tuple[str, int], List[int]] = {}
+        self._vf_settings: Dict[int, Tuple[str, int, Dict[str, Any]]] = {}
+        # error message and whether it is a VF settings line, keyed by line number
+        self._invalid: Dict[int, Tuple[str, bool]] = {}
+        for line_number, line in enumerate(self._lines):
+            self._index_line(line_number, line)
+
+    def _index_line(self, line_number: int, line: str) -> None:
+        line = line.strip()
+        if line == "" or line.startswith("#"):
+            return
+        if is_vf_settings_line(line):
+            try:
+                pf_interface, vf_index, vf_settings = parse_vf_settings_line(line)
+            except ValueError as e:
+                self._invalid[line_number] = (str(e), True)
+                return
+            self._vf_settings[line_number] = (pf_interface, vf_index, vf_settings)
+            self._vf_index.setdefault((pf_interface, vf_index), []).append(line_number)
+        elif ":" in line:
+            self._pf_index.setdefault(line.split(":", 1)[0].strip(), []).append(line_number)
+        else:
+            self._invalid[line_number] = (f"Invalid line in settings file: {line}", False)
+
+    def pf_entries(self) -> List[Tuple[str, str]]:
+        """
+        Get the interface:number lines in file order, with the number
+        as written (it may not be a valid number).
+
+        Returns:
+            list: The (interface, number of VFs) of each line.
+        """
+        entries = []
+        for line_number in sorted(n for numbers in self._pf_index.values() for n in numbers):
+            interface, _, num_vfs = self._lines[line_number].strip().partition(":")
+            entries.append((interface.strip(), num_vfs.split(":")[0].strip()))
+        return entries
+
+    def invalid_lines(self, vf_settings: bool = False) -> List[str]:
+        """
+        Get the error message of each line that could not be parsed, in file order.
+
+        Args:
+            vf_settings (bool): Get the invalid VF settings lines instead
+                                of the invalid interface:number lines.
+        """
+        return [message for _, (message, is_vf_line) in sorted(self._invalid.items()) if is_vf_line == vf_settings]
+
+    def get_num_vfs(self) -> Dict[str, int]:
+        """
+        Get the number of VFs of each PF interface. If an interface is
+        given more than once, the last line is used.
+
+        Raises:
+            ValueError: If a number of VFs is not a number.
+        """
+        return {interface: int(num_vfs) for interface, num_vfs in self.pf_entries()}
+
+    def get_vf_settings(self) -> Dict[str, Dict[int, Dict[str, Any]]]:
+        """
+        Get the settings of the single VFs. The settings of a VF
+        given on several lines are merged.
+
+        Returns:
+            dict: The settings of each VF keyed by PF interface, then VF index.
+        """
+        vf_settings: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        for line_number in sorted(self._vf_settings):
+            pf_interface, vf_index, settings = self._vf_settings[line_number]
+            vf_settings.setdefault(pf_interface, {}).setdefault(vf_index, {}).update(settings)
+        return vf_settings
+
+    def set_num_vfs(self, pf_interface: str, num_vfs: int) -> None:
+        """
+        Sets the number of VFs of a PF interface. Updates every line
+        of the interface, or appends one if there is none.
+        """
+        line = f"{pf_interface}:{num_vfs}"
+        line_numbers = self._pf_index.get(pf_interface)
+        if not line_numbers:
+            self._pf_index[pf_interface] = [len(self._lines)]
+            self._lines.append(line)
+            self.changed = True
+            return
+        for line_number in line_numbers:
+            if self._lines[line_number] != line:
+                self._lines[line_number] = line
+                self.changed = True
+
+    def set_vf_settings(self, pf_interface: str, vf_index: int, vf_settings: Dict[str, Any]) -> None:
+        """
+        Replaces the settings of a single VF. The first line of the VF is
+        replaced (others are removed), or a line is appended if there is none.
+        """
+        line = format_vf_settings_line(pf_interface, vf_index, vf_settings)
+        line_numbers = self._vf_index.get((pf_interface, vf_index))
+        if not line_numbers:
+            line_numbers = [len(self._lines)]
+            self._lines.append("")
+            self._vf_index[(pf_interface, vf_index)] = line_numbers
+        # remove the extra lines
+        for line_number in line_numbers[1:]:
+            self._lines[line_number] = None
+            del self._vf_settings[line_number]
+        del line_numbers[1:]
+        if self._lines[line_numbers[0]] != line:
+            self._lines[line_numbers[0]] = line
+            self._vf_settings[line_numbers[0]] = (pf_interface, vf_index, dict(vf_settings))
+            self.changed = True
+
+    def text(self) -> str:
+        """Get the contents of the config file with the updates applied"""
+        return "".join(line + "\n" for line in self._lines if line is not None)
+
+    def commit(self) -> None:
+        """
+        Writes the updates to the config file atomically.
+        The caller must hold the lock (see open_config).
+        """
+        if not self.changed:
+            return
+        temp_file = "{}.{}.tmp".format(self.path, os.getpid())
+        try:
+            with open(temp_file, 'w') as file:
+                file.write(self.text())
+                file.flush()
+                os.fsync(file.fileno())
+            # keep the permissions of the existing file
+            if os.path.exists(self.path):
+                os.chmod(temp_file, os.stat(self.path).st_mode & 0o7777)
+            os.replace(temp_file, self.path)
+        finally:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+        # make the rename itself durable
+        dir_fd = os.open(os.path.dirname(self.path) or ".", os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        self.changed = False
+
+# The config file is parsed once per change of the file
+# Do not use directly except from within this file
+_cached_store: Union[ConfigStore, None] = None
+_cached_stat: Union[Tuple[int, int, int], None] = None
+
+def _get_config_path() -> str:
+    config_file = install_vfnet.get_config_file_location()
+    if(not config_file):
+        raise Exception("vfnet is not installed. Please install vfnet first.")
+    return config_file
+
+@contextlib.contextmanager
+def _locked(path: str, lock_type: int) -> Iterator[None]:
+    """
+    Holds a lock on the lock file of the config file.
+    Readers that cannot open the lock file (e.g. not root or a read-only
+    file system) read without it.
+    """
+    try:
+        lock_file = open(path + ".lock", 'a')
+    except OSError:
+        if lock_type == fcntl.LOCK_SH:
+            yield
+            return
+        raise
+    with lock_file:
+        fcntl.flock(lock_file.fileno(), lock_type)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+def read_config() -> ConfigStore:
+    """
+    Get the parsed vfnet config file for reading. The file is only parsed
+    again if it changed since the last call. Do not update the returned store,
+    use open_config.
+    """
+    global _cached_store, _cached_stat
+    path = _get_config_path()
+    stat = os.stat(path)
+    key = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    if _cached_store is None or _cached_stat != key or _cached_store.path != path:
+        with _locked(path, fcntl.LOCK_SH):
+            with open(path, 'r') as file:
+                _cached_store = ConfigStore(path, file.read())
+        _cached_stat = key
+    return _cached_store
+
+@contextlib.contextmanager
+def open_config() -> Iterator[ConfigStore]:
+    """
+    Opens the vfnet config file for updates. Holds an exclusive lock
+    until the block exits, then commits the updates in a single atomic write.
+    Nothing is written if the block raises.
+
+    Usage:
+        with config_store.open_config() as config:
+            config.set_num_vfs("eth1", 4)
+            config.set_num_vfs("eth2", 8)
+    """
+    global _cached_store
+    path = _get_config_path()
+    with _locked(path, fcntl.LOCK_EX):
+        with open(path, 'r') as file:
+            store = ConfigStore(path, file.read())
+        yield store
+        store.commit()
+    _cached_store = None
@@ -0,0 +1,320 @@
+# The command function for vfnet daemon
+#
+# Keeps the detected PFs and VFs in memory and serves them over a Unix
+# socket (see daemon_client for the protocol), so clients do not pay
+# for interpreter startup and a full detection on every query.
+# The inventory is detected again when the kernel reports a change of
+# the network devices (uevents) or of the links and their VFs (rtnetlink),
+# and when a vfnet command that changed the VFs asks for it.
+
+import os
+import sys
+import json
+import time
+import signal
+import threading
+import socketserver
+import text_help as text_help
+import detection as detection
+import daemon_client as daemon_client
+import uevent as uevent
+import rtnetlink as rtnetlink
+
+from typing import Callable, List, Dict, Union, Any
+
+# Seconds to wait for the rest of a burst of events (e.g. VFs being
+# created) before detecting again
+REFRESH_DELAY = 0.2
+
+# Seconds between checks of the devices when the kernel events
+# are not available (e.g. inside a container)
+POLL_INTERVAL = 2.0
+
+# Serializes detection
+# Do not use directly except from within this file
+_lock = threading.RLock()
+_changed = threading.Event()
+
+# The list response of the current inventory, built once per detection
+_list_result: Union[Dict[str, Any], None] = None
+_list_inventory = None
+
+def print_help():
+    """Prints the help information for vfnet daemon"""
+    print("Usage: vfnet daemon [OPTIONS]")
+    print("")
+    print("Keeps the network devices in memory and serves them over a Unix socket.")
+    print("The other vfnet commands use the daemon automatically when it is running.")
+    print("\nOptions:")
+    option_help = [
+        ['-h, --help', 'Print help information'],
+        ['--socket=PATH', f'The socket to listen on (default: {daemon_client.SOCKET_PATH})'],
+    ]
+    for option in option_help:
+        option_name = option[0]
+        option_description = option[1]
+        wrapped_description = text_help.wrap_text(option_description, 73)
+        for i, description_line in enumerate(wrapped_description):
+            print("  {:<14}{}".format(option_name if i == 0 else "", description_line))
+
+    print("\nRequests (one JSON object per line):")
+    print('  {"v": 1, "op": "list"}')
+    print('  {"v": 1, "op": "get", "device": "eth1"}')
+    print('  {"v": 1, "op": "refresh"}')
+
+# Executed when the user calls vfnet daemon [COMMAND_ARGS]
+def daemon_command(command_args: List[str]):
+    """
+    Runs the vfnet daemon until it is stopped
+
+    Args:
+        command_args (list): The arguments for the daemon command.
+                              Assumes you have already removed the "vfnet daemon"
+                              portion.
+    """
+    socket_path = daemon_client.SOCKET_PATH
+    for arg in command_args:
+        if arg.startswith("--socket="):
+            socket_path = arg[len("--socket="):]
+
+    # Verify that the current user has permissions to edit root files
+    if os.geteuid() != 0:
+        print("Warning: User does not have root permissions to edit the files")
+        return
+
+    serve(socket_path)
+
+def _refresh() -> None:
+    """Detects the network devices again"""
+    with _lock:
+        # events arriving during detection trigger another one
+        _changed.clear()
+        detection.detect_network_devices(use_cache=False)
+
+def _get_list_result() -> Dict[str, Any]:
+    global _list_result, _list_inventory
+    current = detection.get_inventory()
+    if _list_inventory is not current:
+        _list_result = {
+            'pfs': [pf.to_dict() for pf in current.pfs.values()],
+            'vfs': [vf.to_dict() for vf in current.vfs.values()],
+        }
+        _list_inventory = current
+    return _list_result
+
+def _op_list(request: Dict[str, Any]) -> Dict[str, Any]:
+    if request.get('refresh'):
+        _refresh()
+    return {'ok': True, 'result': _get_list_result()}
+
+def _op_get(request: Dict[str, Any]) -> Dict[str, Any]:
+    device = request.get('device')
+    if not isinstance(device, str):
+        return {'ok': False, 'error': "Missing the network device"}
+    current = detection.get_inventory()
+    pf = current.get_pf(device)
+    if pf is not None:
+        vfs = [vf.to_dict() for vf in current.get_vfs_of_pf(pf.pci_address)]
+        return {'ok': True, 'result': {'type': 'pf', 'pf': pf.to_dict(), 'vfs': vfs}}
+    vf = current.get_vf(device)
+    if vf is not None:
+        return {'ok': True, 'result': {'type': 'vf', 'vf': vf.to_dict()}}
+    return {'ok': False, 'error': f"Network device {device} not found"}
+
+def _op_refresh(request: Dict[str, Any]) -> Dict[str, Any]:
+    _refresh()
+    current = detection.get_inventory()
+    return {'ok': True, 'result': {'pfs': len(current.pfs), 'vfs': len(current.vfs)}}
+
+_OPERATIONS = {
+    'list': _op_list,
+    'get': _op_get,
+    'refresh': _op_refresh,
+}
+
+def handle_request(line: bytes) -> Dict[str, Any]:
+    """
+    Runs a request of the protocol.
+
+    Args:
+        line (bytes): The JSON request.
+
+    Returns:
+        dict: The response.
+    """
+    try:
+        request = json.loads(line)
+    except ValueError:
+        request = None
+    if not isinstance(request, dict):
+        response = {'ok': False, 'error': "The request is not a JSON object"}
+    elif request.get('v', daemon_client.PROTOCOL_VERSION) != daemon_client.PROTOCOL_VERSION:
+        response = {'ok': False, 'error': f"Unsupported protocol version: {request.get('v')}"}
+    elif request.get('op') not in _OPERATIONS:
+        response = {'ok': False, 'error': f"Unknown operation: {request.get('op')}"}
+    else:
+        try:
+            response = _OPERATIONS[request['op']](request)
+        except Exception as e:
+            response = {'ok': False, 'error': str(e)}
+    response['v'] = daemon_client.PROTOCOL_VERSION
+    return response
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Answers the requests of a connection, one per line, until the client closes it"""
+
+    def handle(self):
+        try:
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                self.wfile.write(json.dumps(handle_request(line)).encode() + b"\n")
+                self.wfile.flush()
+        except OSError:
+            # the client went away
+            pass
+
+def _watch_events(source, is_relevant: Callable[[Any], bool]) -> None:
+    """Flags the inventory as changed on every relevant event of a source"""
+    while True:
+        try:
+            event = source.wait(1.0)
+        except OSError as e:
+            # events may have been missed, detect again to be safe
+            print(f"Warning: Could not receive the kernel events: {e}")
+            _changed.set()
+            time.sleep(POLL_INTERVAL)
+            continue
+        if event is not None and is_relevant(event):
+            _changed.set()
+
+def _is_inventory_link_event(names: List[str]) -> bool:
+    """
+    Checks if a link event can change the inventory: a link of a known
+    PF or VF changed, or a link the inventory does not know yet is backed
+    by a device (e.g. the netdev of a VF that was just created).
+    Events of the other links (e.g. taps and bridges) are ignored.
+
+    Args:
+        names (list): The names of the links that changed. Empty if events were lost.
+    """
+    if not names:
+        return True
+    current = detection.get_inventory()
+    for name in names:
+        if current.get_pf(name) is not None or current.get_vf(name) is not None:
+            return True
+        if os.path.isdir(os.path.join(detection.NIC_DIR, name, "device")):
+            return True
+    return False
+
+def _is_inventory_uevent(event: Dict[str, str]) -> bool:
+    """
+    Checks if a uevent can change the inventory, with the same rules as
+    _is_inventory_link_event. Network interfaces must be known or backed
+    by a device, virtual ones (e.g. taps, veths and bridges) are ignored.
+    PCI devices must be known or network controllers (e.g. a new VF).
+
+    Args:
+        event (dict): The uevent (see uevent.parse_uevent).
+    """
+    if uevent.is_resync(event):
+        return True
+    subsystem = event.get('SUBSYSTEM')
+    if subsystem == 'net':
+        if event.get('DEVPATH', '').startswith('/devices/virtual/') or not event.get('INTERFACE'):
+            return False
+        return _is_inventory_link_event([event['INTERFACE']])
+    if subsystem == 'pci':
+        pci_address = event.get('PCI_SLOT_NAME')
+        if not pci_address:
+            return False
+        current = detection.get_inventory()
+        if current.get_pf(pci_address) is not None or current.get_vf(pci_address) is not None:
+            return True
+        try:
+            with open(os.path.join(detection.PCI_DEVICES_DIR, pci_address, "class"), 'r') as f:
+                # 0x02xxxx: network controller
+                return f.read().strip().startswith("0x02")
+        except OSError:
+            # removed, and not in the inventory
+            return False
+    return False
+
+def _poll_for_changes() -> None:
+    """Flags the inventory as changed when the fingerprint of the devices changes"""
+    fingerprint = detection.detection_fingerprint()
+    while True:
+        time.sleep(POLL_INTERVAL)
+        current = detection.detection_fingerprint()
+        if current != fingerprint:
+            fingerprint = current
+            _changed.set()
+
+def _refresh_on_change() -> None:
+    """Detects the network devices again after they change"""
+    while True:
+        _changed.wait()
+        time.sleep(REFRESH_DELAY)
+        try:
+            _refresh()
+        except Exception as e:
+            print(f"Warning: Could not detect the network devices: {e}")
+
+def _start_thread(target: Callable, *args) -> None:
+    threading.Thread(target=target, args=args, daemon=True).start()
+
+def serve(socket_path: Union[str, None] = None) -> None:
+    """
+    Runs the daemon on a socket until it receives SIGTERM or SIGINT.
+
+    Args:
+        socket_path (str): The Unix socket to listen on. Defaults to daemon_client.SOCKET_PATH.
+    """
+    socket_path = socket_path or daemon_client.SOCKET_PATH
+    # the daemon is the source of the inventory, it must not ask itself
+    detection.USE_DAEMON = False
+
+    if daemon_client.is_running(socket_path):
+        raise Exception(f"The vfnet daemon is already running on {socket_path}")
+
+    os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+    # remove the socket left behind by a daemon that did not exit cleanly
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+    _refresh()
+
+    # only root can connect, the requests can change the VFs
+    umask = os.umask(0o177)
+    try:
+        server = socketserver.ThreadingUnixStreamServer(socket_path, _RequestHandler)
+    finally:
+        os.umask(umask)
+    server.daemon_threads = True
+
+    uevents = uevent.open_event_source()
+    link_events = rtnetlink.open_link_event_source()
+    if uevents is not None:
+        _start_thread(_watch_events, uevents, _is_inventory_uevent)
+    if link_events is not None:
+        _start_thread(_watch_events, link_events, _is_inventory_link_event)
+    if uevents is None and link_events is None:
+        print(f"Warning: Kernel events are not available. Checking the network devices every {POLL_INTERVAL} seconds.")
+        _start_thread(_poll_for_changes)
+    _start_thread(_refresh_on_change)
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    current = detection.get_inventory()
+    print(f"vfnet daemon listening on {socket_path} ({len(current.pfs)} PFs, {len(current.vfs)} VFs)")
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        print("vfnet daemon stopped")
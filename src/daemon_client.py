@@ -0,0 +1,116 @@
+# Client of the vfnet daemon (vfnet daemon)
+#
+# The daemon keeps the detected PFs and VFs in memory and serves them
+# over a Unix socket. Every request and response is a single line of
+# JSON. Requests hold the "op" to run and its arguments:
+#
+#   {"v": 1, "op": "list"}                         the whole inventory
+#   {"v": 1, "op": "list", "refresh": true}        after detecting again
+#   {"v": 1, "op": "get", "device": "eth1"}        a PF (with its VFs) or a VF
+#   {"v": 1, "op": "refresh"}                      detect again, after a change
+#
+# Responses hold "ok", and either the "result" or the "error".
+# The commands that change the VFs (e.g. vfnet set) run in the vfnet
+# process itself and send a refresh once they are done.
+
+import os
+import sys
+import json
+import socket
+
+from typing import Dict, Union, Any
+
+# The version of the protocol, sent with every request and response
+PROTOCOL_VERSION = 1
+
+SOCKET_PATH = "/run/vfnet/vfnet.sock"
+
+# Seconds to wait for the daemon to answer. A refresh runs a full detection
+REQUEST_TIMEOUT = 60
+
+class DaemonNotRunning(Exception):
+    """Raised when the daemon cannot be reached. The request was not sent."""
+    pass
+
+class DaemonError(Exception):
+    """Raised when the daemon fails to run a request"""
+    pass
+
+def _connect(socket_path: str) -> socket.socket:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError as e:
+        # missing socket, stale socket or no permission (not root)
+        sock.close()
+        raise DaemonNotRunning(f"The vfnet daemon is not running ({e.strerror})")
+    return sock
+
+def is_running(socket_path: Union[str, None] = None) -> bool:
+    """
+    Check if the daemon is listening on its socket.
+
+    Args:
+        socket_path (str): The socket of the daemon. Defaults to SOCKET_PATH.
+    """
+    try:
+        _connect(socket_path or SOCKET_PATH).close()
+    except DaemonNotRunning:
+        return False
+    return True
+
+def request(op: str, socket_path: Union[str, None] = None, **args) -> Dict[str, Any]:
+    """
+    Sends a request to the daemon and waits for the response.
+
+    Args:
+        op (str): The operation (list, get or refresh).
+        socket_path (str): The socket of the daemon. Defaults to SOCKET_PATH.
+        args: The arguments of the operation.
+
+    Returns:
+        dict: The response of the daemon.
+
+    Raises:
+        DaemonNotRunning: If the daemon cannot be reached. Safe to fall back
+                          to running the operation directly.
+        DaemonError: If the daemon closed the connection or answered with
+                     an unsupported version. The operation may have run.
+    """
+    socket_path = socket_path or SOCKET_PATH
+    if not os.path.exists(socket_path):
+        raise DaemonNotRunning("The vfnet daemon is not running")
+
+    sock = _connect(socket_path)
+    try:
+        sock.settimeout(REQUEST_TIMEOUT)
+        sock.sendall(json.dumps(dict(args, v=PROTOCOL_VERSION, op=op)).encode() + b"\n")
+        with sock.makefile('rb') as stream:
+            line = stream.readline()
+    except OSError as e:
+        raise DaemonError(f"Lost the connection to the vfnet daemon: {e}")
+    finally:
+        sock.close()
+
+    if not line:
+        raise DaemonError("The vfnet daemon closed the connection without answering")
+    response = json.loads(line)
+    if response.get('v') != PROTOCOL_VERSION:
+        raise DaemonError(f"Unsupported vfnet daemon protocol version: {response.get('v')}")
+    return response
+
+def notify_changed() -> None:
+    """
+    Asks the daemon, if it is running, to detect the network devices
+    again after a command changed them. A daemon that cannot refresh is
+    reported, the change itself is already done.
+    """
+    try:
+        response = request('refresh')
+    except DaemonNotRunning:
+        return
+    except (DaemonError, ValueError) as e:
+        print(f"Warning: Could not refresh the vfnet daemon: {e}", file=sys.stderr)
+        return
+    if not response.get('ok'):
+        print(f"Warning: Could not refresh the vfnet daemon: {response.get('error')}", file=sys.stderr)
@@ -31,53 +31,49 @@
 ############################################################
 
 import os
+import sys
 import subprocess
-import copy
 import glob
-from typing import Dict, List, Union, TypedDict, List, Union, TypedDict
+import hashlib
+import json
+import concurrent.futures
+from typing import Dict, List, Mapping, Union
 
 import tables as tables
 import install_vfnet as install_vfnet
 import vfup as vfup
 import ip_link as ip_link
+import pci_ids as pci_ids
+import inventory as inventory
+import daemon_client as daemon_client
 
 NIC_DIR = "/sys/class/net"
-LSPCI_OUTPUT = []
-
-class PhysicalNIC(TypedDict):
-    pci_address: str
-    interface: str
-    device_path: str
-    subsystem: str
-    device_name: str
-    driver: str
-    module: str
-    iommu_group: str
-    vendor: str
-    sriov_capable: bool
-    sriov_numvfs: int
-    sriov_totalvfs: int
-    mac_address: str
-    virtfn: dict[str, dict[str, str]]
-
-class VFNIC(TypedDict):
-    pci_address: str
-    interface: str
-    parent_pci_address: str
-    device_path: str
-    mac_address: Union[str, None]
-    device_name: str
-    driver: str
-    module: str
-    iommu_group: str
-    vendor: str
-    ip_link_vfinfo: dict[str, str]
-    vf_num: int
-
-# Declare a list to store NIC information
+PCI_DEVICES_DIR = "/sys/bus/pci/devices"
+
+# Detection results are cached between runs and reused until the
+# fingerprint of the devices in sysfs changes
+CACHE_DIR = "/run/vfnet"
+CACHE_FILE = os.path.join(CACHE_DIR, "detection.json")
+CACHE_VERSION = 1
+USE_CACHE = True
+
+# Number of threads probing the devices during detection
+# 1 probes the devices one at a time
+DETECTION_WORKERS = 1
+
+# Source of the PCI metadata (vendor, device name, driver, etc.)
+# "sysfs" reads it directly from PCI_DEVICES_DIR,
+# "lspci" runs lspci once per detection
+PCI_BACKEND = "sysfs"
+
+# Get the inventory from the vfnet daemon when it is running
+# instead of scanning the devices. Off inside the daemon itself
+USE_DAEMON = True
+
+# The inventory of the last detection
 # Do not use directly except from within this file
-_physical_nics: Dict[str, PhysicalNIC] = {}
-_vf_nics: Dict[str, VFNIC] = {}
+_inventory = inventory.Inventory()
+_inventory.freeze()
 _detection_complete = False
 
 def detection_complete():
@@ -93,30 +89,40 @@ def clear_cache():
     """
     Clear the cache of detected network devices.
     """
-    global _detection_complete, _physical_nics, _vf_nics
+    global _detection_complete, _inventory
     _detection_complete = False
-    _physical_nics = {}
-    _vf_nics = {}
+    _inventory = inventory.Inventory()
+    _inventory.freeze()
+
+def get_inventory() -> inventory.Inventory:
+    """
+    Get the inventory of the last detection.
+    Assumes that detection already have been run.
+
+    Returns:
+        Inventory: A read-only snapshot of the detected PFs and VFs.
+    """
+    return _inventory
 
-def physical_nics():
+def physical_nics() -> Mapping[str, inventory.PhysicalNIC]:
     """
-    Get a copy of the list of physical NICs.
+    Get the list of physical NICs.
 
     Returns:
-        dict: A copy of the list of physical NICs.
+        dict: A read-only view of the physical NICs keyed by PCI address.
     """
-    return copy.deepcopy(_physical_nics)
+    return _inventory.pfs
 
-def vf_nics():
+def vf_nics() -> Mapping[str, inventory.VFNIC]:
     """
-    Get a copy of the list of virtual NICs.
+    Get the list of virtual NICs.
 
     Returns:
-        dict: A copy of the list of virtual NICs.
+        dict: A read-only view of the virtual NICs keyed by PCI address.
     """
-    return copy.deepcopy(_vf_nics)
+    return _inventory.vfs
 
-def get_pf(network_device):
+def get_pf(network_device) -> Union[inventory.PhysicalNIC, None]:
     """
     Get the physical function (PF) for a given network device.
     Assumes that detection already have been run.
@@ -126,18 +132,11 @@ def get_pf(network_device):
                                 the network device to manage.
     
     Returns:
-        dict: A copy PF for the given network device. None if not found.
-    """
-    # Loop through the physical nics checking both th pci_address
-    # and interface keys for a match
-    for nic in _physical_nics.values():
-        if nic["interface"] == network_device:
-            return copy.deepcopy(nic)
-        elif nic["pci_address"] == network_device:
-            return copy.deepcopy(nic)
-    return None
+        PhysicalNIC: The read-only PF for the given network device. None if not found.
+    """
+    return _inventory.get_pf(network_device)
 
-def get_vf(network_device):
+def get_vf(network_device) -> Union[inventory.VFNIC, None]:
     """
     Get the virtual function (VF) for a given network device.
     Assumes that detection already have been run.
@@ -147,16 +146,117 @@ def get_vf(network_device):
                                 the network device to manage.
     
     Returns:
-        dict: A copy VF for the given network device. None if not found.
-    """
-    # Loop through the physical nics checking both th pci_address
-    # and interface keys for a match
-    for vf in _vf_nics.values():
-        if vf["interface"] == network_device:
-            return copy.deepcopy(vf)
-        elif vf["pci_address"] == network_device:
-            return copy.deepcopy(vf)
-    return None
+        VFNIC: The read-only VF for the given network device. None if not found.
+    """
+    return _inventory.get_vf(network_device)
+
+def parse_lspci_output(lspci_output: str) -> Dict[str, Dict[str, str]]:
+    """
+    Parse the machine readable output of `lspci -vmmk -D` into
+    a dictionary of PCI devices keyed by their PCI address (BDF).
+
+    Args:
+        lspci_output (str): The stdout of `lspci -vmmk -D`. Each device
+                            is a block of `Key:\tValue` lines separated
+                            by a blank line.
+
+    Returns:
+        dict: The fields of each device (e.g. Device, Vendor, Driver,
+              Module, IOMMUGroup) keyed by PCI address.
+    """
+    pci_devices: Dict[str, Dict[str, str]] = {}
+    pci_data: Dict[str, str] = {}
+    for line in lspci_output.split('\n') + ['']:
+        line = line.strip()
+        if line == "":
+            if 'Slot' in pci_data:
+                pci_devices[pci_data['Slot']] = pci_data
+            pci_data = {}
+            continue
+        if ':' not in line:
+            continue
+        key, value = line.split(':', 1)
+        pci_data[key] = value.strip()
+    return pci_devices
+
+def _scan_pci_devices() -> Dict[str, Dict[str, str]]:
+    """
+    Run lspci once for every PCI device on the system.
+
+    Returns:
+        dict: The parsed lspci fields keyed by PCI address.
+    """
+    try:
+        lspci_output = subprocess.run(["lspci", "-vmmk", "-D"], capture_output=True, text=True)
+    except FileNotFoundError:
+        return {}
+    return parse_lspci_output(lspci_output.stdout)
+
+def _read_link_name(path: str) -> Union[str, None]:
+    """
+    Returns the basename of the target of a sysfs link. None if the link does not exist.
+    """
+    if not os.path.islink(path):
+        return None
+    return os.path.basename(os.path.realpath(path))
+
+def _read_sysfs_id(path: str) -> Union[str, None]:
+    """
+    Returns the contents of a sysfs id file (e.g. vendor). None if it cannot be read.
+    """
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def read_sysfs_pci_data(pci_address: str) -> Dict[str, str]:
+    """
+    Reads the metadata of a PCI device from sysfs, resolving the
+    vendor and device names through the pci.ids database.
+    The keys match the fields of `lspci -vmmk`.
+
+    Args:
+        pci_address (str): The PCI address (BDF) of the device.
+
+    Returns:
+        dict: The Vendor, Device, Driver, Module and IOMMUGroup of the
+              device. Fields that are not available are omitted.
+    """
+    device_dir = os.path.join(PCI_DEVICES_DIR, pci_address)
+    pci_data: Dict[str, str] = {}
+
+    vendor_id = _read_sysfs_id(os.path.join(device_dir, "vendor"))
+    device_id = _read_sysfs_id(os.path.join(device_dir, "device"))
+    if vendor_id is not None:
+        vendor_name = pci_ids.lookup_vendor(vendor_id)
+        pci_data['Vendor'] = vendor_name if vendor_name else vendor_id.replace('0x', '')
+        if device_id is not None:
+            device_name = pci_ids.lookup_device(vendor_id, device_id)
+            pci_data['Device'] = device_name if device_name else device_id.replace('0x', '')
+
+    driver = _read_link_name(os.path.join(device_dir, "driver"))
+    if driver is not None:
+        pci_data['Driver'] = driver
+        module = _read_link_name(os.path.join(device_dir, "driver", "module"))
+        if module is not None:
+            pci_data['Module'] = module
+
+    iommu_group = _read_link_name(os.path.join(device_dir, "iommu_group"))
+    if iommu_group is not None:
+        pci_data['IOMMUGroup'] = iommu_group
+
+    return pci_data
+
+def _pci_data_source():
+    """
+    Returns a function that maps a PCI address to its metadata
+    using the backend selected by PCI_BACKEND.
+    """
+    if PCI_BACKEND == "lspci":
+        pci_devices = _scan_pci_devices()
+        return lambda pci_address: pci_devices.get(pci_address, {})
+    return read_sysfs_pci_data
 
 def get_module_of_vf_by_pf(pf_interface_name: str, vf_index: int) -> str:
     """
@@ -186,193 +286,409 @@ def _get_mac_address(device: str) -> str:
         mac_address = f.read().strip()
     return mac_address
     
-def detect_network_devices():
-    global _detection_complete, _physical_nics, _vf_nics
-    # print("------ Detecting network devices... ------")
+def detection_fingerprint() -> str:
+    """
+    Computes a cheap fingerprint of the VF topology from sysfs.
+    Covers the entries of NIC_DIR, their ifindex and the sriov_numvfs
+    of each PF. Changes whenever VFs are created or destroyed, a device
+    is hotplugged or a network interface appears or disappears, e.g.
+    when a VF is bound to vfio-pci. It does not change when a VF moves
+    between two drivers without a network interface, or when MAC
+    addresses and VF settings change: those are read again on each
+    cache hit (see _refresh_link_state).
+    """
+    entries = []
+    for device in sorted(os.listdir(NIC_DIR)):
+        device_path = os.path.join(NIC_DIR, device)
+        entries.append([
+            device,
+            _read_sysfs_id(os.path.join(device_path, "ifindex")),
+            _read_sysfs_id(os.path.join(device_path, "device", "sriov_numvfs")),
+        ])
+    fingerprint_data = json.dumps([CACHE_VERSION, PCI_BACKEND, entries])
+    return hashlib.sha256(fingerprint_data.encode()).hexdigest()
+
+def _load_cache(fingerprint: str) -> Union[inventory.Inventory, None]:
+    """
+    Loads the inventory saved by a previous detection.
 
-    ip_link_output = ip_link.get_ip_link()
+    Returns:
+        Inventory: The cached inventory. None if there is no cache
+                   or it does not match the current fingerprint.
+    """
+    try:
+        with open(CACHE_FILE, 'r') as f:
+            cache = json.load(f)
+        if cache.get('fingerprint') != fingerprint:
+            return None
+        return inventory_from_dicts(cache['pfs'], cache['vfs'])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def _refresh_link_state(cached: inventory.Inventory) -> inventory.Inventory:
+    """
+    Reads again the parts of a cached inventory the fingerprint does not
+    cover: the MAC addresses and the `ip link` vfinfo of the VFs, which
+    can be changed outside vfnet (e.g. `ip link set <pf> vf 0 mac ...`).
+    Costs one netlink query of the SR-IOV PFs and a sysfs read per
+    network interface.
 
-    # Loop through each network device
-    for device in os.listdir(NIC_DIR):
-        device_path = os.path.join(NIC_DIR, device)
+    Returns:
+        Inventory: A new inventory with the current link state.
+    """
+    ip_link_output = ip_link.get_ip_links([pf.interface for pf in cached.pfs.values() if pf.sriov_capable])
+    vfinfo_by_num = {
+        (pf.pci_address, vfinfo['vf']): vfinfo
+        for pf in cached.pfs.values()
+        for vfinfo in ip_link_output.get(pf.interface, {}).get('vfinfo_list', [])
+    }
+
+    pfs = []
+    for pf in cached.pfs.values():
+        pf_dict = pf.to_dict()
+        pf_dict['mac_address'] = _read_current_mac_address(pf.interface, pf.mac_address)
+        pfs.append(pf_dict)
+    vfs = []
+    for vf in cached.vfs.values():
+        vf_dict = vf.to_dict()
+        if vf.vf_num is not None:
+            vfinfo = vfinfo_by_num.get((vf.parent_pci_address, vf.vf_num), {})
+            vf_dict['ip_link_vfinfo'] = vfinfo
+            if vf.interface is None:
+                vf_dict['mac_address'] = vfinfo['address'] if vfinfo else "unknown"
+        if vf.interface is not None:
+            vf_dict['mac_address'] = _read_current_mac_address(vf.interface, vf.mac_address)
+        vfs.append(vf_dict)
+    return inventory_from_dicts(pfs, vfs)
+
+def _read_current_mac_address(interface: str, cached_mac_address: str) -> str:
+    # the interface can go away between the fingerprint and this read
+    try:
+        return _get_mac_address(interface)
+    except OSError:
+        return cached_mac_address
+
+def inventory_from_dicts(pfs: List[Dict], vfs: List[Dict]) -> inventory.Inventory:
+    """
+    Rebuilds a frozen inventory from the records saved with to_dict().
 
-        is_device = os.path.isdir(os.path.join(device_path, "device"))
-        is_pf = is_device and not os.path.islink(os.path.join(device_path, "device", "physfn"))
+    Raises:
+        TypeError: If a record has unknown fields.
+    """
+    loaded = inventory.Inventory()
+    for pf in pfs:
+        loaded.add_pf(inventory.PhysicalNIC(**pf))
+    for vf in vfs:
+        loaded.add_vf(inventory.VFNIC(**vf))
+    loaded.freeze()
+    return loaded
+
+def _load_from_daemon(refresh: bool) -> Union[inventory.Inventory, None]:
+    """
+    Gets the live inventory of the vfnet daemon.
 
-        # Check if the device is a physical NIC
-        if is_pf:
-            # Determine the PCI address for the physical NIC
-            pci_address = os.path.basename(os.path.realpath(os.path.join(device_path, "device")))
-            
-            # Get the subsystem for the physical NIC
-            subsystem = "unknown"
-            if os.path.exists(os.path.join(device_path, "device", "subsystem")) and os.path.islink(os.path.join(device_path, "device", "subsystem")):
-              subsystem = os.path.basename(os.path.realpath(os.path.join(device_path, "device", "subsystem")))
+    Args:
+        refresh (bool): Ask the daemon to detect the devices again first.
 
-            # Get the interface name for the physical NIC
-            interface = os.path.basename(os.path.realpath(device_path))
+    Returns:
+        Inventory: The inventory. None if the daemon is not running or failed.
+    """
+    try:
+        response = daemon_client.request('list', refresh=refresh)
+        if not response.get('ok'):
+            return None
+        return inventory_from_dicts(response['result']['pfs'], response['result']['vfs'])
+    except daemon_client.DaemonNotRunning:
+        return None
+    except (daemon_client.DaemonError, ValueError, KeyError, TypeError) as e:
+        print(f"Warning: Could not get the inventory from the vfnet daemon: {e}", file=sys.stderr)
+        return None
+
+def _save_cache(detected: inventory.Inventory, fingerprint: str) -> None:
+    """
+    Saves the inventory for the following runs.
+    Silently skipped if the cache directory is not writable (e.g. not root).
+    """
+    cache = {
+        'fingerprint': fingerprint,
+        'pfs': [pf.to_dict() for pf in detected.pfs.values()],
+        'vfs': [vf.to_dict() for vf in detected.vfs.values()],
+    }
+    temp_file = "{}.{}.tmp".format(CACHE_FILE, os.getpid())
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(temp_file, 'w') as f:
+            json.dump(cache, f)
+        os.replace(temp_file, CACHE_FILE)
+    except OSError:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+def invalidate_cache() -> None:
+    """
+    Removes the saved detection results so the next run rescans all devices.
+    Call after changing the VFs of a device.
+    """
+    try:
+        os.remove(CACHE_FILE)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Warning: Could not remove the detection cache {CACHE_FILE}: {e.strerror}", file=sys.stderr)
+
+def _probe_device(device: str, get_pci_data) -> Union[inventory.PhysicalNIC, inventory.VFNIC, None]:
+    """
+    Reads the sysfs entries and PCI metadata of a single network device.
+    Safe to call concurrently for different devices.
+
+    Args:
+        device (str): The name of the entry in NIC_DIR.
+        get_pci_data (function): Maps a PCI address to its metadata.
 
-            # Determine if the nic is capable of SR-IOV
+    Returns:
+        PhysicalNIC or VFNIC: The record of the device. None if the
+                              device is not a PCI PF or a VF.
+    """
+    device_path = os.path.join(NIC_DIR, device)
+
+    is_device = os.path.isdir(os.path.join(device_path, "device"))
+    is_pf = is_device and not os.path.islink(os.path.join(device_path, "device", "physfn"))
+
+    # Check if the device is a physical NIC
+    if is_pf:
+        # Determine the PCI address for the physical NIC
+        pci_address = os.path.basename(os.path.realpath(os.path.join(device_path, "device")))
+        
+        # Get the subsystem for the physical NIC
+        subsystem = "unknown"
+        if os.path.exists(os.path.join(device_path, "device", "subsystem")) and os.path.islink(os.path.join(device_path, "device", "subsystem")):
+          subsystem = os.path.basename(os.path.realpath(os.path.join(device_path, "device", "subsystem")))
+
+        # Get the interface name for the physical NIC
+        interface = os.path.basename(os.path.realpath(device_path))
+
+        # Determine if the nic is capable of SR-IOV
+        sriov_capable = False
+        if os.path.exists(os.path.join(device_path, "device", "sriov_numvfs")):
+          sriov_capable = True
+        
+        # if capable, get the number of VFs
+        sriov_numvfs = 0
+        if sriov_capable:
+          with open(os.path.join(device_path, "device", "sriov_numvfs"), 'r') as f:
+            sriov_numvfs = int(f.read())
+        
+        # if capable, get the maximum number of VFs
+        sriov_totalvfs = 0
+        if sriov_capable:
+          with open(os.path.join(device_path, "device", "sriov_totalvfs"), 'r') as f:
+            sriov_totalvfs = int(f.read())
+        
+        if sriov_capable and sriov_totalvfs == 0:
             sriov_capable = False
-            if os.path.exists(os.path.join(device_path, "device", "sriov_numvfs")):
-              sriov_capable = True
-            
-            # if capable, get the number of VFs
-            sriov_numvfs = 0
-            if sriov_capable:
-              with open(os.path.join(device_path, "device", "sriov_numvfs"), 'r') as f:
-                sriov_numvfs = int(f.read())
-            
-            # if capable, get the maximum number of VFs
-            sriov_totalvfs = 0
-            if sriov_capable:
-              with open(os.path.join(device_path, "device", "sriov_totalvfs"), 'r') as f:
-                sriov_totalvfs = int(f.read())
-            
-            if sriov_capable and sriov_totalvfs == 0:
-                sriov_capable = False
-
-            # for now only use PFs attached directly to the PCI bus
-            if subsystem == "pci":
-                # Execute lspci command and store the output
-                lspci_output = subprocess.run(["lspci", "-vmmks", pci_address], capture_output=True, text=True)
-                lines = lspci_output.stdout.strip().split('\n')
-
-                pci_data = {}
-
-                for line in lines:
-                    key, value = line.strip().split(':', 1)
-                    pci_data[key] = value.strip()
-
-                mac_address = _get_mac_address(interface)
-
-                # Catalog all the virtfn* files in the device's sysfs directory and the underlying pci address linked by the virtfn files
-                virtfn_files = glob.glob(os.path.join(device_path, "device", "virtfn*"))
-                virtfn_files.sort()
-                virtfn = {}
-                for virtfn_file in virtfn_files:
-                    virtfn_pci_address = os.path.basename(os.path.realpath(virtfn_file))
-                    virtfn_name = os.path.basename(virtfn_file)
-                    vf_index = int(virtfn_name.replace("virtfn", ""))
-                    virtfn[virtfn_name] = {
-                        'vf': vf_index, 
-                        'pci_address': virtfn_pci_address,
-                        'virtfn_name': virtfn_pci_address,
-                        'parent_pci_address': pci_address,
-                        'parent_interface': interface,
-                        'virtfn_path': virtfn_file,
-                    }
-
-                # Store the NIC information in the _physical_nics dictionary
-                _physical_nics[pci_address] = {
-                    'pci_address': pci_address,
-                    'interface': interface,
-                    'device_path': device_path,
-                    'subsystem': subsystem,
-                    'device_name': pci_data.get('Device', 'unknown'),
-                    'driver': pci_data.get('Driver','unknown'),
-                    'module': pci_data.get('Module','unknown'),
-                    'iommu_group': pci_data.get('IOMMUGroup','unknown'),
-                    'vendor': pci_data.get('Vendor','unknown'),
-                    'sriov_capable': sriov_capable,
-                    'sriov_numvfs': sriov_numvfs,
-                    'sriov_totalvfs': sriov_totalvfs,
-                    'mac_address': mac_address,
-                    'virtfn': virtfn
+
+        # for now only use PFs attached directly to the PCI bus
+        if subsystem == "pci":
+            pci_data = get_pci_data(pci_address)
+
+            mac_address = _get_mac_address(interface)
+
+            # Catalog all the virtfn* files in the device's sysfs directory and the underlying pci address linked by the virtfn files
+            virtfn_files = glob.glob(os.path.join(device_path, "device", "virtfn*"))
+            virtfn_files.sort()
+            virtfn = {}
+            for virtfn_file in virtfn_files:
+                virtfn_pci_address = os.path.basename(os.path.realpath(virtfn_file))
+                virtfn_name = os.path.basename(virtfn_file)
+                vf_index = int(virtfn_name.replace("virtfn", ""))
+                virtfn[virtfn_name] = {
+                    'vf': vf_index, 
+                    'pci_address': virtfn_pci_address,
+                    'virtfn_name': virtfn_pci_address,
+                    'parent_pci_address': pci_address,
+                    'parent_interface': interface,
+                    'virtfn_path': virtfn_file,
                 }
 
-        # Check if the device is a VF network device
-        if is_device and not is_pf:
-            vf_pci_address = os.path.basename(os.path.realpath(os.path.join(device_path, "device")))
+            return inventory.PhysicalNIC(
+                pci_address=pci_address,
+                interface=interface,
+                device_path=device_path,
+                subsystem=subsystem,
+                device_name=pci_data.get('Device', 'unknown'),
+                driver=pci_data.get('Driver','unknown'),
+                module=pci_data.get('Module','unknown'),
+                iommu_group=pci_data.get('IOMMUGroup','unknown'),
+                vendor=pci_data.get('Vendor','unknown'),
+                sriov_capable=sriov_capable,
+                sriov_numvfs=sriov_numvfs,
+                sriov_totalvfs=sriov_totalvfs,
+                mac_address=mac_address,
+                virtfn=virtfn,
+            )
+
+    # Check if the device is a VF network device
+    if is_device and not is_pf:
+        vf_pci_address = os.path.basename(os.path.realpath(os.path.join(device_path, "device")))
+
+        # Get the VF interface name
+        vf_interface = device
+
+        # Get the parent device path
+        parent_path = os.path.realpath(os.path.join(device_path, "device", "physfn"))
+        parent_pci_address = os.path.basename(parent_path)
+
+        mac_address = _get_mac_address(vf_interface)
+
+        pci_data = get_pci_data(vf_pci_address)
+
+        return inventory.VFNIC(
+            pci_address=vf_pci_address,
+            interface=vf_interface,
+            parent_pci_address=parent_pci_address,
+            device_path=device_path,
+            mac_address=mac_address if mac_address else "unknown",
+            device_name=pci_data.get('Device', 'unknown'),
+            driver=pci_data.get('Driver','unknown'),
+            module=pci_data.get('Module','unknown'),
+            iommu_group=pci_data.get('IOMMUGroup','unknown'),
+            vendor=pci_data.get('Vendor','unknown'),
+            ip_link_vfinfo={},
+        )
 
-            # Get the VF interface name
-            vf_interface = device
+    return None
 
-            # Get the parent device path
-            parent_path = os.path.realpath(os.path.join(device_path, "device", "physfn"))
-            parent_pci_address = os.path.basename(parent_path)
+class _SerialExecutor:
+    """Runs the work of a worker pool in the calling thread"""
+    def __enter__(self):
+        return self
 
-            mac_address = _get_mac_address(vf_interface)
+    def __exit__(self, *exc_info):
+        return False
 
-            # Execute lspci command and store the output
-            lspci_output = subprocess.run(["lspci", "-vmmks", vf_pci_address], capture_output=True, text=True)
-            lines = lspci_output.stdout.strip().split('\n')
+    def map(self, fn, *iterables):
+        return map(fn, *iterables)
 
-            pci_data = {}
+def _worker_pool():
+    """
+    Returns the executor used to probe devices concurrently.
+    Runs serially when DETECTION_WORKERS is 1.
+    """
+    if DETECTION_WORKERS <= 1:
+        return _SerialExecutor()
+    return concurrent.futures.ThreadPoolExecutor(max_workers=DETECTION_WORKERS)
 
-            for line in lines:
-                key, value = line.strip().split(':', 1)
-                pci_data[key] = value.strip()
-
-            # Store the VF NIC information and parent in the _vf_nics dictionary
-            _vf_nics[vf_pci_address] = {
-                'pci_address': vf_pci_address,
-                'interface': vf_interface,
-                'parent_pci_address': parent_pci_address,
-                'device_path': device_path,
-                'mac_address': mac_address if mac_address else "unknown",
-                'device_name': pci_data.get('Device', 'unknown'),
-                'driver': pci_data.get('Driver','unknown'),
-                'module': pci_data.get('Module','unknown'),
-                'iommu_group': pci_data.get('IOMMUGroup','unknown'),
-                'vendor': pci_data.get('Vendor','unknown'),
-            }
-    
+def detect_network_devices(use_cache: bool = True):
+    """
+    Detects the PFs and VFs on the system.
+
+    Args:
+        use_cache (bool): Reuse the results saved by a previous run if the
+                          devices have not changed since. Ignored when
+                          USE_CACHE is False.
+
+    When the vfnet daemon is running its live inventory is used instead
+    (detected again by the daemon when the cache is not used).
+    """
+    global _detection_complete, _inventory
+    # print("------ Detecting network devices... ------")
 
+    if USE_DAEMON:
+        served = _load_from_daemon(refresh=not (use_cache and USE_CACHE))
+        if served is not None:
+            _inventory = served
+            _detection_complete = True
+            return
+
+    fingerprint = detection_fingerprint()
+    if use_cache and USE_CACHE:
+        cached = _load_cache(fingerprint)
+        if cached is not None:
+            _inventory = _refresh_link_state(cached)
+            _detection_complete = True
+            return
+
+    physical_nics: Dict[str, inventory.PhysicalNIC] = {}
+    vf_nics: Dict[str, inventory.VFNIC] = {}
+
+    get_pci_data = _pci_data_source()
+
+    # Probe each network device, fanned out to the worker pool.
+    # map() keeps the order of the devices so the results are
+    # the same as a serial detection
+    devices = os.listdir(NIC_DIR)
+    with _worker_pool() as executor:
+        probed = list(executor.map(lambda device: _probe_device(device, get_pci_data), devices))
+
+    for record in probed:
+        if isinstance(record, inventory.PhysicalNIC):
+            physical_nics[record.pci_address] = record
+        elif isinstance(record, inventory.VFNIC):
+            vf_nics[record.pci_address] = record
+
+    # Only the SR-IOV capable PFs can carry VF information
+    ip_link_output = ip_link.get_ip_links([pf.interface for pf in physical_nics.values() if pf.sriov_capable])
+
+    # Read the PCI metadata of the VFs that did not show up in the net search
+    # this usually means they are already assigned to a VM
+    unlisted_vfs = [
+        virtfn['pci_address']
+        for pf in physical_nics.values() if pf.interface in ip_link_output
+        for virtfn in pf.virtfn.values() if virtfn['pci_address'] not in vf_nics
+    ]
+    with _worker_pool() as executor:
+        unlisted_pci_data = dict(zip(unlisted_vfs, executor.map(get_pci_data, unlisted_vfs)))
 
     # Go through pfs and check if they have any VFs
-    for pf_pci_address, pf in _physical_nics.items():
-        # check if ip_link_output has key pf['interface']
-        if pf['interface'] not in ip_link_output:
+    for pf_pci_address, pf in physical_nics.items():
+        # check if ip_link_output has key pf.interface
+        if pf.interface not in ip_link_output:
             continue
-        if 'vfinfo_list' not in ip_link_output[pf['interface']]:
+        if 'vfinfo_list' not in ip_link_output[pf.interface]:
             continue
-        ip_link_vfinfo_list = ip_link_output[pf['interface']]['vfinfo_list']
+        # index the ip link vfinfo by vf number
+        ip_link_vfinfo_by_num = {ip_link_vf['vf']: ip_link_vf for ip_link_vf in ip_link_output[pf.interface]['vfinfo_list']}
         # iterate through the virtfn dictionary
-        for vf_name, virtfn in pf['virtfn'].items():
-            ip_link_vfinfo = {}
-            for ip_link_vf in ip_link_vfinfo_list:                
-                if(ip_link_vf['vf'] == virtfn['vf']):
-                    ip_link_vfinfo = ip_link_vf
+        for vf_name, virtfn in pf.virtfn.items():
+            ip_link_vfinfo = ip_link_vfinfo_by_num.get(virtfn['vf'], {})
 
             vf_pci_address = virtfn['pci_address']
-            parent_pci_address = pf_pci_address
-            device_path = virtfn['virtfn_path']
-            mac_address = ip_link_vfinfo['address'] if ip_link_vfinfo else "unknown"
+            vf = vf_nics.get(vf_pci_address)
 
             # try to find any VFs that did not show up in the net search
             # this usually means they are already assigned to a VM
-            if virtfn['pci_address'] not in _vf_nics:
-
-                # Execute lspci command and store the output
-                lspci_output = subprocess.run(["lspci", "-vmmks", vf_pci_address], capture_output=True, text=True)
-                lines = lspci_output.stdout.strip().split('\n')
-
-                pci_data = {}
-
-                for line in lines:
-                    key, value = line.strip().split(':', 1)
-                    pci_data[key] = value.strip()
-                    
-                # add the vf to the _vf_nics dictionary
-                _vf_nics[virtfn['pci_address']] = {
-                'pci_address': vf_pci_address,
-                'interface': None,
-                'parent_pci_address': parent_pci_address,
-                'device_path': device_path,
-                'mac_address': mac_address,
-                'device_name': pci_data.get('Device', 'unknown'),
-                'driver': pci_data.get('Driver','unknown'),
-                'module': pci_data.get('Module','unknown'),
-                'iommu_group': pci_data.get('IOMMUGroup','unknown'),
-                'vendor': pci_data.get('Vendor','unknown'),
+            if vf is None:
+                pci_data = unlisted_pci_data[vf_pci_address]
+
+                # add the vf to the vf_nics dictionary
+                vf = inventory.VFNIC(
+                    pci_address=vf_pci_address,
+                    interface=None,
+                    parent_pci_address=pf_pci_address,
+                    device_path=virtfn['virtfn_path'],
+                    mac_address=ip_link_vfinfo['address'] if ip_link_vfinfo else "unknown",
+                    device_name=pci_data.get('Device', 'unknown'),
+                    driver=pci_data.get('Driver','unknown'),
+                    module=pci_data.get('Module','unknown'),
+                    iommu_group=pci_data.get('IOMMUGroup','unknown'),
+                    vendor=pci_data.get('Vendor','unknown'),
+                )
+                vf_nics[vf_pci_address] = vf
 
-                }
             # Attach ip link data to the vf
-            _vf_nics[virtfn['pci_address']]['ip_link_vfinfo'] = ip_link_vfinfo
-            _vf_nics[virtfn['pci_address']]['vf_num'] = virtfn['vf']
-
-
+            vf.ip_link_vfinfo = ip_link_vfinfo
+            vf.vf_num = virtfn['vf']
+
+    # Index the detected devices
+    detected = inventory.Inventory()
+    for pf in physical_nics.values():
+        detected.add_pf(pf)
+    for vf in vf_nics.values():
+        detected.add_vf(vf)
+    detected.freeze()
+    _save_cache(detected, fingerprint)
+
+    _inventory = detected
     _detection_complete = True
 
 
@@ -382,7 +698,7 @@ def print_detection_results():
         print("Error: Network devices detection has not been completed yet.")
 
     # Count the number of physical NICs
-    num_physical_nics = len(_physical_nics)
+    num_physical_nics = len(_inventory.pfs)
 
     # Print the number of physical NICs detected
     if num_physical_nics == 0:
@@ -393,7 +709,7 @@ def print_detection_results():
         print(f" - {num_physical_nics} physical NICs detected.")
 
     # Count the number of VF NICs
-    num_vf_nics = len(_vf_nics)
+    num_vf_nics = len(_inventory.vfs)
 
     # Print the number of VF NICs detected
     if num_vf_nics == 0:
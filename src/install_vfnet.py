@@ -41,6 +41,12 @@ _VFNET_VFUP_FILE_NAME = 'vfup'
 _VFNET_VFUP_PATH = os.path.join(_VFNET_INSTALL_DIR, _VFNET_VFUP_FILE_NAME)
 _VFNET_CONFIG_FILE_NAME = 'vf.config'
 _VFNET_CONFIG_FILE_PATH = os.path.join(_VFNET_INSTALL_DIR, _VFNET_CONFIG_FILE_NAME)
+_VFNET_SETTINGS_FILE_NAME = 'vfnet.conf'
+_VFNET_SETTINGS_FILE_PATH = os.path.join(_VFNET_INSTALL_DIR, _VFNET_SETTINGS_FILE_NAME)
+_VFNET_MAC_TABLE_FILE_NAME = 'mac.table'
+_VFNET_MAC_TABLE_FILE_PATH = os.path.join(_VFNET_INSTALL_DIR, _VFNET_MAC_TABLE_FILE_NAME)
+_VFNET_MAC_SECRET_FILE_NAME = 'mac.secret'
+_VFNET_MAC_SECRET_FILE_PATH = os.path.join(_VFNET_INSTALL_DIR, _VFNET_MAC_SECRET_FILE_NAME)
 _VFNET_SERVICE_NAME = 'vfnet-create'
 _VFNET_SERVICE_FILE_NAME = _VFNET_SERVICE_NAME + '.service'
 
@@ -60,7 +66,8 @@ WantedBy=network-online.target
 [Service]
 Type=oneshot
 # EnvironmentFile=-/etc/default/networking
-ExecStart=/bin/sh -c /sbin/vfup -a
+ExecStart=/usr/bin/vfnet up
+# ExecStart=/bin/sh -c /sbin/vfup -a
 # ExecStart=/sbin/vfup -a --read-environment
 # ExecStop=/sbin/vfdown -a --read-environment
 RemainAfterExit=true
@@ -74,9 +81,62 @@ vf_config_example_file_text = '''
 # The structure defines the number of VF network devices to create for each PF devices.
 # For example, the following creates 4 VF devices for the eth1 PF:
 # eth1:4
+#
+# The settings of single VFs can be added in the syntax of ip link.
+# All settings are optional. They are applied by vfnet up and vfnet apply:
+# eth1 vf 0 mac 02:00:00:00:00:01 vlan 100 qos 0 spoofchk on trust off state auto
 
 '''
 
+vfnet_settings_example_file_text = '''
+# Optional settings for vfnet
+# Copy to vfnet.conf and uncomment the settings to change.
+#
+# Seconds to wait for VFs to be created or destroyed
+# vf_wait_timeout = 60
+#
+# Per PF driver override of vf_wait_timeout
+# vf_wait_timeout.ixgbe = 30
+#
+# Create VFs without a driver, set their MAC addresses, then bind
+# them to their driver once (instead of binding them twice)
+# vf_deferred_probe = yes
+#
+# How VF MAC addresses are derived. Changing the scheme changes
+# the MAC address of every VF.
+#   bcrypt       slow, requires the bcrypt python module (default)
+#   hmac-sha256  fast, keyed by a secret created in /etc/vfnet/mac.secret
+# mac_scheme = bcrypt
+
+'''
+
+def get_settings_file_path():
+    """
+    Get the path of the optional vfnet settings file.
+    The file may not exist, in which case the defaults are used.
+    """
+    return _VFNET_SETTINGS_FILE_PATH
+
+def get_mac_table_file_path():
+    """
+    Get the path of the table of derived VF MAC addresses.
+    The file is created the first time VFs are set or persisted.
+    """
+    return _VFNET_MAC_TABLE_FILE_PATH
+
+def get_mac_secret_file_path():
+    """
+    Get the path of the host secret used by the hmac-sha256 MAC scheme.
+    The file is created the first time the scheme is used.
+    """
+    return _VFNET_MAC_SECRET_FILE_PATH
+
+def get_config_file_path():
+    """
+    Get the path of the VFNET_CONFIG file, whether or not it exists.
+    """
+    return _VFNET_CONFIG_FILE_PATH
+
 def get_config_file_location():
     """
     Get the location of the VFNET_CONFIG file.
@@ -212,6 +272,11 @@ def _copy_vfnet_files():
     with open(config_example_dest, 'w') as f:
         f.write(vf_config_example_file_text)
 
+    # write the vfnet_settings_example_file_text file to the /etc/vfnet directory
+    settings_example_dest = os.path.join(_VFNET_INSTALL_DIR, '{}.example'.format(_VFNET_SETTINGS_FILE_NAME))
+    with open(settings_example_dest, 'w') as f:
+        f.write(vfnet_settings_example_file_text)
+
 def _install_service_unit():
     """
     Writes the vfnet_create_service_file_text
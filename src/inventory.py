@@ -0,0 +1,213 @@
+# Holds the PFs and VFs found by detection and indexes them for constant time lookups
+
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Tuple, Union, Any
+
+def _freeze_value(value: Any) -> Any:
+    """
+    Returns a read-only version of a nested dict/list value.
+    Dictionaries become mapping proxies and lists become tuples.
+    """
+    if isinstance(value, (dict, MappingProxyType)):
+        return MappingProxyType({key: _freeze_value(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze_value(item) for item in value)
+    return value
+
+def _thaw_value(value: Any) -> Any:
+    """
+    Returns a plain dict/list copy of a value frozen by _freeze_value.
+    """
+    if isinstance(value, (dict, MappingProxyType)):
+        return {key: _thaw_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_thaw_value(item) for item in value]
+    return value
+
+class _Record:
+    """
+    Base class of the inventory records.
+    Fields are declared in __slots__ and default to None.
+    Fields can also be read like a dictionary (e.g. pf['interface'])
+    so records can be passed directly to tables.print_table.
+    Once frozen, a record and its nested values are read-only.
+    """
+    __slots__ = ('_frozen',)
+
+    def __init__(self, **fields):
+        unknown = set(fields) - set(self.__slots__)
+        if unknown:
+            raise TypeError("Unknown fields for {}: {}".format(type(self).__name__, ', '.join(sorted(unknown))))
+        object.__setattr__(self, '_frozen', False)
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if self._frozen:
+            raise AttributeError("{} is read-only".format(type(self).__name__))
+        object.__setattr__(self, name, value)
+
+    def freeze(self) -> None:
+        """Makes the record and its nested values read-only"""
+        if self._frozen:
+            return
+        for name in self.__slots__:
+            object.__setattr__(self, name, _freeze_value(getattr(self, name)))
+        object.__setattr__(self, '_frozen', True)
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns the fields of the record as a new plain (JSON serializable) dictionary"""
+        return {name: _thaw_value(getattr(self, name)) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        return "{}({})".format(type(self).__name__, ', '.join("{}={!r}".format(name, getattr(self, name)) for name in self.__slots__))
+
+class PhysicalNIC(_Record):
+    __slots__ = (
+        'pci_address', 'interface', 'device_path', 'subsystem', 'device_name',
+        'driver', 'module', 'iommu_group', 'vendor', 'sriov_capable',
+        'sriov_numvfs', 'sriov_totalvfs', 'mac_address', 'virtfn',
+    )
+    pci_address: str
+    interface: str
+    device_path: str
+    subsystem: str
+    device_name: str
+    driver: str
+    module: str
+    iommu_group: str
+    vendor: str
+    sriov_capable: bool
+    sriov_numvfs: int
+    sriov_totalvfs: int
+    mac_address: str
+    virtfn: Mapping[str, Mapping[str, Any]]
+
+    @property
+    def can_vf_display(self) -> str:
+        return 'Yes' if self.sriov_capable and self.sriov_totalvfs > 0 else 'No'
+
+    @property
+    def vfs_display(self) -> str:
+        if self.sriov_capable and self.sriov_totalvfs > 0:
+            return "{}/{}".format(self.sriov_numvfs, self.sriov_totalvfs)
+        return ''
+
+class VFNIC(_Record):
+    __slots__ = (
+        'pci_address', 'interface', 'parent_pci_address', 'device_path',
+        'mac_address', 'device_name', 'driver', 'module', 'iommu_group',
+        'vendor', 'ip_link_vfinfo', 'vf_num',
+    )
+    pci_address: str
+    interface: Union[str, None]
+    parent_pci_address: str
+    device_path: str
+    mac_address: Union[str, None]
+    device_name: str
+    driver: str
+    module: str
+    iommu_group: str
+    vendor: str
+    ip_link_vfinfo: Mapping[str, Any]
+    vf_num: Union[int, None]
+
+class Inventory:
+    """
+    The PFs and VFs found by detection.
+
+    PFs and VFs are keyed by PCI address (BDF) in `pfs` and `vfs`
+    and indexed by interface name, MAC address, parent PF and VF number.
+    Records must be fully populated before they are added.
+
+    Once frozen the inventory is an immutable snapshot: no records can
+    be added and every record is read-only, so it can be shared
+    between callers without copying.
+    """
+    __slots__ = ('pfs', 'vfs', 'frozen', '_pf_by_interface', '_vf_by_interface', '_vf_by_mac', '_vfs_by_parent', '_vf_by_num')
+
+    def __init__(self):
+        self.pfs: Mapping[str, PhysicalNIC] = {}
+        self.vfs: Mapping[str, VFNIC] = {}
+        self.frozen = False
+        self._pf_by_interface: Dict[str, PhysicalNIC] = {}
+        self._vf_by_interface: Dict[str, VFNIC] = {}
+        self._vf_by_mac: Dict[str, VFNIC] = {}
+        self._vfs_by_parent: Dict[str, List[VFNIC]] = {}
+        self._vf_by_num: Dict[Tuple[str, int], VFNIC] = {}
+
+    def freeze(self) -> None:
+        """Freezes every record and makes the inventory read-only"""
+        if self.frozen:
+            return
+        for record in list(self.pfs.values()) + list(self.vfs.values()):
+            record.freeze()
+        self.pfs = MappingProxyType(self.pfs)
+        self.vfs = MappingProxyType(self.vfs)
+        self.frozen = True
+
+    def _check_not_frozen(self) -> None:
+        if self.frozen:
+            raise AttributeError("Inventory is read-only")
+
+    def add_pf(self, pf: PhysicalNIC) -> None:
+        self._check_not_frozen()
+        self.pfs[pf.pci_address] = pf
+        if pf.interface:
+            self._pf_by_interface[pf.interface] = pf
+
+    def add_vf(self, vf: VFNIC) -> None:
+        self._check_not_frozen()
+        self.vfs[vf.pci_address] = vf
+        if vf.interface:
+            self._vf_by_interface[vf.interface] = vf
+        if vf.mac_address and vf.mac_address != "unknown":
+            self._vf_by_mac[vf.mac_address.lower()] = vf
+        self._vfs_by_parent.setdefault(vf.parent_pci_address, []).append(vf)
+        if vf.vf_num is not None:
+            self._vf_by_num[(vf.parent_pci_address, vf.vf_num)] = vf
+
+    def get_pf(self, network_device: str) -> Union[PhysicalNIC, None]:
+        """
+        Get a PF by PCI address or interface name. None if not found.
+        """
+        pf = self.pfs.get(network_device)
+        if pf is None:
+            pf = self._pf_by_interface.get(network_device)
+        return pf
+
+    def get_vf(self, network_device: str) -> Union[VFNIC, None]:
+        """
+        Get a VF by PCI address or interface name. None if not found.
+        """
+        vf = self.vfs.get(network_device)
+        if vf is None:
+            vf = self._vf_by_interface.get(network_device)
+        return vf
+
+    def get_vf_by_mac(self, mac_address: str) -> Union[VFNIC, None]:
+        """
+        Get a VF by MAC address. None if not found.
+        """
+        return self._vf_by_mac.get(mac_address.lower())
+
+    def get_vf_by_num(self, pf_pci_address: str, vf_num: int) -> Union[VFNIC, None]:
+        """
+        Get a VF by the PCI address of its PF and its VF number. None if not found.
+        """
+        return self._vf_by_num.get((pf_pci_address, vf_num))
+
+    def get_vfs_of_pf(self, pf_pci_address: str) -> Tuple[VFNIC, ...]:
+        """
+        Get the VFs of a PF in the order they were added.
+        """
+        return tuple(self._vfs_by_parent.get(pf_pci_address, ()))
@@ -1,8 +1,13 @@
 # library to interact with the ip link command
 
 import json
+import re
 import subprocess
 
+import rtnetlink as rtnetlink
+
+from typing import List, Dict, Tuple, Union, Any
+
 def set_vf_mac_address(pf_device_name: str, vf_index: int, mac_address: str) -> None:
     """
     Sets the MAC address of a virtual function (VF) of a given network device.
@@ -13,13 +18,104 @@ def set_vf_mac_address(pf_device_name: str, vf_index: int, mac_address: str) ->
         vf_index (int): The zero-index of the VF for which to set the MAC address.
         mac_address (str): The MAC address to set for the VF.
     """
-    # set the mac address using ip link at th pf level
+    # set the mac address at the pf level
     # this will set the mac address for the vf as well
-    subprocess.run(["ip", "link", "set", pf_device_name, "vf", str(vf_index), "mac", mac_address])
-    
+    error = set_vf_mac_addresses([(pf_device_name, vf_index, mac_address)])[0]
+    if error is not None:
+        print(f"Error: Could not set MAC address for VF {vf_index} of {pf_device_name}: {error}")
+
+def set_vf_mac_addresses(changes: List[Tuple[str, int, str]]) -> List[Union[str, None]]:
+    """
+    Sets the MAC addresses of several VFs, of one or more network devices,
+    in a single transaction: one netlink socket, falling back to a single
+    `ip -force -batch -` process if netlink is not available.
+    A failed change does not stop the following ones.
+    * THIS DOES NOT CHECK IF THE ARGUMENTS ARE VALID.
+
+    Args:
+        changes (list): (parent network device name, VF index, MAC address)
+                        of each VF to change.
+
+    Returns:
+        list: The result of each change in order. None if the MAC
+              address was set, otherwise the error message.
+    """
+    return set_vf_settings([(pf_device_name, vf_index, {'mac': mac_address}) for pf_device_name, vf_index, mac_address in changes])
+
+def set_vf_settings(changes: List[Tuple[str, int, Dict[str, Any]]]) -> List[Union[str, None]]:
+    """
+    Changes the settings of several VFs, of one or more network devices,
+    in a single transaction: one netlink socket, falling back to a single
+    `ip -force -batch -` process if netlink is not available.
+    All the settings of a VF are changed by a single request.
+    A failed change does not stop the following ones.
+    * THIS DOES NOT CHECK IF THE ARGUMENTS ARE VALID.
+
+    Args:
+        changes (list): (parent network device name, VF index, settings)
+                        of each VF to change. The settings can hold
+                        'mac', 'vlan', 'qos', 'spoofchk' (bool),
+                        'trust' (bool) and 'link_state'
+                        ('auto', 'enable' or 'disable').
+
+    Returns:
+        list: The result of each change in order. None if the
+              settings were changed, otherwise the error message.
+    """
+    if not changes:
+        return []
+    try:
+        return [None if error is None else error.strerror for error in rtnetlink.set_vf_settings(changes)]
+    except OSError:
+        # netlink is unavailable, fall back to the ip command
+        return _set_vf_settings_batch(changes)
+
+def _vf_settings_args(vf_settings: Dict[str, Any]) -> str:
+    """
+    Returns the `ip link set <pf> vf <index>` arguments of VF settings.
+    """
+    args = []
+    if 'mac' in vf_settings:
+        args.append(f"mac {vf_settings['mac']}")
+    if 'vlan' in vf_settings:
+        args.append(f"vlan {vf_settings['vlan']} qos {vf_settings.get('qos', 0)}")
+    if 'spoofchk' in vf_settings:
+        args.append(f"spoofchk {'on' if vf_settings['spoofchk'] else 'off'}")
+    if 'trust' in vf_settings:
+        args.append(f"trust {'on' if vf_settings['trust'] else 'off'}")
+    if 'link_state' in vf_settings:
+        args.append(f"state {vf_settings['link_state']}")
+    return " ".join(args)
+
+def _set_vf_settings_batch(changes: List[Tuple[str, int, Dict[str, Any]]]) -> List[Union[str, None]]:
+    """
+    Changes the settings of several VFs with one `ip -force -batch -` process.
+    Uses the same arguments and results as `set_vf_settings`.
+    """
+    commands = "".join(f"link set {pf_device_name} vf {vf_index} {_vf_settings_args(vf_settings)}\n" for pf_device_name, vf_index, vf_settings in changes)
+    try:
+        batch_output = subprocess.run(["ip", "-force", "-batch", "-"], input=commands, capture_output=True, text=True)
+    except FileNotFoundError:
+        return ["the ip command is not installed"] * len(changes)
+
+    results: List[Union[str, None]] = [None] * len(changes)
+    # -force keeps going after a failure and reports each failed
+    # line as "Command failed -:<line>" after its error message
+    message = None
+    for line in batch_output.stderr.splitlines():
+        failed = re.match(r'^Command failed -:(\d+)', line)
+        if failed and 0 < int(failed.group(1)) <= len(changes):
+            results[int(failed.group(1)) - 1] = message or "ip link set failed"
+            message = None
+        elif line.strip():
+            message = line.strip()
+    return results
+
 def get_ip_link() -> dict[str,dict]:
     """
     Returns the output of the `ip link` command.
+    Queried over rtnetlink, falling back to the ip command
+    if netlink is not available.
 
     formatt:
     ```
@@ -53,9 +149,12 @@ def get_ip_link() -> dict[str,dict]:
     }
     ```
     """
-    ip_link_output = subprocess.run(["ip", "-j", "link", "show"], capture_output=True, text=True)
-    # parse the json output of ip_link_output
-    ip_link_json = json.loads(ip_link_output.stdout)
+    try:
+        ip_link_json = rtnetlink.get_links()
+    except OSError:
+        # netlink is unavailable, fall back to the ip command
+        ip_link_json = _get_ip_link_json()
+
     # convert the json output dictionary of dictionaries
     # to a list of dictionaries
 
@@ -66,3 +165,55 @@ def get_ip_link() -> dict[str,dict]:
     # print(f"ip_link_json: {ip_link_dict}")
 
     return ip_link_dict
+
+def _get_ip_link_json(device_name: Union[str, None] = None, stats: bool = False) -> list:
+    """
+    Returns the parsed output of `ip -j link show`.
+    Limited to a single device if device_name is given.
+    Includes the counters (`ip -j -s link show`) if stats is True.
+    """
+    command = ["ip", "-j", "-s", "link", "show"] if stats else ["ip", "-j", "link", "show"]
+    if device_name is not None:
+        command += ["dev", device_name]
+    ip_link_output = subprocess.run(command, capture_output=True, text=True)
+    if ip_link_output.returncode != 0:
+        return []
+    # parse the json output of ip_link_output
+    return json.loads(ip_link_output.stdout)
+
+def get_ip_links(pf_device_names: List[str], stats: bool = False) -> Dict[str, dict]:
+    """
+    Returns the `ip link` output for only the specified network devices.
+    Devices that do not exist are omitted.
+    Uses the same format as `get_ip_link`.
+
+    Args:
+        pf_device_names (list): Names of the network devices to query.
+        stats (bool): Include the counters of each VF in its vfinfo:
+                      'stats': {'rx': {'bytes', 'packets', 'multicast',
+                      'broadcast', 'dropped'}, 'tx': {'bytes', 'packets', 'dropped'}}
+    """
+    if not pf_device_names:
+        return {}
+    try:
+        ip_link_json = rtnetlink.get_links_by_name(pf_device_names, stats=stats)
+    except OSError:
+        # netlink is unavailable, fall back to the ip command
+        ip_link_json = []
+        for pf_device_name in pf_device_names:
+            ip_link_json.extend(_get_ip_link_json(pf_device_name, stats=stats))
+
+    return {link['ifname']: link for link in ip_link_json}
+
+def get_ip_link_device(pf_device_name: str) -> Union[dict, None]:
+    """
+    Returns the `ip link` output for a single network device.
+    Uses the same format as an entry of `get_ip_link`.
+
+    Args:
+        pf_device_name (str): Name of the network device to query.
+
+    Returns:
+        dict: The link of the network device. None if it does not exist.
+    """
+    return get_ip_links([pf_device_name]).get(pf_device_name)
@@ -30,19 +30,33 @@
 #
 ############################################################
 
-import copy
+import sys
+import json
 import tables as tables
 import detection as detection
 import install_vfnet as install_vfnet
 import vfup as vfup
 
-def list_network_devices():
+from typing import Dict, Iterator, Tuple, Any
+
+# The version of the JSON and NDJSON output. Increased whenever a field
+# is removed or changes meaning, adding a field keeps the version
+LIST_SCHEMA_VERSION = 1
+
+def list_network_devices(output_format: str = 'table'):
     """
     List the detected network devices.
-    Calls print_network_devices with no arguments
+
+    Args:
+        output_format (str): table (default), json or ndjson.
     """
 
-    print_network_devices()
+    if output_format == 'json':
+        print_network_devices_json()
+    elif output_format == 'ndjson':
+        print_network_devices_ndjson()
+    else:
+        print_network_devices()
 
 
 def print_network_devices(devices = None):
@@ -62,28 +76,37 @@ def print_network_devices(devices = None):
 
 
 
+class _RowView:
+    """
+    A read-only table row over an inventory record
+    with additional display only columns.
+    """
+    __slots__ = ('_record', '_columns')
+
+    def __init__(self, record, **columns):
+        self._record = record
+        self._columns = columns
+
+    def __getitem__(self, key):
+        if key in self._columns:
+            return self._columns[key]
+        return self._record[key]
+
 # TODO: Move to list library
 def print_physical_nics():
 
-    _physical_nics = detection.physical_nics()
-
     vf_config = {}
 
     # Try to load in settings from file
     if(install_vfnet.is_installed()):
         vf_config = vfup.read_vf_config()
-    nics = list(_physical_nics.values())
-    for nic in nics:
-        if nic['sriov_capable'] and nic['sriov_totalvfs'] > 0:
-            nic['can_vf_display'] = 'Yes'
-            nic['vfs_display'] = "{}/{}".format(nic['sriov_numvfs'], nic['sriov_totalvfs'])
-        else:
-            nic['can_vf_display'] = 'No'
-            nic['vfs_display'] = ''
-        if nic['interface'] in vf_config:
-            nic['vfs_configured'] =  "{}/{}".format(vf_config[nic['interface']], nic['sriov_totalvfs'])
+    nics = []
+    for pf in detection.physical_nics().values():
+        if pf.interface in vf_config:
+            vfs_configured =  "{}/{}".format(vf_config[pf.interface], pf.sriov_totalvfs)
         else:
-            nic['vfs_configured'] = 'N/A'
+            vfs_configured = 'N/A'
+        nics.append(_RowView(pf, vfs_configured=vfs_configured))
 
     # Define the keys and headers for the physical NICs table
     keys = ['pci_address', 'interface', 'subsystem', 'device_name', 'driver', 'can_vf_display', 'vfs_display', 'vfs_configured', 'iommu_group', 'device_path']
@@ -95,18 +118,13 @@ def print_physical_nics():
 
 # TODO: Move to list library
 def print_vf_nics():
-    _physical_nics = detection.physical_nics()
-
-    vf_nics = list(detection.vf_nics().values())
-
-    for nic in vf_nics:
-        parent = _physical_nics[nic['parent_pci_address']]
+    vf_nics = []
+    for vf in detection.vf_nics().values():
+        parent = detection.get_pf(vf.parent_pci_address)
         # Detect if parent was found
-        if parent:
-            nic['parent_interface'] = parent['interface']
-        else:
-            nic['parent_interface'] = 'Unknown'
-        
+        parent_interface = parent.interface if parent else 'Unknown'
+        vf_nics.append(_RowView(vf, parent_interface=parent_interface))
+
 
     # Define the keys and headers for the VF network devices table
     keys = ['pci_address', 'interface', 'mac_address', 'parent_interface', 'vf_num', 'driver', 'device_name', 'parent_pci_address', 'device_path']
@@ -120,4 +138,101 @@ def print_vf_nics():
     # Try to load in settings from file
     if(not install_vfnet.is_installed()):
         print("vfnet is not installed. Run 'vfnet install' then 'vfnet persist' to persist configured VF network devices.")
-    
\ No newline at end of file
+    
+def _pf_record(pf, vf_config: Dict[str, int]) -> Dict[str, Any]:
+    """Returns the fields of a PF in the JSON output"""
+    return {
+        'type': 'pf',
+        'pci_address': pf.pci_address,
+        'interface': pf.interface,
+        'mac_address': pf.mac_address,
+        'driver': pf.driver,
+        'module': pf.module,
+        'vendor': pf.vendor,
+        'device_name': pf.device_name,
+        'iommu_group': pf.iommu_group,
+        'sriov_capable': pf.sriov_capable,
+        'sriov_numvfs': pf.sriov_numvfs,
+        'sriov_totalvfs': pf.sriov_totalvfs,
+        'vfs_configured': vf_config.get(pf.interface),
+    }
+
+def _vf_record(vf, parent) -> Dict[str, Any]:
+    """Returns the fields of a VF in the JSON output"""
+    vfinfo = vf.ip_link_vfinfo or {}
+    vlan_info = vfinfo['vlan_list'][0] if vfinfo.get('vlan_list') else vfinfo
+    return {
+        'type': 'vf',
+        'pci_address': vf.pci_address,
+        'interface': vf.interface,
+        'mac_address': vf.mac_address if vf.mac_address != "unknown" else None,
+        'parent_pci_address': vf.parent_pci_address,
+        'parent_interface': parent.interface if parent else None,
+        'vf_num': vf.vf_num,
+        'driver': vf.driver,
+        'module': vf.module,
+        'vendor': vf.vendor,
+        'device_name': vf.device_name,
+        'iommu_group': vf.iommu_group,
+        'vlan': vlan_info.get('vlan', 0) if vfinfo else None,
+        'qos': vlan_info.get('qos', 0) if vfinfo else None,
+        'spoofchk': vfinfo.get('spoofchk'),
+        'trust': vfinfo.get('trust'),
+        'link_state': vfinfo.get('link_state'),
+    }
+
+def _load_devices() -> Tuple[Any, Dict[str, int]]:
+    """
+    Detects the network devices and reads the configured number of VFs.
+    Done before any output is written, so a failure cannot leave a
+    partial JSON document behind.
+
+    Returns:
+        tuple: The inventory and the number of VFs configured for each PF.
+    """
+    detection.detect_network_devices()
+    current = detection.get_inventory()
+    vf_config = vfup.read_vf_config() if install_vfnet.is_installed() else {}
+    return current, vf_config
+
+def _iter_records(current, vf_config: Dict[str, int]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Yields the records of the detected devices as they are built:
+    each PF followed by its VFs, then the VFs whose PF was not detected.
+    """
+    for pf in current.pfs.values():
+        yield 'pf', _pf_record(pf, vf_config)
+        for vf in current.get_vfs_of_pf(pf.pci_address):
+            yield 'vf', _vf_record(vf, pf)
+    for vf in current.vfs.values():
+        if current.get_pf(vf.parent_pci_address) is None:
+            yield 'vf', _vf_record(vf, None)
+
+def print_network_devices_ndjson():
+    """
+    Prints the detected network devices as NDJSON: a header object with
+    the schema version, then one object per PF and VF.
+    Each PF is flushed with its VFs so consumers can start early.
+    """
+    current, vf_config = _load_devices()
+    sys.stdout.write(json.dumps({'type': 'header', 'schema': LIST_SCHEMA_VERSION}) + "\n")
+    for record_type, record in _iter_records(current, vf_config):
+        if record_type == 'pf':
+            sys.stdout.flush()
+        sys.stdout.write(json.dumps(record) + "\n")
+    sys.stdout.flush()
+
+def print_network_devices_json():
+    """
+    Prints the detected network devices as a single JSON object:
+    {"schema": 1, "devices": [...]} with the same records, in the same
+    order, as the NDJSON output. The records are written as they are built.
+    """
+    current, vf_config = _load_devices()
+    sys.stdout.write('{"schema": %d, "devices": [' % LIST_SCHEMA_VERSION)
+    separator = "\n"
+    for _, record in _iter_records(current, vf_config):
+        sys.stdout.write(separator + json.dumps(record))
+        separator = ",\n"
+    sys.stdout.write("\n]}\n")
+    sys.stdout.flush()
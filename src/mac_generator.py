@@ -2,11 +2,140 @@
 
 # Not needed right now as it looks as though most drivers deterministically generate the MAC address
 
-import bcrypt
 import hashlib
+import hmac
 import base64
+import os
+import sys
+import multiprocessing
+import concurrent.futures
+import install_vfnet as install_vfnet
+import settings as settings
 
-def generate_mac(pf_mac_address: str, vf_index: int, pf_devcie_name: str) -> str:
+from typing import Callable, Dict, List, Optional, Union, Any
+
+# The scheme used when none is set with the mac_scheme setting.
+# Changing it changes the MAC address of every VF
+DEFAULT_SCHEME = 'bcrypt'
+
+# Length in bytes of the host secret of the hmac-sha256 scheme
+SECRET_SIZE = 32
+
+# The registered derivation schemes keyed by name
+# Use register_scheme to add a scheme
+SCHEMES: Dict[str, Dict[str, Any]] = {}
+
+# The host secret is read once per run
+# Do not use directly except from within this file
+_secret: Union[bytes, None] = None
+
+def register_scheme(name: str, derive: Callable[[str, int, str], bytes], modules: Optional[List[str]] = None, slow: bool = False) -> None:
+    """
+    Registers a MAC address derivation scheme.
+
+    Args:
+        name (str): The name used to select the scheme with the mac_scheme setting.
+        derive (function): Takes the PF MAC address, the VF index and the device
+                           name and returns at least 6 bytes derived from them.
+        modules (list): The python modules the scheme depends on.
+        slow (bool): The scheme is slow enough that several MAC addresses
+                     should be derived in parallel processes.
+    """
+    SCHEMES[name] = {'derive': derive, 'modules': list(modules or []), 'slow': slow}
+
+def get_scheme() -> str:
+    """
+    Get the name of the derivation scheme selected in the settings.
+    Falls back to the default scheme (with a warning) if it is unknown.
+    """
+    scheme = settings.get_setting('mac_scheme', DEFAULT_SCHEME)
+    if scheme not in SCHEMES:
+        print(f"Warning: Unknown MAC scheme '{scheme}'. Using {DEFAULT_SCHEME}.", file=sys.stderr)
+        return DEFAULT_SCHEME
+    return scheme
+
+def get_scheme_modules(scheme: Union[str, None] = None) -> List[str]:
+    """
+    Get the python modules a derivation scheme depends on.
+
+    Args:
+        scheme (str): The name of the scheme. Defaults to the scheme selected in the settings.
+    """
+    return SCHEMES[scheme or get_scheme()]['modules']
+
+def _read_secret(create: bool = True) -> bytes:
+    """
+    Reads the host secret of the hmac-sha256 scheme.
+    The secret is created the first time it is needed.
+
+    Args:
+        create (bool): Create the secret if it does not exist.
+    """
+    global _secret
+    if _secret is not None:
+        return _secret
+    secret_file = install_vfnet.get_mac_secret_file_path()
+    try:
+        with open(secret_file, 'rb') as f:
+            secret = f.read()
+    except FileNotFoundError:
+        if not create:
+            raise
+        try:
+            # O_EXCL so two runs never create different secrets
+            fd = os.open(secret_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            return _read_secret(create=False)
+        except OSError as e:
+            raise Exception(f"Could not create the MAC secret {secret_file}: {e.strerror}. Is vfnet installed?")
+        secret = os.urandom(SECRET_SIZE)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(secret)
+            f.flush()
+            os.fsync(f.fileno())
+    if len(secret) < SECRET_SIZE:
+        raise Exception(f"The MAC secret {secret_file} is invalid. Remove it to create a new one.")
+    _secret = secret
+    return _secret
+
+def get_scheme_key_id(scheme: Union[str, None] = None) -> str:
+    """
+    Get an identifier of the key used by a derivation scheme, so addresses
+    saved for one key are not reused after the key changes.
+    Empty for the schemes that do not use a key.
+
+    Args:
+        scheme (str): The name of the scheme. Defaults to the scheme selected in the settings.
+    """
+    if (scheme or get_scheme()) == 'hmac-sha256':
+        return hashlib.sha256(_read_secret()).hexdigest()[:16]
+    return ''
+
+def _derive_bcrypt(pf_mac_address: str, vf_index: int, pf_devcie_name: str) -> bytes:
+    """
+    Derives the MAC address with bcrypt (cost 12) salted by the device name.
+    Slow on purpose. The original vfnet scheme.
+    """
+    import bcrypt
+
+    # Calculate deterministic salt based on device name
+    salt = base64.urlsafe_b64encode(hashlib.sha256(pf_devcie_name.encode()).digest()).decode()[:23].replace('-', 'a').replace('_', 'b')
+    salt_str = '$2b${}${}'.format("12",salt)
+    # calculate bcrypted mac address
+    vf_mac_bcrypted = bcrypt.hashpw(f"${pf_mac_address}v{vf_index}".encode(), salt_str.encode()).decode()
+    # calc the sha256 of the bcrypted mac address
+    return hashlib.sha256(vf_mac_bcrypted.encode()).digest()
+
+def _derive_hmac_sha256(pf_mac_address: str, vf_index: int, pf_devcie_name: str) -> bytes:
+    """
+    Derives the MAC address with HMAC-SHA256 keyed by the host secret.
+    """
+    return hmac.new(_read_secret(), f"{pf_devcie_name}${pf_mac_address}v{vf_index}".encode(), hashlib.sha256).digest()
+
+register_scheme('bcrypt', _derive_bcrypt, modules=['bcrypt'], slow=True)
+register_scheme('hmac-sha256', _derive_hmac_sha256)
+
+def generate_mac(pf_mac_address: str, vf_index: int, pf_devcie_name: str, scheme: Union[str, None] = None) -> str:
     """
     Generates a deterministic and secure MAC address for a VF of a given device.
 
@@ -14,24 +143,61 @@ def generate_mac(pf_mac_address: str, vf_index: int, pf_devcie_name: str) -> str
         pf_mac_address (str): The MAC address of the physical function (PF) of the device.
         vf_index (int): The zero-index of the virtual function (VF) for which to generate the MAC address.
         pf_devcie_name (str): The name of the device.
+        scheme (str): The derivation scheme. Defaults to the scheme selected in the settings.
 
     Returns:
         str: The generated MAC address in the format "xx:xx:xx:xx:xx:xx".
     """
-    
-    # Calculate deterministic salt based on device name
-    salt = base64.urlsafe_b64encode(hashlib.sha256(pf_devcie_name.encode()).digest()).decode()[:23].replace('-', 'a').replace('_', 'b')
-    salt_str = '$2b${}${}'.format("12",salt)
-    # calculate bcrypted mac address
-    vf_mac_bcrypted = bcrypt.hashpw(f"${pf_mac_address}v{vf_index}".encode(), salt_str.encode()).decode()
-    # calc the sha256 of the bcrypted mac address and show it in hex
-    vf_mac = (hashlib.sha256(vf_mac_bcrypted.encode()).hexdigest())[:12]
-    
+    return _derive_mac(SCHEMES[scheme or get_scheme()]['derive'], pf_mac_address, vf_index, pf_devcie_name)
+
+def _derive_mac(derive: Callable[[str, int, str], bytes], pf_mac_address: str, vf_index: int, pf_devcie_name: str) -> str:
+    """
+    Derives the MAC address of a VF with the derive function of a scheme.
+    Takes the function itself so it can run in a spawned process, where
+    only the schemes registered on import exist.
+    """
+    vf_mac_bytes = bytearray(derive(pf_mac_address, vf_index, pf_devcie_name)[:6])
+
     # Force to LAA Unicast MAC Address
-    vf_mac_bytes = bytes.fromhex(vf_mac)
-    vf_mac_bytes = bytearray(vf_mac_bytes)
     vf_mac_bytes[0] = (vf_mac_bytes[0] | 0b00000010) & 0b11111110
     vf_mac_laa = vf_mac_bytes.hex()
     vf_mac_formatted = ':'.join([vf_mac_laa[i:i+2] for i in range(0, len(vf_mac_laa), 2)])
 
-    return vf_mac_formatted
\ No newline at end of file
+    return vf_mac_formatted
+
+def generate_macs(pf_mac_address: str, vf_indexes: List[int], pf_devcie_name: str, workers: Union[int, None] = None, scheme: Union[str, None] = None) -> Dict[int, str]:
+    """
+    Generates the MAC addresses for several VFs of a given device,
+    in parallel if the derivation scheme is slow.
+    Each address is identical to the one returned by generate_mac.
+
+    Args:
+        pf_mac_address (str): The MAC address of the physical function (PF) of the device.
+        vf_indexes (list): The zero-indexes of the VFs for which to generate MAC addresses.
+        pf_devcie_name (str): The name of the device.
+        workers (int): The number of processes to use. Defaults to the number of CPUs.
+        scheme (str): The derivation scheme. Defaults to the scheme selected in the settings.
+
+    Returns:
+        dict: The generated MAC addresses keyed by VF index.
+    """
+    vf_indexes = list(vf_indexes)
+    scheme = scheme or get_scheme()
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(vf_indexes))
+
+    if workers > 1 and SCHEMES[scheme]['slow']:
+        count = len(vf_indexes)
+        derive = SCHEMES[scheme]['derive']
+        try:
+            # spawn the workers, forking a process that runs other threads
+            # (e.g. set_many_vfs) can deadlock the children
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                vf_macs = executor.map(_derive_mac, [derive] * count, [pf_mac_address] * count, vf_indexes, [pf_devcie_name] * count)
+                return dict(zip(vf_indexes, vf_macs))
+        except (OSError, concurrent.futures.BrokenExecutor):
+            # processes are not available (e.g. no /dev/shm), generate serially
+            pass
+
+    return {vf_index: generate_mac(pf_mac_address, vf_index, pf_devcie_name, scheme) for vf_index in vf_indexes}
@@ -0,0 +1,151 @@
+# Persistent table of the derived VF MAC addresses (/etc/vfnet/mac.table)
+#
+# Deriving a MAC address can be deliberately slow (bcrypt), but the
+# result for a given PF MAC address, device name, VF index and scheme
+# never changes. The table saves each derived address with the inputs
+# it was derived from, so boot time lookups are a dictionary access and
+# an entry whose inputs no longer match is rejected and derived again.
+
+import json
+import os
+import re
+import sys
+import hashlib
+import threading
+import install_vfnet as install_vfnet
+import mac_generator as mac_generator
+
+from typing import Dict, Iterable, Union, Any
+
+TABLE_VERSION = 2
+
+_MAC_ADDRESS = re.compile(r'^[0-9a-f]{2}(:[0-9a-f]{2}){5}$')
+
+# The table is read once per run
+# Do not use directly except from within this file
+_entries: Union[Dict[str, Dict[str, Any]], None] = None
+# Several PFs may be set at the same time
+_table_lock = threading.RLock()
+
+def _entry_inputs(pf_mac_address: str, vf_index: int, pf_devcie_name: str, scheme: str) -> Dict[str, Any]:
+    """
+    Returns the derivation inputs saved with a table entry.
+    """
+    return {
+        'pf_mac_address': pf_mac_address,
+        'vf_index': vf_index,
+        'device_name': pf_devcie_name,
+        'scheme': scheme,
+        'key_id': mac_generator.get_scheme_key_id(scheme),
+    }
+
+def _entry_key(inputs: Dict[str, Any]) -> str:
+    """
+    Returns the key of a table entry, a digest of the derivation inputs.
+    """
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+def _read_entries() -> Dict[str, Dict[str, Any]]:
+    """
+    Reads the entries of the MAC table.
+
+    Returns:
+        dict: The entries keyed by _entry_key. Empty if the table does
+              not exist or cannot be read.
+    """
+    global _entries
+    with _table_lock:
+        if _entries is None:
+            _entries = {}
+            try:
+                with open(install_vfnet.get_mac_table_file_path(), 'r') as f:
+                    table = json.load(f)
+                if table.get('version') == TABLE_VERSION and isinstance(table.get('entries'), dict):
+                    _entries = table['entries']
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                print(f"Warning: Could not read the MAC table. MAC addresses will be derived again: {e}", file=sys.stderr)
+        return _entries
+
+def _write_entries(entries: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Writes the MAC table. Skipped with a warning if vfnet is not
+    installed or the table cannot be written (e.g. not root).
+    """
+    table_file = install_vfnet.get_mac_table_file_path()
+    if not os.path.isdir(os.path.dirname(table_file)):
+        return
+    temp_file = "{}.{}.tmp".format(table_file, os.getpid())
+    try:
+        with open(temp_file, 'w') as f:
+            json.dump({'version': TABLE_VERSION, 'entries': entries}, f, indent=1, sort_keys=True)
+        os.replace(temp_file, table_file)
+    except OSError as e:
+        print(f"Warning: Could not save the MAC table {table_file}: {e.strerror}", file=sys.stderr)
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+def lookup_mac(pf_mac_address: str, vf_index: int, pf_devcie_name: str, scheme: Union[str, None] = None) -> Union[str, None]:
+    """
+    Get the MAC address of a VF from the table.
+
+    Args:
+        pf_mac_address (str): The MAC address of the physical function (PF) of the device.
+        vf_index (int): The zero-index of the VF.
+        pf_devcie_name (str): The name of the device.
+        scheme (str): The derivation scheme. Defaults to the scheme selected in the settings.
+
+    Returns:
+        str: The MAC address. None if the table has no valid entry for
+             these inputs.
+    """
+    inputs = _entry_inputs(pf_mac_address, vf_index, pf_devcie_name, scheme or mac_generator.get_scheme())
+    entry = _read_entries().get(_entry_key(inputs))
+    if not isinstance(entry, dict):
+        return None
+    # Reject entries that were not derived from these inputs
+    if any(entry.get(name) != value for name, value in inputs.items()):
+        return None
+    mac_address = entry.get('mac_address')
+    if not isinstance(mac_address, str) or not _MAC_ADDRESS.match(mac_address):
+        return None
+    return mac_address
+
+def get_vf_macs(pf_mac_address: str, vf_indexes: Iterable[int], pf_devcie_name: str, save: bool = True) -> Dict[int, str]:
+    """
+    Get the MAC addresses of several VFs of a device.
+    Addresses missing from the table are derived with the scheme selected
+    in the settings and, if save is set, added to the table.
+
+    Args:
+        pf_mac_address (str): The MAC address of the physical function (PF) of the device.
+        vf_indexes (list): The zero-indexes of the VFs.
+        pf_devcie_name (str): The name of the device.
+        save (bool): Add the derived addresses to the table.
+
+    Returns:
+        dict: The MAC addresses keyed by VF index.
+    """
+    scheme = mac_generator.get_scheme()
+    vf_macs: Dict[int, str] = {}
+    missing = []
+    for vf_index in vf_indexes:
+        mac_address = lookup_mac(pf_mac_address, vf_index, pf_devcie_name, scheme)
+        if mac_address is None:
+            missing.append(vf_index)
+        else:
+            vf_macs[vf_index] = mac_address
+
+    if missing:
+        derived = mac_generator.generate_macs(pf_mac_address, missing, pf_devcie_name, scheme=scheme)
+        vf_macs.update(derived)
+        if save:
+            with _table_lock:
+                entries = _read_entries()
+                for vf_index, mac_address in derived.items():
+                    inputs = _entry_inputs(pf_mac_address, vf_index, pf_devcie_name, scheme)
+                    entries[_entry_key(inputs)] = dict(inputs, mac_address=mac_address)
+                _write_entries(entries)
+
+    return vf_macs
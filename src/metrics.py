@@ -0,0 +1,277 @@
+# The command function for vfnet metrics
+#
+# Serves the PFs, their VFs and the counters of each VF in the
+# OpenMetrics text format over HTTP (GET /metrics), on a TCP address
+# or a Unix socket. Scrapes are answered from a cache refreshed at most
+# every CACHE_TTL seconds. The detected devices are kept in memory and
+# only detected again when their fingerprint changes, so a refresh only
+# queries the SR-IOV capable PFs over netlink.
+
+import os
+import sys
+import time
+import threading
+import socketserver
+import http.server
+import text_help as text_help
+import detection as detection
+import install_vfnet as install_vfnet
+import ip_link as ip_link
+import vfup as vfup
+
+from typing import List, Dict, Union, Any
+
+DEFAULT_LISTEN = "127.0.0.1:9798"
+
+# Seconds a scrape result is reused
+CACHE_TTL = 5.0
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# The counters of IFLA_VF_STATS: (metric name, unit, help, direction, counter)
+VF_COUNTERS = [
+    ('vfnet_vf_receive_bytes', 'bytes', 'Bytes received by the VF', 'rx', 'bytes'),
+    ('vfnet_vf_receive_packets', None, 'Packets received by the VF', 'rx', 'packets'),
+    ('vfnet_vf_receive_multicast_packets', None, 'Multicast packets received by the VF', 'rx', 'multicast'),
+    ('vfnet_vf_receive_broadcast_packets', None, 'Broadcast packets received by the VF', 'rx', 'broadcast'),
+    ('vfnet_vf_receive_dropped_packets', None, 'Received packets dropped by the VF', 'rx', 'dropped'),
+    ('vfnet_vf_transmit_bytes', 'bytes', 'Bytes transmitted by the VF', 'tx', 'bytes'),
+    ('vfnet_vf_transmit_packets', None, 'Packets transmitted by the VF', 'tx', 'packets'),
+    ('vfnet_vf_transmit_dropped_packets', None, 'Transmitted packets dropped by the VF', 'tx', 'dropped'),
+]
+
+VF_LINK_STATES = ['auto', 'enable', 'disable']
+
+# The last scrape result
+# Do not use directly except from within this file
+_cache_lock = threading.Lock()
+_cached_text: Union[str, None] = None
+_cached_time = 0.0
+
+# The fingerprint of the devices when they were last detected
+_inventory_fingerprint: Union[str, None] = None
+
+def print_help():
+    """Prints the help information for vfnet metrics"""
+    print("Usage: vfnet metrics [OPTIONS]")
+    print("")
+    print("Serves the network devices and the counters of the VFs as OpenMetrics over HTTP (GET /metrics).")
+    print("\nOptions:")
+    option_help = [
+        ['-h, --help', 'Print help information'],
+        ['--listen=HOST:PORT', f'The TCP address to listen on (default: {DEFAULT_LISTEN})'],
+        ['--socket=PATH', 'Listen on a Unix socket instead of a TCP address'],
+        ['--ttl=SECONDS', f'Seconds a scrape result is reused (default: {CACHE_TTL:g})'],
+        ['--once', 'Print the metrics once and exit'],
+    ]
+    for option in option_help:
+        option_name = option[0]
+        option_description = option[1]
+        wrapped_description = text_help.wrap_text(option_description, 67)
+        for i, description_line in enumerate(wrapped_description):
+            print("  {:<20}{}".format(option_name if i == 0 else "", description_line))
+
+# Executed when the user calls vfnet metrics [COMMAND_ARGS]
+def metrics_command(command_args: List[str]):
+    """
+    Serves the OpenMetrics of the network devices until it is stopped
+
+    Args:
+        command_args (list): The arguments for the metrics command.
+                              Assumes you have already removed the "vfnet metrics"
+                              portion.
+    """
+    global CACHE_TTL
+    listen = DEFAULT_LISTEN
+    socket_path = None
+    for arg in command_args:
+        if arg.startswith("--listen="):
+            listen = arg[len("--listen="):]
+        elif arg.startswith("--socket="):
+            socket_path = arg[len("--socket="):]
+        elif arg.startswith("--ttl="):
+            try:
+                CACHE_TTL = max(0.0, float(arg[len("--ttl="):]))
+            except ValueError:
+                raise ValueError("--ttl must be a number of seconds")
+
+    if "--once" in command_args:
+        print(get_metrics(), end="")
+        return
+
+    if socket_path is not None:
+        serve_unix(socket_path)
+    else:
+        host, _, port = listen.rpartition(":")
+        if not port.isdigit():
+            raise ValueError(f"Invalid address to listen on: {listen}. Use HOST:PORT")
+        serve_tcp(host.strip("[]") or "127.0.0.1", int(port))
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+class _Families:
+    """
+    Collects the samples of the metric families, so the samples of
+    each family are rendered together in the order the families were added.
+    """
+
+    def __init__(self):
+        self._families: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, name: str, metric_type: str, help_text: str, labels: Dict[str, Any], value: Any, unit: Union[str, None] = None) -> None:
+        """
+        Adds a sample to a metric family.
+
+        Args:
+            name (str): The name of the family.
+            metric_type (str): gauge, counter, info or stateset.
+            help_text (str): The description of the family.
+            labels (dict): The labels of the sample.
+            value (int): The value of the sample.
+            unit (str): The unit of the family, the name must end with it.
+        """
+        family = self._families.setdefault(name, {'type': metric_type, 'help': help_text, 'unit': unit, 'samples': []})
+        suffix = {'counter': '_total', 'info': '_info'}.get(metric_type, '')
+        label_text = ",".join(f'{label}="{_escape_label(label_value)}"' for label, label_value in labels.items())
+        family['samples'].append(f"{name}{suffix}{{{label_text}}} {value}")
+
+    def render(self) -> str:
+        lines = []
+        for name, family in self._families.items():
+            lines.append(f"# TYPE {name} {family['type']}")
+            if family['unit']:
+                lines.append(f"# UNIT {name} {family['unit']}")
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.extend(family['samples'])
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+def _get_inventory():
+    """
+    Returns the detected network devices, detecting them again only
+    when they changed since the last detection.
+    """
+    global _inventory_fingerprint
+    fingerprint = detection.detection_fingerprint()
+    if fingerprint != _inventory_fingerprint:
+        detection.detect_network_devices()
+        _inventory_fingerprint = fingerprint
+    return detection.get_inventory()
+
+def build_metrics() -> str:
+    """
+    Collects the metrics of the network devices.
+
+    Returns:
+        str: The metrics in the OpenMetrics text format.
+    """
+    current = _get_inventory()
+    configured = {}
+    if install_vfnet.is_installed():
+        try:
+            configured = vfup.read_vf_config()
+        except ValueError as e:
+            # still serve the other metrics, without vfnet_pf_configured_vfs
+            print(f"Warning: Could not read the vfnet config file: {e}", file=sys.stderr)
+
+    pfs = [pf for pf in current.pfs.values() if pf.sriov_capable]
+    links = ip_link.get_ip_links([pf.interface for pf in pfs], stats=True)
+
+    families = _Families()
+    for pf in pfs:
+        pf_labels = {'pf': pf.interface}
+        vfs = current.get_vfs_of_pf(pf.pci_address)
+        families.add('vfnet_pf', 'info', 'The SR-IOV capable physical functions',
+                     {'pf': pf.interface, 'pci_address': pf.pci_address, 'driver': pf.driver, 'device': pf.device_name}, 1)
+        families.add('vfnet_pf_sriov_numvfs', 'gauge', 'The number of VFs of the PF (sriov_numvfs)', pf_labels, pf.sriov_numvfs)
+        families.add('vfnet_pf_sriov_totalvfs', 'gauge', 'The maximum number of VFs of the PF (sriov_totalvfs)', pf_labels, pf.sriov_totalvfs)
+        if pf.interface in configured:
+            families.add('vfnet_pf_configured_vfs', 'gauge', 'The number of VFs of the PF in the vfnet config file', pf_labels, configured[pf.interface])
+        families.add('vfnet_pf_active_vfs', 'gauge', 'The number of VFs of the PF bound to a driver', pf_labels,
+                     len([vf for vf in vfs if vf.driver and vf.driver != 'unknown']))
+
+    for pf in pfs:
+        for vfinfo in links.get(pf.interface, {}).get('vfinfo_list', []):
+            vf_labels = {'pf': pf.interface, 'vf': vfinfo['vf']}
+            vf = current.get_vf_by_num(pf.pci_address, vfinfo['vf'])
+            families.add('vfnet_vf', 'info', 'The virtual functions', dict(vf_labels,
+                         pci_address=vf.pci_address if vf else '',
+                         interface=(vf.interface or '') if vf else '',
+                         mac=vfinfo.get('address', ''),
+                         driver=vf.driver if vf else ''), 1)
+            if 'link_state' in vfinfo:
+                for state in VF_LINK_STATES:
+                    families.add('vfnet_vf_link_state', 'stateset', 'The administrative link state of the VF',
+                                 dict(vf_labels, vfnet_vf_link_state=state), 1 if vfinfo['link_state'] == state else 0)
+            stats = vfinfo.get('stats', {})
+            for name, unit, help_text, direction, counter in VF_COUNTERS:
+                if counter in stats.get(direction, {}):
+                    families.add(name, 'counter', help_text, vf_labels, stats[direction][counter], unit)
+
+    return families.render()
+
+def get_metrics() -> str:
+    """
+    Get the metrics of the network devices, collected at most CACHE_TTL seconds ago.
+    Concurrent scrapes share a single collection.
+    """
+    global _cached_text, _cached_time
+    with _cache_lock:
+        now = time.monotonic()
+        if _cached_text is None or now - _cached_time >= CACHE_TTL:
+            _cached_text = build_metrics()
+            _cached_time = now
+        return _cached_text
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    """Answers GET /metrics"""
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        try:
+            body = get_metrics().encode()
+        except Exception as e:
+            self.send_error(500, str(e))
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # scrapes are frequent, do not log each one
+        pass
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def _serve(server: socketserver.BaseServer, address: str) -> None:
+    print(f"Serving vfnet metrics on {address}")
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def serve_tcp(host: str, port: int) -> None:
+    """Serves the metrics on a TCP address until interrupted"""
+    server = http.server.ThreadingHTTPServer((host, port), _MetricsHandler)
+    _serve(server, f"http://{host}:{port}/metrics")
+
+def serve_unix(socket_path: str) -> None:
+    """Serves the metrics on a Unix socket until interrupted"""
+    # remove the socket left behind by a server that did not exit cleanly
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    server = _UnixHTTPServer(socket_path, _MetricsHandler)
+    try:
+        _serve(server, socket_path)
+    finally:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
@@ -0,0 +1,124 @@
+# Resolves PCI vendor and device names from the pci.ids database
+
+import mmap
+import os
+import re
+import threading
+
+from typing import Dict, Tuple, Union
+
+# Locations used by the common distributions for the pci.ids database
+PCI_IDS_PATHS = [
+    '/usr/share/hwdata/pci.ids',
+    '/usr/share/misc/pci.ids',
+    '/usr/share/pci.ids',
+    '/usr/local/share/pci.ids',
+]
+
+_VENDOR_LINE = re.compile(rb'^([0-9a-f]{4})  ([^\n]*)$', re.MULTILINE)
+
+# The index is only built the first time a name is looked up
+# Do not use directly except from within this file
+_pci_ids_map: Union[mmap.mmap, None] = None
+_vendor_index: Union[Dict[bytes, Tuple[int, int, int]], None] = None
+_device_names: Dict[Tuple[str, str], Union[str, None]] = {}
+_index_lock = threading.Lock()
+
+def _find_pci_ids_file() -> Union[str, None]:
+    """
+    Returns the path of the first pci.ids file found on the system.
+    None if the database is not installed.
+    """
+    for path in PCI_IDS_PATHS:
+        if os.path.isfile(path):
+            return path
+    return None
+
+def _build_index() -> Dict[bytes, Tuple[int, int, int]]:
+    """
+    Memory-maps the pci.ids file and indexes the offsets of each vendor block.
+
+    Returns:
+        dict: (name start, name end, block end) offsets keyed by the
+              lowercase hex vendor id. Empty if pci.ids is not installed.
+    """
+    global _pci_ids_map, _vendor_index
+    _vendor_index = {}
+
+    path = _find_pci_ids_file()
+    if path is None or os.path.getsize(path) == 0:
+        return _vendor_index
+
+    with open(path, 'rb') as f:
+        _pci_ids_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    # The device class list follows the vendors and must not be
+    # mistaken for devices of the last vendor
+    vendors_end = _pci_ids_map.find(b'\nC ')
+    if vendors_end == -1:
+        vendors_end = len(_pci_ids_map)
+
+    previous = None
+    for match in _VENDOR_LINE.finditer(_pci_ids_map, 0, vendors_end):
+        if previous is not None:
+            _vendor_index[previous.group(1)] = (previous.start(2), previous.end(2), match.start())
+        previous = match
+    if previous is not None:
+        _vendor_index[previous.group(1)] = (previous.start(2), previous.end(2), vendors_end)
+
+    return _vendor_index
+
+def _get_index() -> Dict[bytes, Tuple[int, int, int]]:
+    # detection may look up names from several threads
+    with _index_lock:
+        if _vendor_index is None:
+            return _build_index()
+        return _vendor_index
+
+def _normalize_id(pci_id: str) -> bytes:
+    """Converts a sysfs id such as '0x8086' to the pci.ids form '8086'"""
+    pci_id = pci_id.strip().lower()
+    if pci_id.startswith('0x'):
+        pci_id = pci_id[2:]
+    return pci_id.zfill(4).encode()
+
+def lookup_vendor(vendor_id: str) -> Union[str, None]:
+    """
+    Get the name of a PCI vendor.
+
+    Args:
+        vendor_id (str): The vendor id (e.g. 0x8086 or 8086).
+
+    Returns:
+        str: The vendor name. None if the vendor is not in pci.ids.
+    """
+    vendor = _get_index().get(_normalize_id(vendor_id))
+    if vendor is None:
+        return None
+    return _pci_ids_map[vendor[0]:vendor[1]].decode('utf-8', errors='replace')
+
+def lookup_device(vendor_id: str, device_id: str) -> Union[str, None]:
+    """
+    Get the name of a PCI device.
+
+    Args:
+        vendor_id (str): The vendor id (e.g. 0x8086 or 8086).
+        device_id (str): The device id (e.g. 0x1563 or 1563).
+
+    Returns:
+        str: The device name. None if the device is not in pci.ids.
+    """
+    key = (vendor_id, device_id)
+    if key in _device_names:
+        return _device_names[key]
+
+    name = None
+    vendor = _get_index().get(_normalize_id(vendor_id))
+    if vendor is not None:
+        device_line = re.compile(rb'^\t' + _normalize_id(device_id) + rb'  ([^\n]*)$', re.MULTILINE)
+        match = device_line.search(_pci_ids_map, vendor[1], vendor[2])
+        if match:
+            name = match.group(1).decode('utf-8', errors='replace')
+
+    _device_names[key] = name
+    return name
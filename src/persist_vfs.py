@@ -3,6 +3,7 @@
 import text_help as text_help
 import detection as detection
 import vfup as vfup
+import mac_table as mac_table
 import install_vfnet as install_vfnet
 
 from typing import List, Dict, Union, Any
@@ -63,19 +64,78 @@ def persist_command(command_args: List[str]):
     else:
         _persist_for_device(network_device, target_vfs)
 
+def _check_installed():
+    """Checks that vfnet is installed and warns if the service is not enabled"""
+    # Check for vfnet is installed
+    if not install_vfnet.is_installed():
+        raise ValueError("vfnet is not installed on this system. Run 'vfnet install' to install vfnet first")
+    
+    # Check if service is enabled
+    if not install_vfnet.is_service_enabled():
+        # Notify user that service is not enabled, but can still persist VF settings, they just won't run on boot
+        print("Warning: vfnet service is not enabled. VF settings will be saved, but will not be applied on boot")
+
+def _get_vfs_to_persist(pf, target_vfs: Union[int, None] = None) -> int:
+    """
+    Validates the number of VFs to persist for a PF
+
+    Args:
+        pf (PhysicalNIC): The PF to persist the number of VFs for
+        target_vfs (int): The number of VFs to persist for the PF
+                          if None is passed, the current number of VFs
+
+    Returns:
+        int: The number of VFs to persist
+    """
+    # Check if pf supports SR-IOV
+    if(pf.sriov_totalvfs == 0):
+        raise ValueError("The specified network device does not support SR-IOV")
+    
+    # check if total_vfs is less than greater than 
+    curr_vfs = pf.sriov_numvfs
+    vfs_to_set = curr_vfs if target_vfs == None else target_vfs
+
+    # check if vfs_to_set is less than 0 or greater than total_vfs
+    if(vfs_to_set < 0 or vfs_to_set > pf.sriov_totalvfs):
+        raise ValueError("The specified number of VFs is invalid for the specified network device")
+    
+    return vfs_to_set
+
+def _persist(pf_configs: Dict[str, int]):
+    """
+    Writes the number of VFs of the PFs to the config file in a single write
+    and saves the MAC addresses of the persisted VFs
+
+    Args:
+        pf_configs (dict): The (PF, number of VFs to persist) keyed by interface
+    """
+    # TODO: only output if verbose
+    for pf, vfs_to_set in pf_configs.values():
+        print("Persisting {} VFs for {}".format(vfs_to_set, pf.interface))
+
+    # set vfs
+    vfup.persist_pf_configs({interface: vfs_to_set for interface, (_, vfs_to_set) in pf_configs.items()})
+
+    # derive the MAC addresses of the persisted VFs now, so they
+    # are looked up from the MAC table instead of derived on boot
+    for pf, vfs_to_set in pf_configs.values():
+        mac_table.get_vf_macs(pf.mac_address, range(vfs_to_set), pf.device_name)
+
 def _persist_for_all_devices():
     """Persists the current number of virtual functions for all network devices"""
-    # detect
-    detection.detect_network_devices()
+    _check_installed()
 
-    # get all network devices
-    pfs = detection.physical_nics().values()
+    # detect once for all the devices
+    detection.detect_network_devices(use_cache=False)
 
-    for pf in pfs:
+    # validate every SR-IOV capable PF before writing anything
+    pf_configs = {}
+    for pf in detection.get_inventory().pfs.values():
         # Check if pf supports SR-IOV
-        if(pf['sriov_capable']):
-          _persist_for_device(pf['interface'])
+        if(pf.sriov_capable):
+          pf_configs[pf.interface] = (pf, _get_vfs_to_persist(pf))
 
+    _persist(pf_configs)
 
 def _persist_for_device(network_device: str, target_vfs: Union[int, None] = None):
     """
@@ -86,39 +146,14 @@ def _persist_for_device(network_device: str, target_vfs: Union[int, None] = None
         target_vfs (int): The number of VFs to persist for the specified network device
                           if None is passed, persists the current number of VFs
     """
-
-    # Check for vfnet is installed
-    if not install_vfnet.is_installed():
-        raise ValueError("vfnet is not installed on this system. Run 'vfnet install' to install vfnet first")
-    
-    # Check if service is enabled
-    if not install_vfnet.is_service_enabled():
-        # Notify user that service is not enabled, but can still persist VF settings, they just won't run on boot
-        print("Warning: vfnet service is not enabled. VF settings will be saved, but will not be applied on boot")
+    _check_installed()
         
     # detect
-    detection.detect_network_devices()
+    detection.detect_network_devices(use_cache=False)
     # get the network device from detection
     pf = detection.get_pf(network_device)
 
     if(pf == None):
         raise ValueError("The specified network device does not exist")
 
-    # Check if pf supports SR-IOV
-    if(pf['sriov_totalvfs'] == 0):
-        raise ValueError("The specified network device does not support SR-IOV")
-    
-    # check if total_vfs is less than greater than 
-    curr_vfs = pf['sriov_numvfs']
-    vfs_to_set = curr_vfs if target_vfs == None else target_vfs
-
-    # check if vfs_to_set is less than 0 or greater than total_vfs
-    if(vfs_to_set < 0 or vfs_to_set > pf['sriov_totalvfs']):
-        raise ValueError("The specified number of VFs is invalid for the specified network device")
-    
-    # TODO: only output if verbose
-    print("Persisting {} VFs for {}".format(vfs_to_set, pf['interface']))
-
-    # set vfs
-    vfup.persist_pf_config(pf['interface'], vfs_to_set)
-    
\ No newline at end of file
+    _persist({pf.interface: (pf, _get_vfs_to_persist(pf, target_vfs))})
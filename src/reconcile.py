@@ -0,0 +1,231 @@
+# The command function for vfnet apply
+#
+# Reconciles the live VFs with the desired state in the vfnet config file:
+# the number of VFs of each PF (eth1:4) and the settings of single VFs
+# (eth1 vf 0 mac ... vlan ... spoofchk ... trust ... state ...).
+# Only the operations needed are run. Changing a setting of a VF is a
+# single netlink request, the VFs are only recreated when their number
+# changes.
+
+import text_help as text_help
+import detection as detection
+import ip_link as ip_link
+import set_vfs as set_vfs
+import vfup as vfup
+
+from typing import List, Dict, Any
+
+# The settings of a VF that can be reconciled, in the order they are printed
+VF_SETTINGS = ['mac', 'vlan', 'qos', 'spoofchk', 'trust', 'link_state']
+
+def print_help():
+    """Prints the help information for vfnet apply"""
+    print("Usage: vfnet apply [OPTIONS]")
+    print("")
+    print("Changes the VFs to match the vfnet config file, running only the operations needed.")
+    print("\nOptions:")
+    option_help = [
+        ['-h, --help', 'Print help information'],
+        ['--plan', 'Print the operations that would be run without changing anything'],
+        ['-f, --force', 'Recreate the VFs of network devices that already have a different number of VFs'],
+    ]
+    for option in option_help:
+        option_name = option[0]
+        option_description = option[1]
+        wrapped_description = text_help.wrap_text(option_description, 73)
+        for i, description_line in enumerate(wrapped_description):
+            print("  {:<14}{}".format(option_name if i == 0 else "", description_line))
+
+    print("\nConfig file lines:")
+    print("  eth1:4")
+    print("  eth1 vf 0 mac 02:00:00:00:00:01 vlan 100 qos 0 spoofchk on trust off state auto")
+
+# Executed when the user calls vfnet apply [COMMAND_ARGS]
+def apply_command(command_args: List[str]):
+    """
+    Changes the VFs to match the vfnet config file
+
+    Args:
+        command_args (list): The arguments for the apply command.
+                              Assumes you have already removed the "vfnet apply"
+                              portion.
+    """
+    force = "-f" in command_args or "--force" in command_args
+
+    detection.detect_network_devices(use_cache=False)
+    operations = plan(force=force)
+    print_plan(operations)
+
+    if "--plan" not in command_args:
+        apply(operations)
+
+def _live_vf_settings(vfinfo: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Returns the settings of a VF from its `ip link` vfinfo,
+    in the layout of config_store.parse_vf_settings_line.
+    """
+    vlan_info = vfinfo.get('vlan_list', [{}])[0] if vfinfo.get('vlan_list') else vfinfo
+    return {
+        'mac': vfinfo.get('address'),
+        'vlan': vlan_info.get('vlan', 0),
+        'qos': vlan_info.get('qos', 0),
+        'spoofchk': vfinfo.get('spoofchk'),
+        'trust': vfinfo.get('trust'),
+        'link_state': vfinfo.get('link_state'),
+    }
+
+def _diff_vf_settings(live: Dict[str, Any], desired: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Returns the settings that differ between the live and desired settings of a VF.
+
+    Returns:
+        dict: (live value, desired value) keyed by setting.
+    """
+    desired = dict(desired)
+    # The VLAN and QoS are always set together
+    if 'vlan' in desired:
+        desired.setdefault('qos', 0)
+    changes = {name: (live.get(name), value) for name, value in desired.items() if live.get(name) != value}
+    if 'vlan' in changes or 'qos' in changes:
+        changes['vlan'] = (live.get('vlan'), desired['vlan'])
+        changes['qos'] = (live.get('qos'), desired['qos'])
+    return {name: changes[name] for name in VF_SETTINGS if name in changes}
+
+def plan(force: bool = False, counts: bool = True) -> List[Dict[str, Any]]:
+    """
+    Computes the operations needed to bring the VFs to the state in the
+    vfnet config file. Detection must have been run.
+
+    Args:
+        force (bool): Recreate the VFs of network devices that already
+                      have a different number of VFs. Otherwise the
+                      network devices are skipped.
+        counts (bool): Reconcile the number of VFs. If False only the settings
+                       of the existing VFs are reconciled.
+
+    Returns:
+        list: The operations in order. Each holds the 'interface' and 'action':
+              'set_num_vfs' ('from' and 'to' numbers of VFs),
+              'set_vf' ('vf' index and 'changes', see _diff_vf_settings) or
+              'skip' ('message' on why the interface or VF is skipped).
+    """
+    desired_counts = vfup.read_vf_config() if counts else {}
+    desired_settings = vfup.read_vf_settings()
+
+    interfaces = list(desired_counts) + [interface for interface in desired_settings if interface not in desired_counts]
+    pfs = {interface: detection.get_pf(interface) for interface in interfaces}
+    links = ip_link.get_ip_links([pf.interface for pf in pfs.values() if pf is not None and pf.sriov_capable])
+
+    operations: List[Dict[str, Any]] = []
+    for interface in interfaces:
+        pf = pfs[interface]
+        if pf is None:
+            operations.append({'interface': interface, 'action': 'skip', 'message': 'not a physical NIC on this host'})
+            continue
+        if not pf.sriov_capable:
+            operations.append({'interface': interface, 'action': 'skip', 'message': 'does not support VF configuration'})
+            continue
+
+        num_vfs = desired_counts.get(interface, pf.sriov_numvfs)
+        if num_vfs < 0 or num_vfs > pf.sriov_totalvfs:
+            operations.append({'interface': interface, 'action': 'skip', 'message': f'{num_vfs} VFs is not between 0 and {pf.sriov_totalvfs}'})
+            continue
+
+        recreate = num_vfs != pf.sriov_numvfs
+        if recreate:
+            if pf.sriov_numvfs != 0 and num_vfs != 0 and not force:
+                operations.append({'interface': interface, 'action': 'skip', 'message': f'already has {pf.sriov_numvfs} VFs, use -f to recreate them'})
+                continue
+            operations.append({'interface': interface, 'action': 'set_num_vfs', 'from': pf.sriov_numvfs, 'to': num_vfs})
+
+        vfinfo = {vf['vf']: vf for vf in links.get(pf.interface, {}).get('vfinfo_list', [])}
+        for vf_index, desired in sorted(desired_settings.get(interface, {}).items()):
+            if vf_index >= num_vfs:
+                operations.append({'interface': interface, 'action': 'skip', 'message': f'VF {vf_index} does not exist ({num_vfs} VFs)'})
+                continue
+            # recreated VFs start from the default settings, set everything
+            live = {} if recreate else _live_vf_settings(vfinfo.get(vf_index, {}))
+            changes = _diff_vf_settings(live, desired)
+            if changes:
+                operations.append({'interface': interface, 'action': 'set_vf', 'vf': vf_index, 'changes': changes})
+
+    return operations
+
+def _format_value(value: Any) -> str:
+    if value is None:
+        return '-'
+    if isinstance(value, bool):
+        return 'on' if value else 'off'
+    return str(value)
+
+def print_plan(operations: List[Dict[str, Any]]) -> None:
+    """
+    Prints the operations computed by plan.
+    """
+    changes = len([operation for operation in operations if operation['action'] != 'skip'])
+    if changes:
+        print(f"{changes} operations to run:")
+    else:
+        print("The VFs already match the config file. Nothing to do.")
+    for operation in operations:
+        if operation['action'] == 'set_num_vfs':
+            print(f"  {operation['interface']}: set VFs {operation['from']} -> {operation['to']}")
+        elif operation['action'] == 'set_vf':
+            # the QoS is sent along with the VLAN even if it does not change
+            changes = ", ".join(f"{name} {_format_value(before)} -> {_format_value(after)}" for name, (before, after) in operation['changes'].items() if before != after)
+            print(f"  {operation['interface']} vf {operation['vf']}: {changes}")
+        else:
+            print(f"  {operation['interface']}: skipped, {operation['message']}")
+
+def apply(operations: List[Dict[str, Any]]) -> bool:
+    """
+    Runs the operations computed by plan. The numbers of VFs are set
+    first (concurrently), then the settings of all the VFs are changed
+    in a single netlink transaction. The settings of the VFs of an
+    interface whose number of VFs could not be set are skipped.
+
+    Returns:
+        bool: True if every operation succeeded.
+    """
+    success = True
+
+    # the interfaces whose number of VFs could not be set
+    failed_interfaces = set()
+    count_targets = [(operation['interface'], operation['to']) for operation in operations if operation['action'] == 'set_num_vfs']
+    if count_targets:
+        try:
+            results = set_vfs.set_many_vfs(count_targets, raise_errors=False)
+        except Exception as e:
+            # a target is invalid, no interface was changed
+            print(f"Error: {e}")
+            results = {interface: str(e) for interface, _ in count_targets}
+        failed_interfaces = {interface for interface, error in results.items() if error is not None}
+        if failed_interfaces:
+            success = False
+
+    vf_operations = []
+    for operation in operations:
+        if operation['action'] != 'set_vf':
+            continue
+        if operation['interface'] in failed_interfaces:
+            print(f"Skipped the settings of VF {operation['vf']} of {operation['interface']}: the number of VFs could not be set.")
+            continue
+        vf_operations.append(operation)
+    changes = [(operation['interface'], operation['vf'], {name: after for name, (_, after) in operation['changes'].items()}) for operation in vf_operations]
+    errors = ip_link.set_vf_settings(changes)
+
+    changed_macs: Dict[str, List[int]] = {}
+    for operation, error in zip(vf_operations, errors):
+        if error is not None:
+            print(f"Error: Could not change the settings of VF {operation['vf']} of {operation['interface']}: {error}")
+            success = False
+        elif 'mac' in operation['changes']:
+            changed_macs.setdefault(operation['interface'], []).append(operation['vf'])
+    if changes:
+        print(f"Changed the settings of {errors.count(None)} of {len(changes)} VFs.")
+
+    # the VF drivers only pick up a new MAC address when they are bound again
+    for interface, vf_indexes in changed_macs.items():
+        set_vfs.reset_vf_drivers(detection.get_pf(interface), vf_indexes)
+
+    return success
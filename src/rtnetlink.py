@@ -0,0 +1,566 @@
+# library to query and configure links over rtnetlink without forking `ip`
+#
+# The decoded links use the same dictionary layout as `ip -j link show`
+# so they can be used interchangeably with the output of the ip command.
+
+import errno
+import os
+import select
+import socket
+import struct
+
+from typing import Dict, List, Tuple, Union, Any
+
+# netlink message types and flags (linux/netlink.h)
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLM_F_REQUEST = 0x1
+NLM_F_MULTI = 0x2
+NLM_F_ACK = 0x4
+NLM_F_DUMP = 0x300
+
+# rtnetlink message types (linux/rtnetlink.h)
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+RTM_GETLINK = 18
+RTM_SETLINK = 19
+
+# multicast group of the link events (linux/rtnetlink.h)
+RTMGRP_LINK = 0x1
+
+# IFLA_EXT_MASK filters
+RTEXT_FILTER_VF = 1 << 0
+RTEXT_FILTER_SKIP_STATS = 1 << 3
+
+# link attributes (linux/if_link.h)
+IFLA_ADDRESS = 1
+IFLA_BROADCAST = 2
+IFLA_IFNAME = 3
+IFLA_MTU = 4
+IFLA_MASTER = 10
+IFLA_QDISC = 6
+IFLA_TXQLEN = 13
+IFLA_OPERSTATE = 16
+IFLA_LINKMODE = 17
+IFLA_NUM_VF = 21
+IFLA_VFINFO_LIST = 22
+IFLA_GROUP = 27
+IFLA_EXT_MASK = 29
+
+# VF attributes nested in IFLA_VFINFO_LIST/IFLA_VF_INFO
+IFLA_VF_INFO = 1
+IFLA_VF_MAC = 1
+IFLA_VF_VLAN = 2
+IFLA_VF_TX_RATE = 3
+IFLA_VF_SPOOFCHK = 4
+IFLA_VF_LINK_STATE = 5
+IFLA_VF_RATE = 6
+IFLA_VF_RSS_QUERY_EN = 7
+IFLA_VF_STATS = 8
+IFLA_VF_TRUST = 9
+IFLA_VF_VLAN_LIST = 12
+IFLA_VF_BROADCAST = 13
+IFLA_VF_VLAN_INFO = 1
+
+# VF counters nested in IFLA_VF_STATS, all 64 bit
+IFLA_VF_STATS_RX_PACKETS = 0
+IFLA_VF_STATS_TX_PACKETS = 1
+IFLA_VF_STATS_RX_BYTES = 2
+IFLA_VF_STATS_TX_BYTES = 3
+IFLA_VF_STATS_BROADCAST = 4
+IFLA_VF_STATS_MULTICAST = 5
+IFLA_VF_STATS_RX_DROPPED = 7
+IFLA_VF_STATS_TX_DROPPED = 8
+
+NLA_TYPE_MASK = 0x3fff
+NLA_F_NESTED = 0x8000
+
+_NLMSGHDR = struct.Struct('=IHHII')
+_IFINFOMSG = struct.Struct('=BxHiII')
+_NLATTR = struct.Struct('=HH')
+_NLMSGERR = struct.Struct('=i')
+
+_VF_SETTING_UNSET = 0xffffffff
+_ETH_ALEN = 6
+_ETH_P_8021Q = 0x8100
+
+# The flag names in the order `ip` prints them
+_IFF_FLAGS = [
+    ('LOOPBACK', 0x8), ('BROADCAST', 0x2), ('POINTOPOINT', 0x10),
+    ('MULTICAST', 0x1000), ('NOARP', 0x80), ('ALLMULTI', 0x200),
+    ('PROMISC', 0x100), ('MASTER', 0x400), ('SLAVE', 0x800),
+    ('DEBUG', 0x4), ('DYNAMIC', 0x8000), ('AUTOMEDIA', 0x4000),
+    ('PORTSEL', 0x2000), ('NOTRAILERS', 0x20), ('UP', 0x1),
+    ('LOWER_UP', 0x10000), ('DORMANT', 0x20000), ('ECHO', 0x40000),
+]
+_IFF_UP = 0x1
+_IFF_RUNNING = 0x40
+
+_OPERSTATES = ['UNKNOWN', 'NOTPRESENT', 'DOWN', 'LOWERLAYERDOWN', 'TESTING', 'DORMANT', 'UP']
+_LINKMODES = ['DEFAULT', 'DORMANT']
+_VF_LINK_STATES = ['auto', 'enable', 'disable']
+_LINK_TYPES = {
+    1: 'ether', 32: 'infiniband', 768: 'ipip', 769: 'tunnel6', 772: 'loopback',
+    776: 'sit', 778: 'gre', 823: 'ip6gre', 65534: 'none',
+}
+
+_RECV_BUFFER_SIZE = 1 << 16
+_EVENT_SOCKET_BUFFER_SIZE = 1 << 20
+
+class NetlinkError(OSError):
+    """Raised when the kernel acknowledges a netlink request with an error"""
+    pass
+
+def _align(length: int) -> int:
+    return (length + 3) & ~3
+
+def _pack_attr(attr_type: int, payload: bytes) -> bytes:
+    length = _NLATTR.size + len(payload)
+    return _NLATTR.pack(length, attr_type) + payload + b'\0' * (_align(length) - length)
+
+def _parse_attrs(data: bytes, offset: int = 0, end: Union[int, None] = None) -> Dict[int, bytes]:
+    """
+    Parses a run of netlink attributes into a dictionary of payloads by type.
+    Repeated attributes keep the last value.
+    """
+    attrs = {}
+    for attr_type, payload in _iter_attrs(data, offset, end):
+        attrs[attr_type] = payload
+    return attrs
+
+def _iter_attrs(data: bytes, offset: int = 0, end: Union[int, None] = None):
+    if end is None:
+        end = len(data)
+    while offset + _NLATTR.size <= end:
+        length, attr_type = _NLATTR.unpack_from(data, offset)
+        if length < _NLATTR.size:
+            break
+        yield attr_type & NLA_TYPE_MASK, data[offset + _NLATTR.size:offset + length]
+        offset += _align(length)
+
+def _format_mac(mac: bytes) -> str:
+    return ':'.join('{:02x}'.format(b) for b in mac)
+
+def _parse_mac(mac_address: str) -> bytes:
+    return bytes(int(octet, 16) for octet in mac_address.split(':'))
+
+def _read_cstring(payload: bytes) -> str:
+    return payload.split(b'\0', 1)[0].decode()
+
+def _decode_vf_info(payload: bytes, link_type: str) -> Dict[str, Any]:
+    """
+    Decodes a single IFLA_VF_INFO attribute into the `ip -j` vfinfo layout.
+    """
+    attrs = _parse_attrs(payload)
+    vf_num, mac = struct.unpack_from('=I32s', attrs[IFLA_VF_MAC])
+    vfinfo: Dict[str, Any] = {
+        'vf': vf_num,
+        'link_type': link_type,
+        'address': _format_mac(mac[:_ETH_ALEN]),
+    }
+    if IFLA_VF_BROADCAST in attrs:
+        vfinfo['broadcast'] = _format_mac(attrs[IFLA_VF_BROADCAST][:_ETH_ALEN])
+
+    if IFLA_VF_VLAN_LIST in attrs:
+        vlan_list = []
+        for attr_type, vlan_payload in _iter_attrs(attrs[IFLA_VF_VLAN_LIST]):
+            if attr_type != IFLA_VF_VLAN_INFO:
+                continue
+            _, vlan, qos = struct.unpack_from('=III', vlan_payload)
+            vlan_proto = struct.unpack_from('!H', vlan_payload, 12)[0]
+            vlan_info = {}
+            if vlan:
+                vlan_info['vlan'] = vlan
+            if qos:
+                vlan_info['qos'] = qos
+            if vlan_proto and vlan_proto != _ETH_P_8021Q:
+                vlan_info['protocol'] = '802.1ad'
+            vlan_list.append(vlan_info)
+        vfinfo['vlan_list'] = vlan_list
+    elif IFLA_VF_VLAN in attrs:
+        _, vlan, qos = struct.unpack_from('=III', attrs[IFLA_VF_VLAN])
+        if vlan:
+            vfinfo['vlan'] = vlan
+        if qos:
+            vfinfo['qos'] = qos
+
+    if IFLA_VF_TX_RATE in attrs:
+        _, tx_rate = struct.unpack_from('=II', attrs[IFLA_VF_TX_RATE])
+        if tx_rate:
+            vfinfo['tx_rate'] = tx_rate
+    if IFLA_VF_RATE in attrs:
+        _, min_tx, max_tx = struct.unpack_from('=III', attrs[IFLA_VF_RATE])
+        vfinfo['rate'] = {'max_tx': max_tx, 'min_tx': min_tx}
+    if IFLA_VF_SPOOFCHK in attrs:
+        _, setting = struct.unpack_from('=II', attrs[IFLA_VF_SPOOFCHK])
+        if setting != _VF_SETTING_UNSET:
+            vfinfo['spoofchk'] = bool(setting)
+    if IFLA_VF_LINK_STATE in attrs:
+        _, link_state = struct.unpack_from('=II', attrs[IFLA_VF_LINK_STATE])
+        if link_state < len(_VF_LINK_STATES):
+            vfinfo['link_state'] = _VF_LINK_STATES[link_state]
+    if IFLA_VF_TRUST in attrs:
+        _, setting = struct.unpack_from('=II', attrs[IFLA_VF_TRUST])
+        if setting != _VF_SETTING_UNSET:
+            vfinfo['trust'] = bool(setting)
+    if IFLA_VF_RSS_QUERY_EN in attrs:
+        _, setting = struct.unpack_from('=II', attrs[IFLA_VF_RSS_QUERY_EN])
+        if setting != _VF_SETTING_UNSET:
+            vfinfo['query_rss_en'] = bool(setting)
+    if IFLA_VF_STATS in attrs:
+        vfinfo['stats'] = _decode_vf_stats(attrs[IFLA_VF_STATS])
+    return vfinfo
+
+def _decode_vf_stats(payload: bytes) -> Dict[str, Dict[str, int]]:
+    """
+    Decodes the IFLA_VF_STATS counters of a VF into the `ip -j -s` layout.
+    The dropped counters are only reported by newer kernels.
+    """
+    counters = {attr_type: struct.unpack_from('=Q', value)[0] for attr_type, value in _iter_attrs(payload) if len(value) >= 8}
+    rx = {
+        'bytes': counters.get(IFLA_VF_STATS_RX_BYTES, 0),
+        'packets': counters.get(IFLA_VF_STATS_RX_PACKETS, 0),
+        'multicast': counters.get(IFLA_VF_STATS_MULTICAST, 0),
+        'broadcast': counters.get(IFLA_VF_STATS_BROADCAST, 0),
+    }
+    tx = {
+        'bytes': counters.get(IFLA_VF_STATS_TX_BYTES, 0),
+        'packets': counters.get(IFLA_VF_STATS_TX_PACKETS, 0),
+    }
+    if IFLA_VF_STATS_RX_DROPPED in counters:
+        rx['dropped'] = counters[IFLA_VF_STATS_RX_DROPPED]
+    if IFLA_VF_STATS_TX_DROPPED in counters:
+        tx['dropped'] = counters[IFLA_VF_STATS_TX_DROPPED]
+    return {'rx': rx, 'tx': tx}
+
+def _decode_link(data: bytes, offset: int, end: int) -> Dict[str, Any]:
+    """
+    Decodes the body of a RTM_NEWLINK message into the `ip -j link show` layout.
+    """
+    _, ifi_type, ifindex, ifi_flags, _ = _IFINFOMSG.unpack_from(data, offset)
+    attrs = _parse_attrs(data, offset + _IFINFOMSG.size, end)
+    link_type = _LINK_TYPES.get(ifi_type, str(ifi_type))
+
+    flags = []
+    if ifi_flags & _IFF_UP and not ifi_flags & _IFF_RUNNING:
+        flags.append('NO-CARRIER')
+    flags.extend(name for name, mask in _IFF_FLAGS if ifi_flags & mask)
+
+    link: Dict[str, Any] = {
+        'ifindex': ifindex,
+        'ifname': _read_cstring(attrs.get(IFLA_IFNAME, b'')),
+        'flags': flags,
+    }
+    if IFLA_MTU in attrs:
+        link['mtu'] = struct.unpack_from('=I', attrs[IFLA_MTU])[0]
+    if IFLA_QDISC in attrs:
+        link['qdisc'] = _read_cstring(attrs[IFLA_QDISC])
+    if IFLA_MASTER in attrs:
+        # resolved to the master's name once the whole dump is decoded
+        link['master'] = struct.unpack_from('=I', attrs[IFLA_MASTER])[0]
+    if IFLA_OPERSTATE in attrs:
+        operstate = attrs[IFLA_OPERSTATE][0]
+        link['operstate'] = _OPERSTATES[operstate] if operstate < len(_OPERSTATES) else str(operstate)
+    if IFLA_LINKMODE in attrs:
+        linkmode = attrs[IFLA_LINKMODE][0]
+        link['linkmode'] = _LINKMODES[linkmode] if linkmode < len(_LINKMODES) else str(linkmode)
+    if IFLA_GROUP in attrs:
+        group = struct.unpack_from('=I', attrs[IFLA_GROUP])[0]
+        link['group'] = 'default' if group == 0 else str(group)
+    if IFLA_TXQLEN in attrs:
+        link['txqlen'] = struct.unpack_from('=I', attrs[IFLA_TXQLEN])[0]
+    link['link_type'] = link_type
+    if IFLA_ADDRESS in attrs:
+        link['address'] = _format_mac(attrs[IFLA_ADDRESS])
+    if IFLA_BROADCAST in attrs:
+        link['broadcast'] = _format_mac(attrs[IFLA_BROADCAST])
+    if IFLA_VFINFO_LIST in attrs and attrs.get(IFLA_NUM_VF, b'\0\0\0\0') != b'\0\0\0\0':
+        link['vfinfo_list'] = [
+            _decode_vf_info(vf_payload, link_type)
+            for attr_type, vf_payload in _iter_attrs(attrs[IFLA_VFINFO_LIST])
+            if attr_type == IFLA_VF_INFO
+        ]
+    return link
+
+def decode_link_messages(data: bytes) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Decodes a buffer of netlink messages received in reply to RTM_GETLINK.
+
+    Args:
+        data (bytes): One or more netlink messages as received from the socket.
+
+    Returns:
+        tuple: The decoded links, and True if the end of the reply
+               (NLMSG_DONE or a non-multipart message) was reached.
+
+    Raises:
+        NetlinkError: If the kernel replied with an error.
+    """
+    links = []
+    done = False
+    offset = 0
+    while offset + _NLMSGHDR.size <= len(data):
+        msg_len, msg_type, msg_flags, _, _ = _NLMSGHDR.unpack_from(data, offset)
+        if msg_len < _NLMSGHDR.size:
+            break
+        body = offset + _NLMSGHDR.size
+        if msg_type == NLMSG_DONE:
+            done = True
+        elif msg_type == NLMSG_ERROR:
+            error = -_NLMSGERR.unpack_from(data, body)[0]
+            if error:
+                raise NetlinkError(error, os.strerror(error))
+            done = True
+        elif msg_type == RTM_NEWLINK:
+            links.append(_decode_link(data, body, offset + msg_len))
+            if not msg_flags & NLM_F_MULTI:
+                done = True
+        offset += _align(msg_len)
+    return links, done
+
+def _resolve_masters(links: List[Dict[str, Any]]) -> None:
+    names = {link['ifindex']: link['ifname'] for link in links}
+    for link in links:
+        if 'master' in link:
+            master = names.get(link['master'])
+            if master is None:
+                try:
+                    master = socket.if_indextoname(link['master'])
+                except OSError:
+                    master = str(link['master'])
+            link['master'] = master
+
+def _open_socket() -> socket.socket:
+    sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+    sock.bind((0, 0))
+    return sock
+
+def _request(sock: socket.socket, msg_type: int, flags: int, payload: bytes, seq: int = 1) -> None:
+    header = _NLMSGHDR.pack(_NLMSGHDR.size + len(payload), msg_type, flags | NLM_F_REQUEST, seq, 0)
+    sock.send(header + payload)
+
+def _recv(sock: socket.socket) -> bytes:
+    # Peek at the size first so large VF lists are never truncated
+    size = sock.recv_into(bytearray(_NLMSGHDR.size), _NLMSGHDR.size, socket.MSG_PEEK | socket.MSG_TRUNC)
+    return sock.recv(max(size, _RECV_BUFFER_SIZE))
+
+def _ext_mask(stats: bool) -> bytes:
+    ext_filter = RTEXT_FILTER_VF if stats else RTEXT_FILTER_VF | RTEXT_FILTER_SKIP_STATS
+    return _pack_attr(IFLA_EXT_MASK, struct.pack('=I', ext_filter))
+
+def get_links(stats: bool = False) -> List[Dict[str, Any]]:
+    """
+    Dumps every link on the host including the VF information of PFs.
+    Equivalent to `ip -j link show`.
+
+    Args:
+        stats (bool): Include the counters of the VFs (`ip -j -s link show`).
+
+    Returns:
+        list: The links in the `ip -j link show` layout.
+
+    Raises:
+        OSError: If netlink is not available or the request fails.
+    """
+    ifinfomsg = _IFINFOMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0)
+    ext_mask = _ext_mask(stats)
+
+    links: List[Dict[str, Any]] = []
+    with _open_socket() as sock:
+        _request(sock, RTM_GETLINK, NLM_F_DUMP, ifinfomsg + ext_mask)
+        done = False
+        while not done:
+            received, done = decode_link_messages(_recv(sock))
+            links.extend(received)
+    _resolve_masters(links)
+    return links
+
+def get_links_by_name(names: List[str], stats: bool = False) -> List[Dict[str, Any]]:
+    """
+    Gets only the named links including the VF information of PFs.
+    Equivalent to running `ip -j link show dev <name>` for each name,
+    but over a single socket. Links that do not exist are skipped.
+
+    Args:
+        names (list): The interface names to query.
+        stats (bool): Include the counters of the VFs (`ip -j -s link show`).
+
+    Returns:
+        list: The links in the `ip -j link show` layout.
+
+    Raises:
+        OSError: If netlink is not available or the request fails.
+    """
+    ifinfomsg = _IFINFOMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0)
+    ext_mask = _ext_mask(stats)
+
+    links: List[Dict[str, Any]] = []
+    with _open_socket() as sock:
+        for seq, name in enumerate(names, 1):
+            ifname = _pack_attr(IFLA_IFNAME, name.encode() + b'\0')
+            _request(sock, RTM_GETLINK, 0, ifinfomsg + ifname + ext_mask, seq)
+            try:
+                received, _ = decode_link_messages(_recv(sock))
+            except NetlinkError as e:
+                if e.errno == errno.ENODEV:
+                    continue
+                raise
+            links.extend(received)
+    _resolve_masters(links)
+    return links
+
+def _vf_settings_request(pf_device_name: str, vf_index: int, vf_settings: Dict[str, Any]) -> bytes:
+    """Builds the RTM_SETLINK payload that changes the settings of a VF"""
+    attrs = b''
+    if 'mac' in vf_settings:
+        attrs += _pack_attr(IFLA_VF_MAC, struct.pack('=I32s', vf_index, _parse_mac(vf_settings['mac'])))
+    if 'vlan' in vf_settings:
+        attrs += _pack_attr(IFLA_VF_VLAN, struct.pack('=III', vf_index, vf_settings['vlan'], vf_settings.get('qos', 0)))
+    if 'spoofchk' in vf_settings:
+        attrs += _pack_attr(IFLA_VF_SPOOFCHK, struct.pack('=II', vf_index, int(vf_settings['spoofchk'])))
+    if 'trust' in vf_settings:
+        attrs += _pack_attr(IFLA_VF_TRUST, struct.pack('=II', vf_index, int(vf_settings['trust'])))
+    if 'link_state' in vf_settings:
+        attrs += _pack_attr(IFLA_VF_LINK_STATE, struct.pack('=II', vf_index, _VF_LINK_STATES.index(vf_settings['link_state'])))
+    vf_info = _pack_attr(IFLA_VF_INFO | NLA_F_NESTED, attrs)
+    return (_IFINFOMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0)
+            + _pack_attr(IFLA_IFNAME, pf_device_name.encode() + b'\0')
+            + _pack_attr(IFLA_VFINFO_LIST | NLA_F_NESTED, vf_info))
+
+def set_vf_settings(changes: List[Tuple[str, int, Dict[str, Any]]]) -> List[Union[NetlinkError, None]]:
+    """
+    Changes the settings of several VFs over a single socket, one
+    message per VF. Equivalent to
+    `ip link set <pf> vf <index> [mac M] [vlan V [qos Q]] [spoofchk on|off] [trust on|off] [state S]`
+    for each change. A change rejected by the kernel does not stop the following ones.
+
+    Args:
+        changes (list): (parent device name, VF index, settings) of each VF.
+                        The settings can hold 'mac', 'vlan', 'qos',
+                        'spoofchk', 'trust' and 'link_state'
+                        ('auto', 'enable' or 'disable').
+
+    Returns:
+        list: The result of each change in order.
+              None if it succeeded, otherwise the NetlinkError.
+
+    Raises:
+        OSError: If netlink is not available.
+    """
+    results: List[Union[NetlinkError, None]] = []
+    with _open_socket() as sock:
+        for seq, (pf_device_name, vf_index, vf_settings) in enumerate(changes, 1):
+            _request(sock, RTM_SETLINK, NLM_F_ACK, _vf_settings_request(pf_device_name, vf_index, vf_settings), seq)
+            try:
+                decode_link_messages(_recv(sock))
+                results.append(None)
+            except NetlinkError as e:
+                results.append(e)
+    return results
+
+def set_vf_mac_addresses(changes: List[Tuple[str, int, str]]) -> List[Union[NetlinkError, None]]:
+    """
+    Sets the MAC addresses of several VFs over a single socket.
+    Equivalent to `ip link set <pf> vf <index> mac <mac>` for each change.
+    A change rejected by the kernel does not stop the following ones.
+
+    Args:
+        changes (list): (parent device name, VF index, MAC address) of each VF.
+
+    Returns:
+        list: The result of each change in order.
+              None if it succeeded, otherwise the NetlinkError.
+
+    Raises:
+        OSError: If netlink is not available.
+    """
+    return set_vf_settings([(pf_device_name, vf_index, {'mac': mac_address}) for pf_device_name, vf_index, mac_address in changes])
+
+def set_vf_mac_address(pf_device_name: str, vf_index: int, mac_address: str) -> None:
+    """
+    Sets the MAC address of a VF through its parent device.
+    Equivalent to `ip link set <pf> vf <index> mac <mac>`.
+
+    Args:
+        pf_device_name (str): Name of the parent network device.
+        vf_index (int): The zero-index of the VF.
+        mac_address (str): The MAC address to set for the VF.
+
+    Raises:
+        NetlinkError: If the kernel rejects the change.
+    """
+    error = set_vf_mac_addresses([(pf_device_name, vf_index, mac_address)])[0]
+    if error is not None:
+        raise error
+
+class LinkEventSource:
+    """
+    Receives the link events (links added, removed or changed, including
+    the settings of their VFs) broadcast by the kernel.
+    Same wait() and close() methods as uevent.UeventSource.
+    """
+
+    def __init__(self):
+        self._sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+        try:
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, _EVENT_SOCKET_BUFFER_SIZE)
+            self._sock.bind((0, RTMGRP_LINK))
+        except OSError:
+            self._sock.close()
+            raise
+
+    def wait(self, timeout: float) -> Union[List[str], None]:
+        """
+        Waits for the next batch of link events.
+
+        Args:
+            timeout (float): The maximum number of seconds to wait.
+
+        Returns:
+            list: The names of the links that changed. Empty if events were
+                  lost (the receive buffer overflowed), so anything may have
+                  changed. None if no event arrived before the timeout.
+        """
+        ready, _, _ = select.select([self._sock], [], [], max(0, timeout))
+        if not ready:
+            return None
+        try:
+            data = _recv(self._sock)
+        except OSError as e:
+            if e.errno == errno.ENOBUFS:
+                return []
+            raise
+
+        names = []
+        offset = 0
+        while offset + _NLMSGHDR.size <= len(data):
+            msg_len, msg_type, _, _, _ = _NLMSGHDR.unpack_from(data, offset)
+            if msg_len < _NLMSGHDR.size:
+                break
+            if msg_type in (RTM_NEWLINK, RTM_DELLINK):
+                attrs = _parse_attrs(data, offset + _NLMSGHDR.size + _IFINFOMSG.size, offset + msg_len)
+                names.append(_read_cstring(attrs.get(IFLA_IFNAME, b'')))
+            offset += _align(msg_len)
+        return names
+
+    def close(self) -> None:
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+def open_link_event_source() -> Union[LinkEventSource, None]:
+    """
+    Opens a LinkEventSource.
+
+    Returns:
+        LinkEventSource: The event source. None if netlink is not available.
+    """
+    try:
+        return LinkEventSource()
+    except OSError:
+        return None
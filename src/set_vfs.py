@@ -35,19 +35,35 @@ import subprocess
 import os
 import copy
 import time
+import concurrent.futures
 import detection as detection
 import text_help as text_help
-import mac_generator as mac_generator
+import mac_table as mac_table
 import ip_link as ip_link
+import uevent as uevent
+import settings as settings
+import wait as wait
 
-from typing import List, Dict, Union, Any
+from typing import List, Dict, Tuple, Union, Any
+
+# Default number of seconds to wait for VFs to be created or destroyed
+# Can be changed with the vf_wait_timeout setting, or
+# vf_wait_timeout.<pf driver> for a single driver
+VF_WAIT_TIMEOUT = 60
+# Maximum number of seconds between checks while waiting for device events
+VF_WAIT_MAX_INTERVAL = 1
+
+PCI_DRIVERS_DIR = "/sys/bus/pci/drivers"
+PCI_DRIVERS_PROBE = "/sys/bus/pci/drivers_probe"
+# Maximum number of VFs rebound to their driver at the same time
+REBIND_WORKERS = 16
 
 def _detect():
     """
     Detect network devices if not already detected.
     """
     if not detection.detection_complete():
-        detection.detect_network_devices()
+        detection.detect_network_devices(use_cache=False)
 
 def print_help():
     """Prints the help information for vfnet set"""
@@ -66,7 +82,8 @@ def print_help():
 
     print("\n Arguments:")
     command_help = [
-        ['[interface] [number]', 'Persists the specified number of VFs for the specified network device']
+        ['[interface] [number]', 'Sets the specified number of VFs for the specified network device'],
+        ['[iface]:[number]...', 'Sets the number of VFs for several network devices at once (e.g. eth0:8 eth1:16)']
     ]
     for command in command_help:
         command_name = command[0]
@@ -78,152 +95,524 @@ def print_help():
 # Executed when the user calls vfnet set [COMMAND_ARGS]
 def set_command(command_args: List[str]):
     """
-    Sets the number of virtual functions for a network device across reboots
+    Sets the number of virtual functions for one or more network devices
 
     Args:
-        command_args (list): The arguments for the persist command. 
+        command_args (list): The arguments for the set command.
                               Assumes you have already removed the "vfnet set"
                               portion.
     """
+    args = [arg for arg in command_args if not arg.startswith("-")]
+
+    # vfnet set eth0:8 eth1:16 ...
+    if args and all(":" in arg for arg in args):
+        set_many_vfs(parse_targets(args))
+        return
 
     network_device = None
     target_vfs = None
-    for arg in command_args:
-        if not arg.startswith("-"):
-            if(network_device == None):
-              network_device = arg
-            elif(target_vfs == None):
-              target_vfs = int(arg)
-              break
+    for arg in args:
+        if(network_device == None):
+          network_device = arg
+        elif(target_vfs == None):
+          target_vfs = int(arg)
+          break
     if(network_device == None or target_vfs == None):
         raise Exception("Error: Missing arguments. Please provide the name of the network device and the number of VFs to create.")
     set_vfs(network_device, target_vfs)
 
-def set_vfs(network_device, num_vfs):
+def parse_targets(args: List[str]) -> List[Tuple[str, int]]:
     """
-    Sets the number virtual functions (VFs) for a given network device.
-    
+    Parses interface:number arguments.
+
     Args:
-        network_device (str): PCI address or Interface Name of 
-                                the network device to manage.
-        num_vfs (int): Number of VFs to create. Must be greater than zero
-    
-    Notes:
-    *   Will not rerun detection if already run.
-    *   Will throw an error if the maximum number of VFs is exceeded.
-        This should be handled in the calling function to call with
-        the correct number.
-    *   Will throw an error if the network device does not exist.
-    *   Will throw an error if the network device is not capable of
-        creating VFs.
-    *   Will destroy VFs if already exist!
-    *   This function will attempt to wait for the VFs number to change
+        args (list): The arguments (e.g. ["eth0:8", "eth1:16"]).
+
+    Returns:
+        list: The (network device, number of VFs) of each argument.
+    """
+    targets = []
+    for arg in args:
+        # split on the last colon, PCI addresses contain colons
+        network_device, _, num_vfs = arg.rpartition(":")
+        try:
+            targets.append((network_device, int(num_vfs)))
+        except ValueError:
+            raise Exception(f"Error: Invalid argument '{arg}'. Expected <interface>:<number of VFs>.")
+    return targets
+
+def set_many_vfs(targets: List[Tuple[str, int]], raise_errors: bool = True) -> Dict[str, Union[str, None]]:
+    """
+    Sets the number of VFs of several network devices at once.
+
+    Every target is validated against a single detection pass before
+    any device is changed, then the devices are set concurrently so the
+    total time is that of the slowest device.
+
+    Args:
+        targets (list): The (network device, number of VFs) to set.
+        raise_errors (bool): Raise once all devices are done if any of them
+                             failed. Otherwise the failures are only returned.
+
+    Returns:
+        dict: The result of each target keyed by network device.
+              None if the VFs were set, otherwise the error message.
+
+    Raises:
+        Exception: If a target is invalid (no device is changed), or
+                   once all devices are done, if any of them failed
+                   and raise_errors is set.
     """
     _detect()
 
+    # Validate everything before changing anything
+    pfs = {}
+    for network_device, num_vfs in targets:
+        try:
+            pf = _validate_target(network_device, num_vfs)
+        except Exception as e:
+            raise Exception(f"{network_device}: {e}")
+        if pf.pci_address in pfs:
+            raise Exception(f"Network device {network_device} is given more than once.")
+        pfs[pf.pci_address] = pf
+
+    def set_target(target: Tuple[str, int]) -> Union[str, None]:
+        try:
+            set_vfs(target[0], target[1])
+        except Exception as e:
+            return str(e)
+        return None
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, len(targets))) as executor:
+        errors = list(executor.map(set_target, targets))
+    results = {network_device: error for (network_device, _), error in zip(targets, errors)}
+
+    print("")
+    for (network_device, num_vfs), error in zip(targets, errors):
+        if error is None:
+            print(f"{network_device}: {num_vfs} VFs set.")
+        else:
+            print(f"{network_device}: Failed to set {num_vfs} VFs: {error}")
+
+    failed = len([error for error in errors if error is not None])
+    if failed and raise_errors:
+        raise Exception(f"VFs could not be set for {failed} of {len(targets)} network devices.")
+    return results
+
+def _validate_target(network_device, num_vfs):
+    """
+    Checks if the number of VFs of a network device can be set.
+
+    Args:
+        network_device (str): PCI address or Interface Name of
+                                the network device to manage.
+        num_vfs (int): Number of VFs to create.
+
+    Returns:
+        PhysicalNIC: The PF of the network device.
+    """
     # Check if the network device exists
     pf = detection.get_pf(network_device)
     if pf is None:
         raise Exception("Network device not found.")
     
     # Check if the PF is capable of creating VFs
-    if not pf["sriov_capable"] or pf["sriov_totalvfs"] == 0:
+    if not pf.sriov_capable or pf.sriov_totalvfs == 0:
         raise Exception("Network device is not capable of creating VFs.")
     
     # check if num_vfs is an integer number
     if not isinstance(num_vfs, int):
-        raise Exception("Number of VFs must be an integer between 0 and the maximum number of VFs ({})".format(pf["sriov_totalvfs"]))
+        raise Exception("Number of VFs must be an integer between 0 and the maximum number of VFs ({})".format(pf.sriov_totalvfs))
 
     # If the number of VFs is greater than max_vfs, throw an error
-    if num_vfs > pf["sriov_totalvfs"]:
+    if num_vfs > pf.sriov_totalvfs:
         raise Exception("Number of VFs exceeds maximum number of VFs.")
     
     # check if the number of VFs is greater than or equal to zero
     if num_vfs < 0:
         raise Exception("Number of VFs must be greater than or equal to zero.")
+
+    return pf
+
+def set_vfs(network_device, num_vfs, event_source=None):
+    """
+    Sets the number virtual functions (VFs) for a given network device.
+    
+    Args:
+        network_device (str): PCI address or Interface Name of 
+                                the network device to manage.
+        num_vfs (int): Number of VFs to create. Must be greater than zero
+        event_source (UeventSource): Source of the device events used to
+                                wait for the VFs. Opens a uevent.UeventSource
+                                if not given.
     
+    Notes:
+    *   Will not rerun detection if already run.
+    *   Will throw an error if the maximum number of VFs is exceeded.
+        This should be handled in the calling function to call with
+        the correct number.
+    *   Will throw an error if the network device does not exist.
+    *   Will throw an error if the network device is not capable of
+        creating VFs.
+    *   Will destroy VFs if already exist!
+    *   This function will attempt to wait for the VFs number to change
+    """
+    _detect()
+
+    pf = _validate_target(network_device, num_vfs)
+
     # Check if the number of VFs is already set to the correct number
-    if pf["sriov_numvfs"] == num_vfs:
-        print(f"Current VF count {pf['sriov_numvfs']} matches desired {num_vfs}. Doing nothing.")
+    if pf.sriov_numvfs == num_vfs:
+        print(f"Current VF count {pf.sriov_numvfs} matches desired {num_vfs}. Doing nothing.")
         return
     
     # Check if the PF is already has VFs enabled and the desired number
     # is greater than zero (if the desired number is zero, then this is
     # a call to remove the VFs and the following code will handle that)
-    if pf["sriov_numvfs"] > 0 and num_vfs > 0:
+    if pf.sriov_numvfs > 0 and num_vfs > 0:
         # Delete all VFs if some exist. They have to be recreated
         print("Existing VFs found. Removing existing VFs...")
         delete_vfs(network_device)
 
+    # Create the VFs without binding them to a driver when possible, so the
+    # MAC addresses are set before the VF drivers probe them, only once
+    deferred_probe = num_vfs > 0 and _deferred_probe_enabled(pf)
+    vfs_probed = False
+
     # Set the VFs
-    # Write the number of VFs to the sriov_numvfs file
-    print(f"Setting VFs to {num_vfs}...")
-    _write_numvfs(pf["device_path"], num_vfs)
-    
-    # Wait for the number of VFs to change
-    curr_numvfs = _read_numvfs(pf["device_path"])
-    curr_virtfn = _count_virtfn(pf["device_path"])
-    if(curr_numvfs != num_vfs or curr_virtfn != num_vfs):
-        print(f"Waiting for VFs VFs to be created {num_vfs}...")
-        for i in range(60):
-            curr_numvfs = _read_numvfs(pf["device_path"])
-            print(f"Current VFs: {curr_numvfs}")
-            if curr_numvfs == num_vfs:
-                break
-            time.sleep(1)
-        for i in range(60):
-            # now check virtfnX directories
-            curr_virtfn = _count_virtfn(pf["device_path"])
-            print(f"Current virtfnX: {curr_virtfn}")
-            if curr_virtfn == num_vfs:
-                break
-            time.sleep(1)
-
-        for i in range(60):
-            ip_link_output = ip_link.get_ip_link()
-            ip_link_iface = ip_link_output[pf["interface"]]
-            print(f"ip_link_iface: {ip_link_iface}")
-            if(ip_link_iface != None):
-                if(ip_link_iface["vfinfo_list"] != None):
-                    vfinfo_list_len = len(ip_link_iface["vfinfo_list"])
-                    print(f"Current ip link vf count: {vfinfo_list_len}")
-                    if vfinfo_list_len == num_vfs:
-                        break
-            time.sleep(1)
-        
-
-    # Check if the number of VFs was set correctly
-    if(curr_numvfs != num_vfs):
-        raise Exception("Number of VFs was not set correctly. Expected {} VFs, but found {} VFs.".format(num_vfs, curr_numvfs))
-    if(curr_virtfn != num_vfs):
-        raise Exception("Number of VFs was not set correctly. Expected {} VFs, but found {} VFs.".format(num_vfs, curr_virtfn))
-    
-    print("VFs created successfully. Refreshing...")
-    
-    # loop through all VFs and set the MAC address
-    resetvf_driver = False
-    ip_link_output = ip_link.get_ip_link()
-    ip_link_iface = ip_link_output[pf["interface"]]
+    # Subscribe to device events before writing so no VF add event is missed
+    own_event_source = event_source is None
+    if own_event_source:
+        event_source = uevent.open_event_source()
+    try:
+        try:
+            # Write the number of VFs to the sriov_numvfs file
+            print(f"Setting VFs to {num_vfs}...")
+            detection.invalidate_cache()
+            _write_numvfs(pf.device_path, num_vfs, autoprobe=False if deferred_probe else None)
+
+            # Wait for the VFs to show up in sysfs and ip link
+            print(f"Waiting for {num_vfs} VFs to be created...")
+            created = _wait_for_vfs(pf, num_vfs, event_source, _vf_wait_timeout(pf))
+        finally:
+            if own_event_source and event_source is not None:
+                event_source.close()
+
+        # Check if the number of VFs was set correctly
+        if not created:
+            curr_numvfs = _read_numvfs(pf.device_path)
+            curr_virtfn = _count_virtfn(pf.device_path)
+            curr_vfinfo = _count_vfinfo(pf.interface)
+            raise Exception("Number of VFs was not set correctly. Expected {} VFs, but found {} VFs ({} virtfn, {} in ip link).".format(num_vfs, curr_numvfs, curr_virtfn, curr_vfinfo))
+
+        print("VFs created successfully. Refreshing...")
+
+        changed_vfs = _set_vf_macs(pf)
+
+        if deferred_probe:
+            # the VFs pick up their MAC addresses on their first probe
+            print(f"Binding {num_vfs} VFs to their driver...")
+            _probe_vfs(pf, list(range(num_vfs)))
+            vfs_probed = True
+            print("VFs bound successfully.")
+        # if one or more VFs had their mac address reset, their driver needs to be
+        # rebound. Only the changed VFs are rebound, other VFs of the driver
+        # (e.g. on other PFs or passed through to VMs) are left alone
+        elif changed_vfs:
+            print("At least one MAC address was reset.")
+            reset_vf_drivers(pf, changed_vfs)
+    finally:
+        if deferred_probe:
+            _write_autoprobe(pf.device_path, True)
+            # never leave VFs without a driver, even if setting the MAC addresses failed
+            if not vfs_probed:
+                _probe_vfs(pf, list(range(_count_virtfn(pf.device_path))))
+
+def _set_vf_macs(pf) -> List[int]:
+    """
+    Sets the MAC addresses of all the VFs of a PF to their generated addresses.
 
-    for vf_iface in ip_link_iface["vfinfo_list"]:
-        mac_address = mac_generator.generate_mac(pf["mac_address"], vf_iface["vf"] ,pf["device_name"])
+    Returns:
+        list: The indexes of the VFs whose MAC address was changed.
+    """
+    ip_link_iface = ip_link.get_ip_link_device(pf.interface)
+    if ip_link_iface is None:
+        raise Exception(f"Network device {pf.interface} was not found in ip link. Could not set the MAC addresses of its VFs.")
+    vfinfo_list = ip_link_iface.get("vfinfo_list", [])
+
+    # get the MAC addresses of all the VFs up front, from the MAC table
+    # or derived in parallel for the VFs missing from it
+    vf_macs = mac_table.get_vf_macs(pf.mac_address, [vf_iface["vf"] for vf_iface in vfinfo_list], pf.device_name)
+
+    mac_changes = []
+    for vf_iface in vfinfo_list:
+        mac_address = vf_macs[vf_iface["vf"]]
         if(vf_iface["address"] == mac_address):
             print(f"MAC address for VF {vf_iface['vf']} already set to {mac_address}. Doing nothing.")
             continue
-        # set the mac address
         print(f"Setting MAC address for VF {vf_iface['vf']} from {vf_iface['address']} to {mac_address}...")
-        ip_link.set_vf_mac_address(pf["interface"], vf_iface['vf'], mac_address)
-        resetvf_driver = True
+        mac_changes.append((pf.interface, vf_iface['vf'], mac_address))
+
+    # set all the mac addresses in a single transaction
+    mac_errors = ip_link.set_vf_mac_addresses(mac_changes)
+    changed_vfs = []
+    for (_, vf_index, mac_address), error in zip(mac_changes, mac_errors):
+        if error is None:
+            changed_vfs.append(vf_index)
+        else:
+            print(f"Error: Could not set MAC address for VF {vf_index} to {mac_address}: {error}")
+    if mac_changes:
+        print(f"Set {len(changed_vfs)} of {len(mac_changes)} MAC addresses.")
+    return changed_vfs
+
+def _count_vfinfo(pf_interface: str) -> int:
+    """
+    Counts the VFs reported by ip link for a given network device.
+    """
+    ip_link_iface = ip_link.get_ip_link_device(pf_interface)
+    if ip_link_iface is None:
+        return 0
+    return len(ip_link_iface.get("vfinfo_list", []))
+
+def _vfs_ready(pf, num_vfs: int) -> bool:
+    """
+    Checks if the VFs of a PF match the desired number in
+    sriov_numvfs, the virtfnX links and ip link.
+    """
+    return (_read_numvfs(pf.device_path) == num_vfs
+            and _count_virtfn(pf.device_path) == num_vfs
+            and _count_vfinfo(pf.interface) == num_vfs)
+
+def _is_vf_event(event) -> bool:
+    """
+    Checks if a uevent can change the VFs of a PF (a PCI device
+    or a network interface being added, removed or rebound).
+    Lost events may have been any of these.
+    """
+    if uevent.is_resync(event):
+        return True
+    return event.get('SUBSYSTEM') in ('pci', 'net') and event.get('ACTION') in ('add', 'remove', 'bind', 'unbind', 'change')
+
+def _vf_wait_timeout(pf) -> float:
+    """
+    Returns the number of seconds to wait for the VFs of a PF,
+    from the settings of the PF's driver if any.
+    """
+    default_timeout = settings.get_float_setting("vf_wait_timeout", VF_WAIT_TIMEOUT)
+    return settings.get_float_setting("vf_wait_timeout.{}".format(pf.driver), default_timeout)
+
+def _event_sleep(event_source):
+    """
+    Returns a sleep function for wait.wait_until that returns early
+    when a device event that can change the VFs arrives.
+    """
+    def sleep(seconds: float) -> None:
+        end = time.monotonic() + seconds
+        while True:
+            event = event_source.wait(max(0, end - time.monotonic()))
+            if event is None or _is_vf_event(event):
+                return
+    return sleep
+
+def _wait_for_vfs(pf, num_vfs: int, event_source, timeout: float, clock=time.monotonic) -> bool:
+    """
+    Waits for the VFs of a PF to match the desired number.
+    Rechecks whenever a device event arrives, and otherwise backs off
+    from a millisecond up to VF_WAIT_MAX_INTERVAL between checks.
+
+    Args:
+        pf (PhysicalNIC): The PF the VFs are created on.
+        num_vfs (int): The desired number of VFs.
+        event_source (UeventSource): Source of the device events. None to only poll.
+        timeout (float): The maximum number of seconds to wait.
+        clock (function): Returns the current time in seconds.
+
+    Returns:
+        bool: True if the VFs match the desired number before the deadline.
+    """
+    sleep = time.sleep if event_source is None else _event_sleep(event_source)
+    return wait.wait_until(lambda: _vfs_ready(pf, num_vfs), timeout,
+                           max_interval=VF_WAIT_MAX_INTERVAL, clock=clock, sleep=sleep)
+
+def _get_vf_pci_address(pf, vf_index: int) -> str:
+    """
+    Returns the PCI address of a VF from the virtfnX link of its PF.
+    """
+    return os.path.basename(os.path.realpath(os.path.join(pf.device_path, "device", f"virtfn{vf_index}")))
+
+def _get_pci_driver(pci_address: str) -> Union[str, None]:
+    """
+    Returns the name of the driver bound to a PCI device. None if it is not bound.
+    """
+    driver_link = os.path.join(detection.PCI_DEVICES_DIR, pci_address, "driver")
+    if not os.path.exists(driver_link):
+        return None
+    return os.path.basename(os.path.realpath(driver_link))
+
+def _deferred_probe_enabled(pf) -> bool:
+    """
+    Checks if the VFs of a PF can be created without binding them to a driver.
+    Enabled by default, can be turned off with the vf_deferred_probe setting.
+    Not used if the PF does not support sriov_drivers_autoprobe or
+    autoprobe is already turned off (the VFs are bound by something else).
+    """
+    return settings.get_bool_setting("vf_deferred_probe", True) and _read_autoprobe(pf.device_path) is True
+
+def _read_autoprobe(device_path: str) -> Union[bool, None]:
+    """
+    Reads if the VFs of a network device are bound to a driver when created.
+
+    Returns:
+        bool: The value of sriov_drivers_autoprobe. None if not supported.
+    """
+    try:
+        with open(os.path.join(device_path, "device", "sriov_drivers_autoprobe"), "r") as f:
+            return f.read().strip() == "1"
+    except OSError:
+        return None
+
+def _write_autoprobe(device_path: str, autoprobe: bool) -> None:
+    """
+    Sets if the VFs of a network device are bound to a driver when created.
+    """
+    with open(os.path.join(device_path, "device", "sriov_drivers_autoprobe"), "w") as f:
+        f.write("1" if autoprobe else "0")
+
+def _probe_vf(pci_address: str) -> Union[str, None]:
+    """
+    Binds a VF to the driver matching it.
+
+    Returns:
+        str: The error message. None if the VF was probed.
+    """
+    try:
+        with open(PCI_DRIVERS_PROBE, "w") as f:
+            f.write(pci_address)
+    except OSError as e:
+        return e.strerror
+    return None
+
+def _probe_vfs(pf, vf_indexes: List[int]) -> None:
+    """
+    Binds the given VFs of a PF to their drivers in parallel.
+    """
+    pci_addresses = [_get_vf_pci_address(pf, vf_index) for vf_index in vf_indexes]
+    if not pci_addresses:
+        return
+    detection.invalidate_cache()
+
+    # each probe blocks while the driver initialises the VF
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(pci_addresses), REBIND_WORKERS)) as executor:
+        errors = list(executor.map(_probe_vf, pci_addresses))
+
+    for vf_index, pci_address, error in zip(vf_indexes, pci_addresses, errors):
+        if error is not None:
+            print(f"Error: Could not bind VF {vf_index} ({pci_address}) to its driver: {error}")
+
+def reset_vf_drivers(pf, vf_indexes: List[int]) -> None:
+    """
+    Rebinds the given VFs of a PF to their driver so they pick up
+    their new MAC addresses. Only if the driver does not support
+    rebinding, the driver modules of the VFs are reloaded.
+
+    VFs bound to a driver without a network interface (e.g. vfio-pci
+    for a VF passed through to a VM) are in use and left alone. Their
+    user must reset them to pick up the new MAC address.
+
+    Args:
+        pf (PhysicalNIC): The PF of the VFs.
+        vf_indexes (list): The zero-indexes of the VFs to reset.
+    """
+    detection.invalidate_cache()
+    vfs = []
+    for vf_index in vf_indexes:
+        vf = _get_vf_driver(pf, vf_index)
+        if vf['driver'] is None:
+            continue
+        if not vf['netdev']:
+            print(f"VF {vf_index} ({vf['pci_address']}) is in use by {vf['driver']} and is not rebound. "
+                  "Reset it from its VM or user to pick up the new MAC address.")
+            continue
+        vfs.append(vf)
+    if not vfs:
+        return
+
+    print(f"Rebinding {len(vfs)} VFs to their driver...")
+    if _rebind_vfs(vfs):
+        print("VFs rebound successfully.")
+    else:
+        for module_name in sorted({vf['module'] for vf in vfs if vf['module']}):
+            print(f"The VF driver does not support rebinding. Reloading the vf driver {module_name}...")
+            _reload_module(module_name)
+            print("VF driver reloaded successfully.")
+
+def _get_vf_driver(pf, vf_index: int) -> Dict[str, Any]:
+    """
+    Returns the driver a VF of a PF is bound to, read from sysfs as the
+    VFs may have been recreated since the last detection. The module
+    falls back to the one in the inventory.
+
+    Returns:
+        dict: The 'vf' index, 'pci_address', 'driver' (None if not bound),
+              'module' (None if unknown) and whether the driver created
+              a network interface ('netdev').
+    """
+    pci_address = _get_vf_pci_address(pf, vf_index)
+    driver = _get_pci_driver(pci_address)
+    module = None
+    if driver is not None:
+        module_link = os.path.join(PCI_DRIVERS_DIR, driver, "module")
+        if os.path.islink(module_link):
+            module = os.path.basename(os.path.realpath(module_link))
+    if module is None:
+        vf = detection.get_inventory().get_vf(pci_address)
+        if vf is not None and vf.driver == driver and vf.module not in (None, 'unknown'):
+            module = vf.module
+    netdev = os.path.isdir(os.path.join(detection.PCI_DEVICES_DIR, pci_address, "net"))
+    return {'vf': vf_index, 'pci_address': pci_address, 'driver': driver, 'module': module, 'netdev': netdev}
+
+def _rebind_vf(pci_address: str, driver: str) -> Union[str, None]:
+    """
+    Unbinds a VF from its driver and binds it again.
+
+    Returns:
+        str: The error message. None if the VF was rebound.
+    """
+    driver_dir = os.path.join(PCI_DRIVERS_DIR, driver)
+    try:
+        with open(os.path.join(driver_dir, "unbind"), "w") as f:
+            f.write(pci_address)
+        with open(os.path.join(driver_dir, "bind"), "w") as f:
+            f.write(pci_address)
+    except OSError as e:
+        return e.strerror
+    return None
+
+def _rebind_vfs(vfs: List[Dict[str, Any]]) -> bool:
+    """
+    Rebinds VFs to their drivers in parallel, so the drivers pick up
+    the new MAC addresses.
+
+    Args:
+        vfs (list): The bound VFs, as returned by _get_vf_driver.
+
+    Returns:
+        bool: False if a driver does not support unbind/bind, in which
+              case nothing was rebound and the modules must be reloaded.
+    """
+    for vf in vfs:
+        driver_dir = os.path.join(PCI_DRIVERS_DIR, vf['driver'])
+        if not (os.path.exists(os.path.join(driver_dir, "unbind")) and os.path.exists(os.path.join(driver_dir, "bind"))):
+            return False
 
-    # if one or more VFs had their mac address reset, the entire vf driver needs to be reloaded
-    if(resetvf_driver):
-        # detect kernel module name
-        module_name = detection.get_module_of_vf_by_pf(pf["interface"],0)
-        # Define the reload_vf_driver function
-        print(f"At least one MAC address was reset. Reloading the vf driver {module_name}...")
-        _reload_module(module_name)
-        print("VF driver reloaded successfully.")
+    # each bind blocks while the driver probes the VF
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(vfs), REBIND_WORKERS)) as executor:
+        errors = list(executor.map(lambda vf: _rebind_vf(vf['pci_address'], vf['driver']), vfs))
 
+    for vf, error in zip(vfs, errors):
+        if error is not None:
+            print(f"Error: Could not rebind VF {vf['vf']} ({vf['pci_address']}) to {vf['driver']}: {error}")
+    return True
 
 def _reload_module(module_name):
     subprocess.run(["modprobe", "-r", module_name])
@@ -231,7 +620,7 @@ def _reload_module(module_name):
 
     
     
-def _write_numvfs(device_path: str, num_vfs: int) -> None:
+def _write_numvfs(device_path: str, num_vfs: int, autoprobe: Union[bool, None] = None) -> None:
     """
     Writes the number of virtual functions (VFs) to be enabled on a given network device to sysfs.
     * Does not wait for the number of VFs to change.
@@ -239,7 +628,11 @@ def _write_numvfs(device_path: str, num_vfs: int) -> None:
     Args:
         device_path (str): Path to the network device to manage.
         num_vfs (int): Number of VFs to enable.
+        autoprobe (bool): If given, first sets if the new VFs are bound to a
+                          driver when created (sriov_drivers_autoprobe).
     """
+    if autoprobe is not None:
+        _write_autoprobe(device_path, autoprobe)
     with open(os.path.join(device_path, "device", "sriov_numvfs"), "w") as f:
         f.write(str(num_vfs))
 
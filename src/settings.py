@@ -0,0 +1,89 @@
+# Used to read the optional vfnet settings file (/etc/vfnet/vfnet.conf)
+#
+# The file holds one `key = value` setting per line. Lines starting
+# with # are comments. Settings that are not in the file use the
+# defaults of the modules reading them.
+
+import sys
+import install_vfnet as install_vfnet
+
+from typing import Dict, Union
+
+# Settings are read once per run
+# Do not use directly except from within this file
+_settings: Union[Dict[str, str], None] = None
+
+def parse_settings(text: str) -> Dict[str, str]:
+    """
+    Parse the contents of a settings file.
+
+    Args:
+        text (str): The contents of the settings file.
+
+    Returns:
+        dict: The values keyed by setting name.
+    """
+    settings: Dict[str, str] = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("#") or "=" not in line:
+            continue
+        key, value = line.split("=", 1)
+        settings[key.strip()] = value.strip()
+    return settings
+
+def read_settings() -> Dict[str, str]:
+    """
+    Read the vfnet settings file.
+
+    Returns:
+        dict: The values keyed by setting name. Empty if the
+              file does not exist.
+    """
+    global _settings
+    if _settings is None:
+        try:
+            with open(install_vfnet.get_settings_file_path(), 'r') as f:
+                _settings = parse_settings(f.read())
+        except FileNotFoundError:
+            _settings = {}
+    return _settings
+
+def get_setting(key: str, default: Union[str, None] = None) -> Union[str, None]:
+    """
+    Get a single setting.
+
+    Args:
+        key (str): The name of the setting.
+        default (str): Returned if the setting is not in the file.
+    """
+    return read_settings().get(key, default)
+
+def get_float_setting(key: str, default: float) -> float:
+    """
+    Get a numeric setting. Falls back to the default
+    (with a warning) if the value is not a number.
+    """
+    value = get_setting(key)
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        print(f"Warning: Invalid value '{value}' for setting '{key}'. Using {default}.", file=sys.stderr)
+        return default
+
+def get_bool_setting(key: str, default: bool) -> bool:
+    """
+    Get a yes/no setting. Falls back to the default
+    (with a warning) if the value is not a boolean.
+    """
+    value = get_setting(key)
+    if value is None:
+        return default
+    if value.lower() in ("1", "yes", "true", "on"):
+        return True
+    if value.lower() in ("0", "no", "false", "off"):
+        return False
+    print(f"Warning: Invalid value '{value}' for setting '{key}'. Using {'yes' if default else 'no'}.", file=sys.stderr)
+    return default
@@ -0,0 +1,317 @@
+# The command function for vfnet top
+#
+# Samples the counters of the VFs (IFLA_VF_STATS) at an interval and shows
+# the throughput and drop rates of each VF and PF, as a live table or as
+# NDJSON. Each sample is a single netlink query of the SR-IOV capable PFs,
+# the VFs themselves are never queried. The table only rewrites the lines
+# of the screen that changed since the previous refresh.
+
+import sys
+import json
+import time
+import shutil
+import contextlib
+import text_help as text_help
+import detection as detection
+import ip_link as ip_link
+
+from typing import List, Dict, Tuple, Union, Any
+
+DEFAULT_INTERVAL = 1.0
+
+# The rates computed for each VF and PF: (name, direction, counter)
+RATES = [
+    ('rx_bytes', 'rx', 'bytes'),
+    ('tx_bytes', 'tx', 'bytes'),
+    ('rx_packets', 'rx', 'packets'),
+    ('tx_packets', 'tx', 'packets'),
+    ('rx_dropped', 'rx', 'dropped'),
+    ('tx_dropped', 'tx', 'dropped'),
+]
+
+# The orders of the VFs: sort key of the rates of a VF, highest first
+SORT_KEYS = {
+    'total': lambda rates: (rates['rx_bytes'] or 0) + (rates['tx_bytes'] or 0),
+    'rx': lambda rates: rates['rx_bytes'] or 0,
+    'tx': lambda rates: rates['tx_bytes'] or 0,
+    'packets': lambda rates: (rates['rx_packets'] or 0) + (rates['tx_packets'] or 0),
+    'drops': lambda rates: (rates['rx_dropped'] or 0) + (rates['tx_dropped'] or 0),
+}
+DEFAULT_SORT = 'total'
+
+# Escape sequences of the live table
+_ALTERNATE_SCREEN_ON = "\x1b[?1049h\x1b[?25l\x1b[2J"
+_ALTERNATE_SCREEN_OFF = "\x1b[?25h\x1b[?1049l"
+_CLEAR_TO_END_OF_LINE = "\x1b[K"
+
+# A sample of the counters: the stats of each VF keyed by (PF interface, VF index)
+Sample = Dict[Tuple[str, int], Dict[str, Dict[str, int]]]
+
+def print_help():
+    """Prints the help information for vfnet top"""
+    print("Usage: vfnet top [OPTIONS] [INTERFACE]...")
+    print("")
+    print("Shows the throughput and drop rates of the VFs, refreshed at an interval.")
+    print("Limited to the VFs of the given PF interfaces if any.")
+    print("\nOptions:")
+    option_help = [
+        ['-h, --help', 'Print help information'],
+        ['--interval=SECONDS', f'Seconds between samples (default: {DEFAULT_INTERVAL:g})'],
+        ['--count=N', 'Exit after N refreshes'],
+        ['--sort=KEY', f'Order of the VFs: {", ".join(SORT_KEYS)} (default: {DEFAULT_SORT})'],
+        ['--json', 'Print one JSON object per PF and VF for every refresh (NDJSON) instead of the table'],
+    ]
+    for option in option_help:
+        option_name = option[0]
+        option_description = option[1]
+        wrapped_description = text_help.wrap_text(option_description, 67)
+        for i, description_line in enumerate(wrapped_description):
+            print("  {:<20}{}".format(option_name if i == 0 else "", description_line))
+
+# Executed when the user calls vfnet top [COMMAND_ARGS]
+def top_command(command_args: List[str]):
+    """
+    Shows the rates of the VFs until interrupted
+
+    Args:
+        command_args (list): The arguments for the top command.
+                              Assumes you have already removed the "vfnet top"
+                              portion.
+    """
+    interval = DEFAULT_INTERVAL
+    count = None
+    sort = DEFAULT_SORT
+    interfaces = []
+    for arg in command_args:
+        try:
+            if arg.startswith("--interval="):
+                interval = float(arg[len("--interval="):])
+            elif arg.startswith("--count="):
+                count = int(arg[len("--count="):])
+        except ValueError:
+            raise ValueError(f"Invalid option: {arg}")
+        if arg.startswith("--sort="):
+            sort = arg[len("--sort="):]
+        elif not arg.startswith("-"):
+            interfaces.append(arg)
+    if interval <= 0:
+        raise ValueError("--interval must be greater than 0")
+    if sort not in SORT_KEYS:
+        raise ValueError(f"--sort must be one of {', '.join(SORT_KEYS)}")
+
+    top(interfaces, interval, count, sort, as_json="--json" in command_args)
+
+def _get_pf_interfaces(interfaces: List[str]) -> List[str]:
+    """
+    Get the SR-IOV capable PFs to sample.
+
+    Args:
+        interfaces (list): The PF interfaces or PCI addresses. All the
+                           SR-IOV capable PFs if empty.
+    """
+    detection.detect_network_devices()
+    if not interfaces:
+        return [pf.interface for pf in detection.physical_nics().values() if pf.sriov_capable]
+
+    pf_interfaces = []
+    for interface in interfaces:
+        pf = detection.get_pf(interface)
+        if pf is None:
+            raise ValueError(f"Network device {interface} is not a physical NIC")
+        if not pf.sriov_capable:
+            raise ValueError(f"Network device {interface} does not support VF configuration")
+        pf_interfaces.append(pf.interface)
+    return pf_interfaces
+
+def sample(pf_interfaces: List[str]) -> Sample:
+    """
+    Reads the counters of the VFs of the PFs, with a single query.
+
+    Returns:
+        dict: The counters ('rx' and 'tx' dictionaries) of each VF keyed by
+              (PF interface, VF index). VFs whose driver does not report
+              counters are omitted.
+    """
+    links = ip_link.get_ip_links(pf_interfaces, stats=True)
+    counters: Sample = {}
+    for pf_interface in pf_interfaces:
+        for vfinfo in links.get(pf_interface, {}).get('vfinfo_list', []):
+            if 'stats' in vfinfo:
+                counters[(pf_interface, vfinfo['vf'])] = vfinfo['stats']
+    return counters
+
+def compute_rates(previous: Sample, current: Sample, elapsed: float) -> Dict[Tuple[str, int], Dict[str, Union[float, None]]]:
+    """
+    Computes the per second rates of the VFs between two samples.
+
+    A counter that went backwards (the VF was recreated) restarts at 0.
+    A counter that is not reported has no rate (None).
+
+    Returns:
+        dict: The rates (see RATES) of each VF of the current sample keyed
+              by (PF interface, VF index).
+    """
+    rates = {}
+    for key, stats in current.items():
+        before = previous.get(key, {})
+        vf_rates: Dict[str, Union[float, None]] = {}
+        for name, direction, counter in RATES:
+            value = stats.get(direction, {}).get(counter)
+            if value is None:
+                vf_rates[name] = None
+                continue
+            previous_value = before.get(direction, {}).get(counter, value)
+            vf_rates[name] = (value - previous_value if value >= previous_value else value) / elapsed
+        rates[key] = vf_rates
+    return rates
+
+def sum_rates(rates: Dict[Tuple[str, int], Dict[str, Union[float, None]]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Adds up the rates of the VFs of each PF.
+
+    Returns:
+        dict: The rates of each PF and its number of VFs ('vfs') keyed by PF interface.
+    """
+    pf_rates: Dict[str, Dict[str, Any]] = {}
+    for (pf_interface, _), vf_rates in rates.items():
+        totals = pf_rates.setdefault(pf_interface, dict({name: None for name, _, _ in RATES}, vfs=0))
+        totals['vfs'] += 1
+        for name, value in vf_rates.items():
+            if value is not None:
+                totals[name] = (totals[name] or 0) + value
+    return pf_rates
+
+def _format_rate(value: Union[float, None]) -> str:
+    """Formats a rate with a metric suffix (e.g. 12.3M)"""
+    if value is None:
+        return "-"
+    for suffix in ("", "K", "M", "G"):
+        if value < 1000:
+            return f"{value:.0f}{suffix}" if suffix == "" else f"{value:.1f}{suffix}"
+        value /= 1000
+    return f"{value:.1f}T"
+
+def _vf_interfaces() -> Dict[Tuple[str, int], str]:
+    """Get the interface name of each VF keyed by (PF interface, VF index)"""
+    names = {}
+    for vf in detection.vf_nics().values():
+        pf = detection.get_pf(vf.parent_pci_address)
+        if pf is not None and vf.vf_num is not None:
+            names[(pf.interface, vf.vf_num)] = vf.interface or ""
+    return names
+
+_RATE_COLUMNS = "{:>9} {:>9} {:>9} {:>9} {:>9} {:>9}"
+
+def render_table(rates: Dict[Tuple[str, int], Dict[str, Union[float, None]]], vf_interfaces: Dict[Tuple[str, int], str], sort: str, interval: float) -> List[str]:
+    """
+    Renders the rates as the lines of the live table. The columns have
+    fixed widths so a line only changes when its values do.
+    """
+    pf_rates = sum_rates(rates)
+    lines = [
+        f"vfnet top - every {interval:g}s - {len(pf_rates)} PFs, {len(rates)} VFs - sorted by {sort}  {time.strftime('%H:%M:%S')}",
+        "",
+        "{:<16} {:>5} ".format("PF", "VFs") + _RATE_COLUMNS.format("RX B/s", "TX B/s", "RX pkt/s", "TX pkt/s", "RX drop/s", "TX drop/s"),
+    ]
+    for pf_interface in sorted(pf_rates):
+        totals = pf_rates[pf_interface]
+        lines.append("{:<16} {:>5} ".format(pf_interface, totals['vfs']) + _RATE_COLUMNS.format(*(_format_rate(totals[name]) for name, _, _ in RATES)))
+
+    lines.append("")
+    lines.append("{:<16} {:>5} {:<16} ".format("PF", "VF", "Interface") + _RATE_COLUMNS.format("RX B/s", "TX B/s", "RX pkt/s", "TX pkt/s", "RX drop/s", "TX drop/s"))
+    sort_key = SORT_KEYS[sort]
+    for key in sorted(rates, key=lambda key: (-sort_key(rates[key]), key)):
+        pf_interface, vf_index = key
+        lines.append("{:<16} {:>5} {:<16} ".format(pf_interface, vf_index, vf_interfaces.get(key, "")[:16]) + _RATE_COLUMNS.format(*(_format_rate(rates[key][name]) for name, _, _ in RATES)))
+    return lines
+
+class _Screen:
+    """
+    Draws frames of lines on the terminal, rewriting only the lines
+    that changed since the previous frame.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._lines: List[str] = []
+
+    def __enter__(self):
+        self._stream.write(_ALTERNATE_SCREEN_ON)
+        self._stream.flush()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stream.write(_ALTERNATE_SCREEN_OFF)
+        self._stream.flush()
+        return False
+
+    def draw(self, lines: List[str]) -> None:
+        columns, rows = shutil.get_terminal_size()
+        lines = [line[:columns] for line in lines[:rows]]
+        output = []
+        for row, line in enumerate(lines):
+            if row >= len(self._lines) or self._lines[row] != line:
+                output.append(f"\x1b[{row + 1};1H{line}{_CLEAR_TO_END_OF_LINE}")
+        for row in range(len(lines), len(self._lines)):
+            output.append(f"\x1b[{row + 1};1H{_CLEAR_TO_END_OF_LINE}")
+        self._stream.write("".join(output))
+        self._stream.flush()
+        self._lines = lines
+
+def _round_rates(rates: Dict[str, Any]) -> Dict[str, Any]:
+    return {name: round(value, 1) if isinstance(value, float) else value for name, value in rates.items()}
+
+def _print_json(rates: Dict[Tuple[str, int], Dict[str, Union[float, None]]], vf_interfaces: Dict[Tuple[str, int], str]) -> None:
+    """Prints one JSON object per PF and VF"""
+    timestamp = round(time.time(), 3)
+    records = []
+    for pf_interface, totals in sorted(sum_rates(rates).items()):
+        records.append(dict({'type': 'pf', 'time': timestamp, 'pf': pf_interface}, **_round_rates(totals)))
+    for (pf_interface, vf_index), vf_rates in sorted(rates.items()):
+        records.append(dict({'type': 'vf', 'time': timestamp, 'pf': pf_interface, 'vf': vf_index, 'interface': vf_interfaces.get((pf_interface, vf_index))}, **_round_rates(vf_rates)))
+    sys.stdout.write("".join(json.dumps(record) + "\n" for record in records))
+    sys.stdout.flush()
+
+def top(interfaces: List[str], interval: float = DEFAULT_INTERVAL, count: Union[int, None] = None, sort: str = DEFAULT_SORT, as_json: bool = False) -> None:
+    """
+    Samples the counters of the VFs and shows their rates until interrupted.
+
+    Args:
+        interfaces (list): The PFs to sample. All the SR-IOV capable PFs if empty.
+        interval (float): Seconds between samples.
+        count (int): Number of refreshes before returning. None to run until interrupted.
+        sort (str): The order of the VFs in the table (see SORT_KEYS).
+        as_json (bool): Print NDJSON instead of the live table.
+    """
+    pf_interfaces = _get_pf_interfaces(interfaces)
+    vf_interfaces = _vf_interfaces()
+    live = not as_json and sys.stdout.isatty()
+
+    previous = sample(pf_interfaces)
+    previous_time = time.monotonic()
+    next_time = previous_time + interval
+    refreshes = 0
+    with (_Screen(sys.stdout) if live else contextlib.nullcontext()) as screen:
+        try:
+            while count is None or refreshes < count:
+                time.sleep(max(0, next_time - time.monotonic()))
+                next_time += interval
+                current = sample(pf_interfaces)
+                current_time = time.monotonic()
+                rates = compute_rates(previous, current, current_time - previous_time)
+
+                # VFs were created or removed, look up their interfaces again
+                if current.keys() != previous.keys():
+                    detection.detect_network_devices()
+                    vf_interfaces = _vf_interfaces()
+                previous, previous_time = current, current_time
+
+                if as_json:
+                    _print_json(rates, vf_interfaces)
+                elif live:
+                    screen.draw(render_table(rates, vf_interfaces, sort, interval))
+                else:
+                    print("\n".join(render_table(rates, vf_interfaces, sort, interval)) + "\n")
+                refreshes += 1
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,113 @@
+# library to listen for kernel device events (uevents) over netlink
+#
+# Used to wake up as soon as the kernel adds or removes devices
+# instead of polling sysfs at a fixed interval.
+
+import errno
+import select
+import socket
+
+from typing import Dict, Union
+
+NETLINK_KOBJECT_UEVENT = 15
+# multicast group of the events sent by the kernel (udev re-broadcasts on group 2)
+UEVENT_KERNEL_GROUP = 1
+
+_RECV_BUFFER_SIZE = 1 << 16
+_SOCKET_BUFFER_SIZE = 1 << 20
+
+# The ACTION of the event returned when events were lost
+# (the receive buffer overflowed), so anything may have changed
+RESYNC_ACTION = "resync"
+
+def parse_uevent(data: bytes) -> Dict[str, str]:
+    """
+    Parses a kernel uevent message.
+
+    Args:
+        data (bytes): The message as received from the socket,
+                      "ACTION@DEVPATH" followed by NUL separated
+                      KEY=VALUE pairs.
+
+    Returns:
+        dict: The KEY=VALUE pairs of the event (e.g. ACTION, DEVPATH,
+              SUBSYSTEM, PCI_SLOT_NAME, INTERFACE).
+    """
+    event: Dict[str, str] = {}
+    for part in data.split(b'\0')[1:]:
+        if b'=' in part:
+            key, value = part.split(b'=', 1)
+            event[key.decode()] = value.decode(errors='replace')
+    return event
+
+def is_resync(event: Dict[str, str]) -> bool:
+    """
+    Checks if an event reports that events were lost and the
+    devices must be detected again.
+    """
+    return event.get('ACTION') == RESYNC_ACTION
+
+class UeventSource:
+    """
+    Receives the uevents broadcast by the kernel.
+
+    Any object with the same wait() and close() methods can be passed
+    to the wait functions in place of this class (e.g. a fake feed of
+    events for testing).
+    """
+
+    def __init__(self):
+        self._sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+        try:
+            # bursts of events are sent when many VFs are created at once
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, _SOCKET_BUFFER_SIZE)
+            self._sock.bind((0, UEVENT_KERNEL_GROUP))
+        except OSError:
+            self._sock.close()
+            raise
+
+    def wait(self, timeout: float) -> Union[Dict[str, str], None]:
+        """
+        Waits for the next event.
+
+        Args:
+            timeout (float): The maximum number of seconds to wait.
+
+        Returns:
+            dict: The event. An event with the ACTION RESYNC_ACTION if events
+                  were lost (the receive buffer overflowed), so anything may
+                  have changed. None if no event arrived before the timeout.
+        """
+        ready, _, _ = select.select([self._sock], [], [], max(0, timeout))
+        if not ready:
+            return None
+        try:
+            data = self._sock.recv(_RECV_BUFFER_SIZE)
+        except OSError as e:
+            if e.errno == errno.ENOBUFS:
+                return {'ACTION': RESYNC_ACTION}
+            raise
+        return parse_uevent(data)
+
+    def close(self) -> None:
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+def open_event_source() -> Union[UeventSource, None]:
+    """
+    Opens a UeventSource.
+
+    Returns:
+        UeventSource: The event source. None if uevents are not
+                      available (e.g. inside a container).
+    """
+    try:
+        return UeventSource()
+    except OSError:
+        return None
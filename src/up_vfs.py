@@ -0,0 +1,160 @@
+# The command function for vfnet up
+#
+# Applies the vfnet config file (/etc/vfnet/vf.config) on boot. Replaces
+# the loop of the vfup script: the config file is parsed once, detection
+# runs once and every PF is set from this process, concurrently.
+
+import os
+import sys
+import text_help as text_help
+import detection as detection
+import set_vfs as set_vfs
+import install_vfnet as install_vfnet
+import vfup as vfup
+import config_store as config_store
+import reconcile as reconcile
+
+from typing import List, Tuple
+
+def print_help():
+    """Prints the help information for vfnet up"""
+    print("Usage: vfnet up [OPTIONS]")
+    print("")
+    print("Creates the VFs configured in the vfnet config file. Run on boot by the vfnet service.")
+    print("\nOptions:")
+    option_help = [
+        ['-h, --help', 'Print help information'],
+        ['-f, --force', 'Recreate the VFs of network devices that already have a different number of VFs'],
+    ]
+    for option in option_help:
+        option_name = option[0]
+        option_description = option[1]
+        wrapped_description = text_help.wrap_text(option_description, 73)
+        for i, description_line in enumerate(wrapped_description):
+            print("  {:<14}{}".format(option_name if i == 0 else "", description_line))
+
+# Executed when the user calls vfnet up [COMMAND_ARGS]
+def up_command(command_args: List[str]):
+    """
+    Creates the VFs configured in the vfnet config file
+
+    Args:
+        command_args (list): The arguments for the up command.
+                              Assumes you have already removed the "vfnet up"
+                              portion.
+    """
+    force = "-f" in command_args or "--force" in command_args
+    up_vfs(force)
+
+def _read_config_lines() -> List[Tuple[str, str]]:
+    """
+    Reads the interface:number lines of the vfnet config file.
+    Invalid lines are reported and skipped.
+
+    Returns:
+        list: The (interface, number of VFs) of each valid line, in file order.
+    """
+    if not install_vfnet.get_config_file_location():
+        raise Exception("Settings file not found: {}".format(install_vfnet.get_config_file_path()))
+
+    lines = []
+    config = config_store.read_config()
+    for error in config.invalid_lines():
+        print(error, file=sys.stderr)
+    for interface, vf_count in config.pf_entries():
+        if interface == "" or vf_count == "":
+            print(f"Invalid line in settings file: {interface}:{vf_count}")
+            continue
+        lines.append((interface, vf_count))
+    return lines
+
+def up_vfs(force: bool = False) -> None:
+    """
+    Creates the VFs configured in the vfnet config file.
+
+    Every line is validated first, then all the network devices
+    that need to change are set at once.
+
+    Args:
+        force (bool): Recreate the VFs of network devices that already
+                      have a different number of VFs. Otherwise they
+                      are skipped with a warning.
+    """
+    config_lines = _read_config_lines()
+
+    # Verify that the current user has permissions to edit root files
+    if os.geteuid() != 0:
+        print("Warning: User does not have root permissions to edit the files")
+        return
+
+    detection.detect_network_devices(use_cache=False)
+
+    targets = []
+    for interface, vf_count in config_lines:
+        print(f"Configuring {vf_count} VFs for interface {interface}")
+
+        try:
+            num_vfs = int(vf_count)
+        except ValueError:
+            print(f"Error: Invalid VF count '{vf_count}' for interface {interface}")
+            continue
+
+        pf = detection.get_pf(interface)
+        if pf is None:
+            if detection.get_vf(interface) is not None:
+                print(f"Error: Network device {interface} is not a physical NIC")
+            elif os.path.isdir(os.path.join(detection.NIC_DIR, interface, "device")):
+                print(f"Error: Network device {interface} is not using the PCI subsystem NIC")
+            else:
+                print(f"Error: Network device {interface} does not exist")
+            continue
+
+        if not pf.sriov_capable:
+            print(f"Error: Network device {interface} does not support VF configuration")
+            continue
+
+        if num_vfs < 0:
+            print(f"Error: Invalid VF count '{vf_count}' for interface {interface}")
+            continue
+
+        # Verify that the number of VFs to be created is within the supported range
+        if num_vfs > pf.sriov_totalvfs:
+            print(f"Error: The requested number of VFs ({num_vfs}) for interface {interface} exceeds the maximum supported value ({pf.sriov_totalvfs})")
+            num_vfs = pf.sriov_totalvfs
+            print(f"Number of VFs has been decreased to the maximum supported value: {num_vfs}")
+
+        # Check if the number of VFs is already set to the requested number
+        if pf.sriov_numvfs == num_vfs:
+            print(f"The number of VFs for interface {interface} is already set to {num_vfs}")
+            continue
+
+        # Check if the number of VFs is already set to a different value
+        if pf.sriov_numvfs != 0:
+            if not force:
+                print(f"Warning: The interface {interface} already has VFs configured.")
+                print("Modifying the number of VFs will require destroying all existing VFs before configuring the new number of VFs.")
+                print("If you would like to continue, please call the up command again with the '-f' flag.")
+                continue
+            print(f"Forcing VF configuration from {pf.sriov_numvfs} to {num_vfs}. This will remove all existing VFs. Please wait...")
+
+        if any(target[0] == pf.interface for target in targets):
+            print(f"Error: Interface {interface} is configured more than once. Using the first line.")
+            continue
+        targets.append((pf.interface, num_vfs))
+
+    if targets:
+        # Create the VF devices of all the interfaces at once
+        print("Creating VF devices for {}".format(", ".join("{} ({})".format(interface, num_vfs) for interface, num_vfs in targets)))
+        try:
+            set_vfs.set_many_vfs(targets)
+        except Exception as e:
+            print(f"Error: {e} Please validate that the interfaces support VFs and that the number of VFs requested is within the supported range.")
+
+    # Apply the settings of single VFs (mac, vlan, spoofchk, trust, state)
+    if vfup.read_vf_settings():
+        print("Applying the settings of the VFs...")
+        if targets:
+            detection.detect_network_devices(use_cache=False)
+        operations = reconcile.plan(counts=False)
+        reconcile.print_plan(operations)
+        reconcile.apply(operations)
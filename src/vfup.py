@@ -1,34 +1,29 @@
 # Used to operate on the vfnet config file used by vfup
 
-import install_vfnet as install_vfnet
+import sys
+import config_store as config_store
 
-from typing import List, Dict, Union, Any
+from typing import Dict, Any
 
 # Read configuration of vf interfaces from vfnet config file
 def read_vf_config():
     """
     Read the vfnet config file and return the contents as a dictionary.
     """
-    config_file = install_vfnet.get_config_file_location()
+    return config_store.read_config().get_num_vfs()
 
-    if(not config_file):
-        raise Exception("vfnet is not installed. Please install vfnet first.")
-    
-    vf_config: Dict[str,int] = {}
-
-    # Read the config file and update the desired interface
-    with open(config_file, 'r') as file:
-        lines = file.readlines()
-
-        for line in lines:
-            line = line.strip()
-            if line.startswith("#") or line == "":
-                continue
-            else:
-                interface, num_vfs = line.split(":")
-                vf_config[interface] = int(num_vfs)
+def read_vf_settings() -> Dict[str, Dict[int, Dict[str, Any]]]:
+    """
+    Read the settings of single VFs from the vfnet config file.
+    Invalid lines are reported and skipped.
 
-    return vf_config
+    Returns:
+        dict: The settings of each VF keyed by PF interface, then VF index.
+    """
+    config = config_store.read_config()
+    for error in config.invalid_lines(vf_settings=True):
+        print(f"Error: {error}", file=sys.stderr)
+    return config.get_vf_settings()
 
 # Persist vf interface configuration for a pf to the vfnet config file
 def persist_pf_config(pf_interface, num_vfs):
@@ -47,29 +42,22 @@ def persist_pf_config(pf_interface, num_vfs):
                             to persist the number of VFs for.
         num_vfs (int): The number of VFs to persist for the PF interface.
     """
-    config_file = install_vfnet.get_config_file_location()
+    persist_pf_configs({pf_interface: num_vfs})
 
-    if(not config_file):
-        raise Exception("vfnet is not installed. Please install vfnet first.")
-    
-    updated_lines = []
-
-    # Read the config file and update the desired interface
-    with open(config_file, 'r') as file:
-        lines = file.readlines()
-        found = False
-
-        for line in lines:
-            if line.startswith(pf_interface + ":"):
-                updated_lines.append(pf_interface + ":" + str(num_vfs) + "\n")
-                found = True
-            else:
-                updated_lines.append(line)
+# Persist vf interface configuration for several pfs to the vfnet config file at once
+def persist_pf_configs(pf_configs: Dict[str, int]):
+    """
+    Persist the number of VFs to create for several PF interfaces to the vfnet config file.
+    The file is updated in a single locked transaction (see config_store.open_config),
+    so concurrent runs do not lose each other's updates and the file is
+    never left partially written.
 
-        # If the interface was not found, append a new line
-        if not found:
-            updated_lines.append(pf_interface + ":" + str(num_vfs) + "\n")
+    Same rules as persist_pf_config for each PF interface.
 
-    # Write the updated lines back to the config file
-    with open(config_file, 'w') as file:
-        file.writelines(updated_lines)
\ No newline at end of file
+    Args:
+        pf_configs (dict): The number of VFs to persist keyed by
+                           PF interface name (cannot be PCI address).
+    """
+    with config_store.open_config() as config:
+        for pf_interface, num_vfs in pf_configs.items():
+            config.set_num_vfs(pf_interface, num_vfs)
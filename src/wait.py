@@ -0,0 +1,54 @@
+# Polling primitive used by every wait loop in vfnet
+#
+# Checks a condition with an exponential backoff that starts in the
+# millisecond range, so fast operations are noticed almost immediately
+# while slow ones are not polled in a busy loop.
+
+import time
+
+from typing import Callable
+
+# Defaults of wait_until
+INITIAL_INTERVAL = 0.001
+MAX_INTERVAL = 1.0
+BACKOFF = 2.0
+
+def wait_until(condition: Callable[[], bool],
+               timeout: float,
+               initial_interval: float = INITIAL_INTERVAL,
+               max_interval: float = MAX_INTERVAL,
+               backoff: float = BACKOFF,
+               clock: Callable[[], float] = time.monotonic,
+               sleep: Callable[[float], None] = time.sleep) -> bool:
+    """
+    Waits until a condition is true or the deadline passes.
+
+    The condition is checked immediately, then after each sleep.
+    The sleep starts at initial_interval and is multiplied by backoff
+    after every check, up to max_interval. Sleeps never extend past
+    the deadline.
+
+    Args:
+        condition (function): Returns True once the wait is over.
+        timeout (float): Number of seconds until the deadline.
+        initial_interval (float): The first sleep in seconds.
+        max_interval (float): The longest sleep in seconds.
+        backoff (float): The factor applied to the sleep after each check.
+        clock (function): Returns the current time in seconds.
+                          Injectable for testing.
+        sleep (function): Sleeps for the given number of seconds. May return
+                          early (e.g. when an event arrives). Injectable
+                          for testing.
+
+    Returns:
+        bool: True if the condition became true before the deadline.
+    """
+    deadline = clock() + timeout
+    interval = initial_interval
+    while not condition():
+        remaining = deadline - clock()
+        if remaining <= 0:
+            return False
+        sleep(min(interval, remaining))
+        interval = min(interval * backoff, max_interval)
+    return True
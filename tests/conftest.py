@@ -0,0 +1,52 @@
+# Shared fixtures of the vfnet tests
+#
+# The modules of vfnet live flat in src/ and import each other by name,
+# so src/ is added to the path the same way __main__.py sees it.
+# fake_sysfs builds a small sysfs tree (see fake_sysfs.build_sysfs)
+# and points detection at it.
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import detection as detection
+import ip_link as ip_link
+import pci_ids as pci_ids
+
+from fake_sysfs import build_sysfs
+
+@pytest.fixture
+def make_sysfs(tmp_path, monkeypatch):
+    """
+    Returns a function building a fake sysfs tree (see build_sysfs)
+    and pointing detection, ip_link and pci_ids at it.
+    """
+    def make(num_pfs=2, num_vfs=3):
+        sysfs = build_sysfs(str(tmp_path / "sys"), num_pfs, num_vfs)
+        monkeypatch.setattr(detection, "NIC_DIR", sysfs['net_dir'])
+        monkeypatch.setattr(detection, "PCI_DEVICES_DIR", sysfs['devices_dir'])
+        # restored after the test, like the patched paths
+        monkeypatch.setattr(detection, "_inventory", detection._inventory)
+        monkeypatch.setattr(detection, "_detection_complete", detection._detection_complete)
+        monkeypatch.setattr(detection, "USE_DAEMON", False)
+        monkeypatch.setattr(detection, "USE_CACHE", False)
+        monkeypatch.setattr(detection, "CACHE_DIR", str(tmp_path / "run"))
+        monkeypatch.setattr(detection, "CACHE_FILE", str(tmp_path / "run" / "detection.json"))
+        monkeypatch.setattr(detection, "_get_mac_address",
+                            lambda device: open(os.path.join(sysfs['net_dir'], device, "address")).read().strip())
+        monkeypatch.setattr(ip_link, "get_ip_links",
+                            lambda names, stats=False: {name: sysfs['links'][name] for name in names if name in sysfs['links']})
+        monkeypatch.setattr(pci_ids, "PCI_IDS_PATHS", [sysfs['pci_ids']])
+        monkeypatch.setattr(pci_ids, "_pci_ids_map", None)
+        monkeypatch.setattr(pci_ids, "_vendor_index", None)
+        monkeypatch.setattr(pci_ids, "_device_names", {})
+        return sysfs
+    return make
+
+@pytest.fixture
+def fake_sysfs(make_sysfs):
+    """A fake sysfs tree with 2 PFs of 3 VFs each (see build_sysfs)"""
+    return make_sysfs()
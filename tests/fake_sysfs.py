@@ -0,0 +1,90 @@
+# Builds a fake sysfs tree for the tests and the benchmarks
+#
+# The tree holds PFs with VFs, one VF of each PF passed through to
+# vfio-pci without a netdev, and a pci.ids file naming the devices.
+
+import os
+
+PCI_IDS = """# pci.ids used by the tests
+8086  Intel Corporation
+\t1563  Ethernet Controller 10G X550T
+\t1565  X550 Virtual Function
+\t\t8086 0001  Subsystem
+C 02  Network controller
+\t00  Ethernet controller
+"""
+
+def _write(path, value):
+    with open(path, 'w') as f:
+        f.write(value)
+
+def build_sysfs(root, num_pfs=2, num_vfs=3):
+    """
+    Builds a fake sysfs tree under root.
+
+    Each PF enp1s0f<p> (0000:01:00.<p>, ixgbe) has num_vfs VFs. The VFs
+    are bound to ixgbevf with a netdev enp1s0f<p>v<v>, except the last
+    one, bound to vfio-pci without a netdev.
+
+    Returns:
+        dict: The net, pci devices and pci.ids paths, and the ip link
+              output of the PFs keyed by interface.
+    """
+    net_dir = os.path.join(root, "class", "net")
+    pci_dir = os.path.join(root, "bus", "pci")
+    devices_dir = os.path.join(pci_dir, "devices")
+    os.makedirs(net_dir)
+    os.makedirs(devices_dir)
+    for driver, module in [("ixgbe", "ixgbe"), ("ixgbevf", "ixgbevf"), ("vfio-pci", "vfio_pci")]:
+        os.makedirs(os.path.join(pci_dir, "drivers", driver))
+        os.makedirs(os.path.join(root, "module", module))
+        os.symlink(os.path.join(root, "module", module), os.path.join(pci_dir, "drivers", driver, "module"))
+
+    iommu_group = 10
+    def add_pci_device(pci_address, device_id, driver):
+        nonlocal iommu_group
+        device_dir = os.path.join(devices_dir, pci_address)
+        os.makedirs(device_dir)
+        _write(os.path.join(device_dir, "vendor"), "0x8086\n")
+        _write(os.path.join(device_dir, "device"), device_id + "\n")
+        os.symlink(pci_dir, os.path.join(device_dir, "subsystem"))
+        os.symlink(os.path.join(pci_dir, "drivers", driver), os.path.join(device_dir, "driver"))
+        group_dir = os.path.join(root, "kernel", "iommu_groups", str(iommu_group))
+        os.makedirs(group_dir)
+        os.symlink(group_dir, os.path.join(device_dir, "iommu_group"))
+        iommu_group += 1
+        return device_dir
+
+    def add_netdev(interface, device_dir, mac_address):
+        os.makedirs(os.path.join(net_dir, interface))
+        os.symlink(device_dir, os.path.join(net_dir, interface, "device"))
+        os.makedirs(os.path.join(device_dir, "net", interface))
+        _write(os.path.join(net_dir, interface, "address"), mac_address + "\n")
+
+    links = {}
+    for p in range(num_pfs):
+        interface = f"enp1s0f{p}"
+        pf_dir = add_pci_device(f"0000:01:00.{p}", "0x1563", "ixgbe")
+        _write(os.path.join(pf_dir, "sriov_numvfs"), f"{num_vfs}\n")
+        _write(os.path.join(pf_dir, "sriov_totalvfs"), "63\n")
+        add_netdev(interface, pf_dir, f"d0:23:23:23:45:{p:02x}")
+        vfinfo_list = []
+        for v in range(num_vfs):
+            number = p * num_vfs + v
+            mac_address = f"02:00:00:{p:02x}:{v >> 8:02x}:{v & 0xff:02x}"
+            last = v == num_vfs - 1
+            vf_dir = add_pci_device(f"0000:{2 + number // 256:02x}:{number % 256 // 8:02x}.{number % 8}", "0x1565", "vfio-pci" if last else "ixgbevf")
+            os.symlink(pf_dir, os.path.join(vf_dir, "physfn"))
+            os.symlink(vf_dir, os.path.join(pf_dir, f"virtfn{v}"))
+            if not last:
+                add_netdev(f"{interface}v{v}", vf_dir, mac_address)
+            vfinfo_list.append({'vf': v, 'link_type': 'ether', 'address': mac_address})
+        links[interface] = {'ifname': interface, 'vfinfo_list': vfinfo_list}
+
+    # not a PCI device, ignored by detection
+    os.makedirs(os.path.join(net_dir, "lo"))
+    _write(os.path.join(net_dir, "lo", "address"), "00:00:00:00:00:00\n")
+
+    pci_ids_file = os.path.join(root, "pci.ids")
+    _write(pci_ids_file, PCI_IDS)
+    return {'net_dir': net_dir, 'devices_dir': devices_dir, 'pci_ids': pci_ids_file, 'links': links}
@@ -0,0 +1,86 @@
+# Builds rtm_newlink_pf.bin, the RTM_GETLINK reply of a PF with VFs
+#
+# No SR-IOV hardware was at hand to record one with record_link.py, so
+# the reply is laid out attribute by attribute the way the kernel fills
+# it (rtnl_fill_ifinfo and rtnl_fill_vfinfo in net/core/rtnetlink.c),
+# for an ixgbe PF enp1s0f0 with 2 VFs queried with the VF counters.
+# It is packed here without rtnetlink.py so the decoder is not tested
+# against its own encoding. Replace it with a recording when possible:
+#   python3 tests/fixtures/record_link.py <pf> tests/fixtures/rtm_newlink_pf
+#
+# Usage: python3 tests/fixtures/build_pf_link.py
+
+import os
+import struct
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rtm_newlink_pf.bin")
+
+RTM_NEWLINK = 16
+ARPHRD_ETHER = 1
+IFF_UP, IFF_BROADCAST, IFF_RUNNING, IFF_MULTICAST, IFF_LOWER_UP = 0x1, 0x2, 0x40, 0x1000, 0x10000
+ETH_P_8021Q = 0x8100
+
+def attr(attr_type, payload):
+    length = 4 + len(payload)
+    return struct.pack('=HH', length, attr_type) + payload + b'\0' * (-length % 4)
+
+def u8(value):
+    return struct.pack('=B', value)
+
+def u32(value):
+    return struct.pack('=I', value)
+
+def u64(value):
+    return struct.pack('=Q', value)
+
+def mac(address, size=6):
+    return bytes.fromhex(address.replace(':', '')).ljust(size, b'\0')
+
+def vf_info(vf, address, vlan, qos, max_tx_rate, spoofchk, link_state, trust, stats):
+    attrs = attr(1, u32(vf) + mac(address, 32))                                 # IFLA_VF_MAC
+    attrs += attr(13, mac("ff:ff:ff:ff:ff:ff", 32))                             # IFLA_VF_BROADCAST
+    attrs += attr(2, u32(vf) + u32(vlan) + u32(qos))                            # IFLA_VF_VLAN
+    attrs += attr(6, u32(vf) + u32(0) + u32(max_tx_rate))                       # IFLA_VF_RATE
+    attrs += attr(3, u32(vf) + u32(max_tx_rate))                                # IFLA_VF_TX_RATE
+    attrs += attr(4, u32(vf) + u32(spoofchk))                                   # IFLA_VF_SPOOFCHK
+    attrs += attr(5, u32(vf) + u32(link_state))                                 # IFLA_VF_LINK_STATE
+    attrs += attr(7, u32(vf) + u32(0))                                          # IFLA_VF_RSS_QUERY_EN
+    attrs += attr(9, u32(vf) + u32(trust))                                      # IFLA_VF_TRUST
+    vlan_info = u32(vf) + u32(vlan) + u32(qos) + struct.pack('!H', ETH_P_8021Q) + b'\0\0'
+    attrs += attr(12, attr(1, vlan_info))                                       # IFLA_VF_VLAN_LIST
+    # IFLA_VF_STATS_RX_PACKETS .. IFLA_VF_STATS_TX_DROPPED, 6 is the pad
+    attrs += attr(8, b''.join(attr(counter, u64(value)) for counter, value in zip([0, 1, 2, 3, 4, 5, 7, 8], stats)))
+    return attr(1, attrs)                                                       # IFLA_VF_INFO
+
+def main():
+    body = struct.pack('=BxHiII', 0, ARPHRD_ETHER, 4, IFF_UP | IFF_BROADCAST | IFF_RUNNING | IFF_MULTICAST | IFF_LOWER_UP, 0)
+    body += attr(3, b'enp1s0f0\0')                                              # IFLA_IFNAME
+    body += attr(13, u32(1000))                                                 # IFLA_TXQLEN
+    body += attr(16, u8(6))                                                     # IFLA_OPERSTATE
+    body += attr(17, u8(0))                                                     # IFLA_LINKMODE
+    body += attr(4, u32(1500))                                                  # IFLA_MTU
+    body += attr(50, u32(68))                                                   # IFLA_MIN_MTU
+    body += attr(51, u32(9710))                                                 # IFLA_MAX_MTU
+    body += attr(27, u32(0))                                                    # IFLA_GROUP
+    body += attr(30, u32(0))                                                    # IFLA_PROMISCUITY
+    body += attr(31, u32(64))                                                   # IFLA_NUM_TX_QUEUES
+    body += attr(32, u32(64))                                                   # IFLA_NUM_RX_QUEUES
+    body += attr(33, u8(1))                                                     # IFLA_CARRIER
+    body += attr(6, b'mq\0')                                                    # IFLA_QDISC
+    body += attr(1, mac("d0:23:23:23:45:00"))                                   # IFLA_ADDRESS
+    body += attr(2, mac("ff:ff:ff:ff:ff:ff"))                                   # IFLA_BROADCAST
+    body += attr(23, bytes(24 * 8))                                             # IFLA_STATS64
+    body += attr(21, u32(2))                                                    # IFLA_NUM_VF
+    body += attr(22,                                                            # IFLA_VFINFO_LIST
+                 vf_info(0, "02:00:00:00:00:01", vlan=100, qos=0, max_tx_rate=0, spoofchk=1, link_state=0, trust=0,
+                         stats=[1200, 800, 1536000, 96000, 3, 40, 2, 0]) +
+                 vf_info(1, "02:00:00:00:00:02", vlan=0, qos=0, max_tx_rate=1000, spoofchk=0, link_state=1, trust=1,
+                         stats=[0, 0, 0, 0, 0, 0, 0, 0]))
+    # a reply to a request by name is a single message without NLM_F_MULTI
+    message = struct.pack('=IHHII', 16 + len(body), RTM_NEWLINK, 0, 1, 0) + body
+    with open(FIXTURE, "wb") as f:
+        f.write(message)
+    print(f"Wrote {len(message)} bytes to {FIXTURE}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# Records the RTM_GETLINK reply of a link for the decoder tests
+#
+# Run on a host with the link, e.g. a PF with VFs:
+#   python3 tests/fixtures/record_link.py enp1s0f0 tests/fixtures/rtm_newlink_pf
+# writes the raw reply, with the VF counters, to <prefix>.bin and the
+# output of `ip -j -s link show dev <ifname>` to <prefix>.json.
+
+import os
+import sys
+import socket
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "src"))
+
+import rtnetlink as rtnetlink
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: python3 tests/fixtures/record_link.py <ifname> <prefix>", file=sys.stderr)
+        sys.exit(1)
+    ifname, prefix = sys.argv[1], sys.argv[2]
+
+    ifinfomsg = rtnetlink._IFINFOMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0)
+    request = ifinfomsg + rtnetlink._pack_attr(rtnetlink.IFLA_IFNAME, ifname.encode() + b'\0') + rtnetlink._ext_mask(True)
+    with rtnetlink._open_socket() as sock:
+        rtnetlink._request(sock, rtnetlink.RTM_GETLINK, 0, request)
+        reply = rtnetlink._recv(sock)
+    # fails on an error reply, e.g. if the link does not exist
+    rtnetlink.decode_link_messages(reply)
+    with open(prefix + ".bin", "wb") as f:
+        f.write(reply)
+
+    ip_output = subprocess.run(["ip", "-j", "-s", "link", "show", "dev", ifname], capture_output=True, text=True, check=True)
+    with open(prefix + ".json", "w") as f:
+        f.write(ip_output.stdout)
+    print(f"Recorded {ifname} to {prefix}.bin and {prefix}.json")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import os
+import json
+import threading
+import socketserver
+
+import pytest
+
+import detection as detection
+import daemon as daemon
+import daemon_client as daemon_client
+
+@pytest.fixture
+def inventory(fake_sysfs, monkeypatch):
+    monkeypatch.setattr(daemon, "_list_result", None)
+    monkeypatch.setattr(daemon, "_list_inventory", None)
+    detection.detect_network_devices(use_cache=False)
+    return fake_sysfs
+
+@pytest.fixture
+def socket_path(inventory, tmp_path):
+    # the daemon's socket server, without its event threads
+    path = str(tmp_path / "vfnet.sock")
+    server = socketserver.ThreadingUnixStreamServer(path, daemon._RequestHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield path
+    server.shutdown()
+    server.server_close()
+
+def _request(**request):
+    return daemon.handle_request(json.dumps(request).encode())
+
+def test_round_trip_list(socket_path):
+    response = daemon_client.request('list', socket_path=socket_path)
+
+    assert response['ok'] and response['v'] == daemon_client.PROTOCOL_VERSION
+    assert len(response['result']['pfs']) == 2 and len(response['result']['vfs']) == 6
+    # the client rebuilds the same inventory
+    served = detection.inventory_from_dicts(response['result']['pfs'], response['result']['vfs'])
+    assert served.get_vf("enp1s0f1v0").to_dict() == detection.get_inventory().get_vf("enp1s0f1v0").to_dict()
+
+def test_round_trip_get(socket_path):
+    pf = daemon_client.request('get', socket_path=socket_path, device="enp1s0f0")
+    vf = daemon_client.request('get', socket_path=socket_path, device="0000:02:00.2")
+
+    assert pf['result']['type'] == 'pf' and len(pf['result']['vfs']) == 3
+    assert vf['result']['type'] == 'vf' and vf['result']['vf']['driver'] == "vfio-pci"
+
+def test_round_trip_refresh(socket_path):
+    before = detection.get_inventory()
+
+    response = daemon_client.request('refresh', socket_path=socket_path)
+
+    assert response == {'ok': True, 'result': {'pfs': 2, 'vfs': 6}, 'v': daemon_client.PROTOCOL_VERSION}
+    assert detection.get_inventory() is not before
+
+def test_get_unknown_device(inventory):
+    assert _request(op='get', device="eth9") == {'ok': False, 'error': "Network device eth9 not found", 'v': daemon_client.PROTOCOL_VERSION}
+    assert not _request(op='get')['ok']
+
+def test_invalid_requests(inventory):
+    assert daemon.handle_request(b"not json")['error'] == "The request is not a JSON object"
+    assert daemon.handle_request(b"[1]")['error'] == "The request is not a JSON object"
+    assert _request(op='list', v=daemon_client.PROTOCOL_VERSION + 1)['error'].startswith("Unsupported protocol version")
+    # set runs in the CLI, the daemon only refreshes
+    assert _request(op='set')['error'] == "Unknown operation: set"
+
+def test_uevent_filter(inventory):
+    def net_event(interface, devpath):
+        return {'ACTION': "change", 'SUBSYSTEM': "net", 'INTERFACE': interface, 'DEVPATH': devpath}
+
+    assert daemon._is_inventory_uevent({'ACTION': "resync"})
+    assert daemon._is_inventory_uevent(net_event("enp1s0f0v1", "/devices/pci0000:00/0000:02:00.1/net/enp1s0f0v1"))
+    assert not daemon._is_inventory_uevent(net_event("tap0", "/devices/virtual/net/tap0"))
+    # a virtual interface named like a VF is still ignored
+    assert not daemon._is_inventory_uevent(net_event("enp1s0f0v1", "/devices/virtual/net/enp1s0f0v1"))
+    assert not daemon._is_inventory_uevent(net_event("eth9", "/devices/pci0000:00/0000:09:00.0/net/eth9"))
+    assert not daemon._is_inventory_uevent({'ACTION': "add", 'SUBSYSTEM': "block", 'DEVPATH': "/devices/virtual/block/loop0"})
+
+def test_uevent_filter_pci(inventory):
+    def pci_event(pci_address):
+        return {'ACTION': "add", 'SUBSYSTEM': "pci", 'PCI_SLOT_NAME': pci_address}
+
+    # a VF without a netdev, known to the inventory
+    assert daemon._is_inventory_uevent(pci_event("0000:02:00.2"))
+    # a new network controller, and a device that is not one
+    for pci_address, pci_class in [("0000:03:00.0", "0x020000"), ("0000:04:00.0", "0x010802")]:
+        os.makedirs(os.path.join(inventory['devices_dir'], pci_address))
+        with open(os.path.join(inventory['devices_dir'], pci_address, "class"), 'w') as f:
+            f.write(pci_class + "\n")
+    assert daemon._is_inventory_uevent(pci_event("0000:03:00.0"))
+    assert not daemon._is_inventory_uevent(pci_event("0000:04:00.0"))
+    # removed before the event was read
+    assert not daemon._is_inventory_uevent(pci_event("0000:05:00.0"))
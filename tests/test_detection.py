@@ -0,0 +1,128 @@
+import os
+import subprocess
+
+import detection as detection
+
+LSPCI_OUTPUT = """Slot:\t0000:01:00.0
+Class:\tEthernet controller
+Vendor:\tIntel Corporation
+Device:\tEthernet Controller 10G X550T
+Driver:\tixgbe
+Module:\tixgbe
+IOMMUGroup:\t10
+
+Slot:\t0000:02:00.0
+Class:\tEthernet controller
+Vendor:\tIntel Corporation
+Device:\tX550 Virtual Function
+Driver:\tvfio-pci
+Module:\tvfio_pci
+IOMMUGroup:\t11"""
+
+def test_parse_lspci_output():
+    pci_devices = detection.parse_lspci_output(LSPCI_OUTPUT)
+
+    assert list(pci_devices) == ["0000:01:00.0", "0000:02:00.0"]
+    assert pci_devices["0000:01:00.0"]["Device"] == "Ethernet Controller 10G X550T"
+    assert pci_devices["0000:02:00.0"]["Driver"] == "vfio-pci"
+    assert pci_devices["0000:02:00.0"]["IOMMUGroup"] == "11"
+
+def test_parse_lspci_output_skips_blocks_without_slot():
+    pci_devices = detection.parse_lspci_output("Class:\tBridge\n\n\n" + LSPCI_OUTPUT + "\n\n")
+
+    assert list(pci_devices) == ["0000:01:00.0", "0000:02:00.0"]
+
+def test_read_sysfs_pci_data(fake_sysfs):
+    assert detection.read_sysfs_pci_data("0000:01:00.0") == {
+        'Vendor': "Intel Corporation",
+        'Device': "Ethernet Controller 10G X550T",
+        'Driver': "ixgbe",
+        'Module': "ixgbe",
+        'IOMMUGroup': "10",
+    }
+
+def test_read_sysfs_pci_data_without_name_or_driver(fake_sysfs):
+    device_dir = os.path.join(fake_sysfs['devices_dir'], "0000:01:00.0")
+    with open(os.path.join(device_dir, "device"), 'w') as f:
+        f.write("0xffff\n")
+    os.remove(os.path.join(device_dir, "driver"))
+
+    pci_data = detection.read_sysfs_pci_data("0000:01:00.0")
+
+    assert pci_data['Device'] == "ffff"
+    assert 'Driver' not in pci_data and 'Module' not in pci_data
+
+def test_detect_network_devices(fake_sysfs):
+    detection.detect_network_devices(use_cache=False)
+    current = detection.get_inventory()
+
+    assert sorted(pf.interface for pf in current.pfs.values()) == ["enp1s0f0", "enp1s0f1"]
+    assert len(current.vfs) == 6
+
+    pf = current.get_pf("enp1s0f0")
+    assert pf.sriov_capable and pf.sriov_numvfs == 3 and pf.sriov_totalvfs == 63
+    assert pf.device_name == "Ethernet Controller 10G X550T"
+
+    vfs = current.get_vfs_of_pf(pf.pci_address)
+    assert [vf.vf_num for vf in sorted(vfs, key=lambda vf: vf.vf_num)] == [0, 1, 2]
+    vf = current.get_vf("enp1s0f0v1")
+    assert vf.driver == "ixgbevf" and vf.mac_address == "02:00:00:00:00:01"
+
+    # passed through, found through the virtfn link of its PF
+    passed_through = current.get_vf_by_num(pf.pci_address, 2)
+    assert passed_through.interface is None
+    assert passed_through.driver == "vfio-pci" and passed_through.module == "vfio_pci"
+    assert passed_through.mac_address == "02:00:00:00:00:02"
+
+def test_parallel_detection_matches_serial(fake_sysfs, monkeypatch):
+    detection.detect_network_devices(use_cache=False)
+    serial = detection.get_inventory()
+
+    monkeypatch.setattr(detection, "DETECTION_WORKERS", 4)
+    detection.detect_network_devices(use_cache=False)
+    parallel = detection.get_inventory()
+
+    assert [pf.to_dict() for pf in parallel.pfs.values()] == [pf.to_dict() for pf in serial.pfs.values()]
+    assert [vf.to_dict() for vf in parallel.vfs.values()] == [vf.to_dict() for vf in serial.vfs.values()]
+
+def test_lspci_backend_runs_lspci_once(fake_sysfs, monkeypatch):
+    calls = []
+    def run(command, *args, **kwargs):
+        calls.append(command)
+        return subprocess.CompletedProcess(command, 0, LSPCI_OUTPUT, "")
+    monkeypatch.setattr(detection, "PCI_BACKEND", "lspci")
+    monkeypatch.setattr(subprocess, "run", run)
+
+    detection.detect_network_devices(use_cache=False)
+
+    assert calls == [["lspci", "-vmmk", "-D"]]
+    current = detection.get_inventory()
+    assert current.get_pf("enp1s0f0").driver == "ixgbe"
+    # devices missing from the lspci output
+    assert current.get_pf("enp1s0f1").driver == "unknown"
+
+def test_detection_fingerprint_changes_with_numvfs(fake_sysfs):
+    before = detection.detection_fingerprint()
+    with open(os.path.join(fake_sysfs['devices_dir'], "0000:01:00.0", "sriov_numvfs"), 'w') as f:
+        f.write("2\n")
+
+    assert detection.detection_fingerprint() != before
+
+def test_cache_hit_reads_the_vf_macs_again(fake_sysfs, monkeypatch):
+    monkeypatch.setattr(detection, "USE_CACHE", True)
+    detection.detect_network_devices()
+    # MACs changed outside vfnet: VF 2 has no netdev, VF 0 does
+    fake_sysfs['links']['enp1s0f0']['vfinfo_list'][2] = {'vf': 2, 'link_type': 'ether', 'address': "02:00:00:00:aa:02"}
+    with open(os.path.join(fake_sysfs['net_dir'], "enp1s0f0v0", "address"), 'w') as f:
+        f.write("02:00:00:00:aa:00\n")
+
+    def probe(device, get_pci_data):
+        raise AssertionError("the cache was not used")
+    monkeypatch.setattr(detection, "_probe_device", probe)
+    detection.detect_network_devices()
+
+    current = detection.get_inventory()
+    assert current.get_vf("0000:02:00.2").mac_address == "02:00:00:00:aa:02"
+    assert current.get_vf("0000:02:00.2").ip_link_vfinfo['address'] == "02:00:00:00:aa:02"
+    assert current.get_vf("enp1s0f0v0").mac_address == "02:00:00:00:aa:00"
+    assert current.get_vf_by_mac("02:00:00:00:aa:02").pci_address == "0000:02:00.2"
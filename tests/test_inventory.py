@@ -0,0 +1,115 @@
+import copy
+import time
+import tracemalloc
+
+import pytest
+
+import detection as detection
+import inventory as inventory
+
+NUM_PFS = 4
+NUM_VFS = 256
+
+def _build_inventory(num_pfs=NUM_PFS, num_vfs=NUM_VFS):
+    """Builds a frozen inventory of num_pfs PFs with num_vfs VFs each"""
+    current = inventory.Inventory()
+    for p in range(num_pfs):
+        pf_pci_address = f"0000:01:00.{p}"
+        virtfn = {}
+        vfs = []
+        for v in range(num_vfs):
+            number = p * num_vfs + v
+            pci_address = f"0000:{2 + number // 256:02x}:{number % 256 // 8:02x}.{number % 8}"
+            virtfn[f"virtfn{v}"] = {'vf': v, 'pci_address': pci_address, 'parent_pci_address': pf_pci_address}
+            vfs.append(inventory.VFNIC(
+                pci_address=pci_address, interface=f"enp1s0f{p}v{v}", parent_pci_address=pf_pci_address,
+                mac_address=f"02:00:00:{p:02x}:{v >> 8:02x}:{v & 0xff:02x}", driver="ixgbevf",
+                ip_link_vfinfo={'vf': v, 'vlan_list': [{'vlan': 100}]}, vf_num=v,
+            ))
+        current.add_pf(inventory.PhysicalNIC(
+            pci_address=pf_pci_address, interface=f"enp1s0f{p}", sriov_capable=True,
+            sriov_numvfs=num_vfs, sriov_totalvfs=num_vfs, virtfn=virtfn,
+        ))
+        for vf in vfs:
+            current.add_vf(vf)
+    current.freeze()
+    return current
+
+@pytest.fixture
+def large_inventory(monkeypatch):
+    current = _build_inventory()
+    monkeypatch.setattr(detection, "_inventory", current)
+    return current
+
+def test_snapshot_is_shared_without_copying(large_inventory):
+    assert detection.physical_nics() is detection.physical_nics()
+    assert detection.vf_nics() is large_inventory.vfs
+    assert detection.get_pf("enp1s0f1") is large_inventory.get_pf("0000:01:00.1")
+    assert detection.get_vf("enp1s0f0v7") is detection.vf_nics()["0000:02:00.7"]
+
+def test_snapshot_is_read_only(large_inventory):
+    pf = detection.get_pf("enp1s0f0")
+    vf = detection.get_vf("enp1s0f0v0")
+
+    with pytest.raises(AttributeError):
+        pf.sriov_numvfs = 0
+    with pytest.raises(TypeError):
+        pf.virtfn["virtfn0"]['vf'] = 1
+    with pytest.raises(TypeError):
+        vf.ip_link_vfinfo['vlan_list'][0]['vlan'] = 200
+    with pytest.raises(TypeError):
+        detection.physical_nics()["0000:09:00.0"] = pf
+    with pytest.raises(AttributeError):
+        large_inventory.add_vf(vf)
+
+def test_display_fields_are_computed_views():
+    current = inventory.Inventory()
+    current.add_pf(inventory.PhysicalNIC(pci_address="0000:01:00.0", interface="eth0", sriov_capable=True, sriov_numvfs=4, sriov_totalvfs=63))
+    current.add_pf(inventory.PhysicalNIC(pci_address="0000:01:00.1", interface="eth1", sriov_capable=False, sriov_numvfs=0, sriov_totalvfs=0))
+    current.freeze()
+
+    assert current.get_pf("eth0").can_vf_display == "Yes" and current.get_pf("eth0").vfs_display == "4/63"
+    assert current.get_pf("eth1").can_vf_display == "No" and current.get_pf("eth1").vfs_display == ""
+    assert 'vfs_display' not in current.get_pf("eth0").to_dict()
+
+def test_indexes_of_large_snapshot(large_inventory):
+    pf = large_inventory.get_pf("enp1s0f3")
+
+    assert len(large_inventory.vfs) == NUM_PFS * NUM_VFS
+    assert len(large_inventory.get_vfs_of_pf(pf.pci_address)) == NUM_VFS
+    assert large_inventory.get_vf_by_num(pf.pci_address, 255).interface == "enp1s0f3v255"
+    assert large_inventory.get_vf_by_mac("02:00:00:03:00:FF").interface == "enp1s0f3v255"
+
+def test_snapshot_lookups_do_not_allocate(large_inventory):
+    # the deep copies every lookup used to make, for comparison
+    tracemalloc.start()
+    try:
+        copy.deepcopy({pci_address: vf.to_dict() for pci_address, vf in large_inventory.vfs.items()})
+        _, copy_peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        for _ in range(100):
+            detection.physical_nics()
+            detection.vf_nics()
+            detection.get_pf("enp1s0f2")
+            detection.get_vf("enp1s0f2v100")
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert after - before < 4096
+    assert copy_peak > 100 * 4096
+
+def test_snapshot_lookups_are_faster_than_copying(large_inventory):
+    started = time.perf_counter()
+    copy.deepcopy({pci_address: vf.to_dict() for pci_address, vf in large_inventory.vfs.items()})
+    copy_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(100):
+        detection.vf_nics()
+        detection.get_vf("enp1s0f2v100")
+    lookup_time = time.perf_counter() - started
+
+    # 100 lookups of the shared snapshot against a single copy
+    assert lookup_time < copy_time
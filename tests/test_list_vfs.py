@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+import install_vfnet as install_vfnet
+import list_vfs as list_vfs
+import vfup as vfup
+
+PF_FIELDS = {
+    'type', 'pci_address', 'interface', 'mac_address', 'driver', 'module', 'vendor', 'device_name',
+    'iommu_group', 'sriov_capable', 'sriov_numvfs', 'sriov_totalvfs', 'vfs_configured',
+}
+VF_FIELDS = {
+    'type', 'pci_address', 'interface', 'mac_address', 'parent_pci_address', 'parent_interface', 'vf_num',
+    'driver', 'module', 'vendor', 'device_name', 'iommu_group', 'vlan', 'qos', 'spoofchk', 'trust', 'link_state',
+}
+
+@pytest.fixture
+def devices(fake_sysfs, monkeypatch):
+    monkeypatch.setattr(install_vfnet, "is_installed", lambda: True)
+    monkeypatch.setattr(vfup, "read_vf_config", lambda: {'enp1s0f1': 3})
+    fake_sysfs['links']['enp1s0f0']['vfinfo_list'][0].update(
+        vlan_list=[{'vlan': 100, 'qos': 2}], spoofchk=True, trust=False, link_state='auto')
+    return fake_sysfs
+
+def test_ndjson(devices, capsys):
+    list_vfs.list_network_devices('ndjson')
+
+    lines = capsys.readouterr().out.splitlines()
+    assert json.loads(lines[0]) == {'type': 'header', 'schema': list_vfs.LIST_SCHEMA_VERSION}
+    records = [json.loads(line) for line in lines[1:]]
+    for record in records:
+        assert set(record) == (PF_FIELDS if record['type'] == 'pf' else VF_FIELDS)
+    # each PF is followed by its VFs, the PFs in the order they were detected
+    pf_indexes = [index for index, record in enumerate(records) if record['type'] == 'pf']
+    assert len(pf_indexes) == 2 and len(records) == 8
+    for index in pf_indexes:
+        vfs = records[index + 1:index + 4]
+        assert [vf['parent_pci_address'] for vf in vfs] == [records[index]['pci_address']] * 3
+        assert [vf['vf_num'] for vf in vfs] == [0, 1, 2]
+
+def test_record_values(devices, capsys):
+    list_vfs.list_network_devices('ndjson')
+
+    records = {record['pci_address']: record for record in map(json.loads, capsys.readouterr().out.splitlines()[1:])}
+    pf0, pf1, vf0, passed_through = records["0000:01:00.0"], records["0000:01:00.1"], records["0000:02:00.0"], records["0000:02:00.2"]
+    assert pf0['sriov_numvfs'] == 3 and pf0['vfs_configured'] is None and pf1['vfs_configured'] == 3
+    assert vf0['parent_interface'] == "enp1s0f0" and vf0['vf_num'] == 0
+    assert (vf0['vlan'], vf0['qos'], vf0['spoofchk'], vf0['trust'], vf0['link_state']) == (100, 2, True, False, 'auto')
+    # the VF on vfio-pci has no netdev, its MAC comes from the PF
+    assert passed_through['driver'] == "vfio-pci" and passed_through['mac_address'] == "02:00:00:00:00:02"
+    assert passed_through['vlan'] == 0 and passed_through['spoofchk'] is None
+
+def test_json_has_the_ndjson_records(devices, capsys):
+    list_vfs.list_network_devices('ndjson')
+    ndjson_records = [json.loads(line) for line in capsys.readouterr().out.splitlines()[1:]]
+
+    list_vfs.list_network_devices('json')
+
+    document = json.loads(capsys.readouterr().out)
+    assert document == {'schema': list_vfs.LIST_SCHEMA_VERSION, 'devices': ndjson_records}
+
+@pytest.mark.parametrize('output_format', ['json', 'ndjson'])
+def test_nothing_printed_on_failure(devices, monkeypatch, capsys, output_format):
+    def read_vf_config():
+        raise ValueError("Invalid line 1 in the vfnet config file")
+    monkeypatch.setattr(vfup, "read_vf_config", read_vf_config)
+
+    with pytest.raises(ValueError):
+        list_vfs.list_network_devices(output_format)
+
+    assert capsys.readouterr().out == ""
+
+def test_json_without_devices(make_sysfs, capsys):
+    make_sysfs(num_pfs=0)
+
+    list_vfs.list_network_devices('json')
+
+    assert json.loads(capsys.readouterr().out) == {'schema': list_vfs.LIST_SCHEMA_VERSION, 'devices': []}
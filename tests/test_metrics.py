@@ -0,0 +1,79 @@
+import pytest
+
+import install_vfnet as install_vfnet
+import metrics as metrics
+import vfup as vfup
+
+@pytest.fixture
+def scrape(fake_sysfs, monkeypatch):
+    monkeypatch.setattr(metrics, "_inventory_fingerprint", None)
+    monkeypatch.setattr(install_vfnet, "is_installed", lambda: True)
+    monkeypatch.setattr(vfup, "read_vf_config", lambda: {'enp1s0f0': 3})
+    vfinfo = fake_sysfs['links']['enp1s0f0']['vfinfo_list'][0]
+    vfinfo['link_state'] = 'enable'
+    vfinfo['stats'] = {'rx': {'bytes': 1000, 'packets': 10, 'multicast': 2, 'broadcast': 1},
+                       'tx': {'bytes': 2000, 'packets': 20}}
+    return fake_sysfs
+
+def test_render():
+    families = metrics._Families()
+    families.add('vfnet_vf_receive_bytes', 'counter', 'Bytes received by the VF', {'pf': "enp1s0f0", 'vf': 0}, 1000, 'bytes')
+    families.add('vfnet_pf', 'info', 'The SR-IOV capable physical functions', {'pf': "enp1s0f0"}, 1)
+    families.add('vfnet_vf_receive_bytes', 'counter', 'Bytes received by the VF', {'pf': "enp1s0f0", 'vf': 1}, 0, 'bytes')
+    families.add('vfnet_vf_link_state', 'stateset', 'The administrative link state of the VF',
+                 {'pf': "enp1s0f0", 'vf': 0, 'vfnet_vf_link_state': 'auto'}, 1)
+
+    assert families.render() == (
+        '# TYPE vfnet_vf_receive_bytes counter\n'
+        '# UNIT vfnet_vf_receive_bytes bytes\n'
+        '# HELP vfnet_vf_receive_bytes Bytes received by the VF\n'
+        'vfnet_vf_receive_bytes_total{pf="enp1s0f0",vf="0"} 1000\n'
+        'vfnet_vf_receive_bytes_total{pf="enp1s0f0",vf="1"} 0\n'
+        '# TYPE vfnet_pf info\n'
+        '# HELP vfnet_pf The SR-IOV capable physical functions\n'
+        'vfnet_pf_info{pf="enp1s0f0"} 1\n'
+        '# TYPE vfnet_vf_link_state stateset\n'
+        '# HELP vfnet_vf_link_state The administrative link state of the VF\n'
+        'vfnet_vf_link_state{pf="enp1s0f0",vf="0",vfnet_vf_link_state="auto"} 1\n'
+        '# EOF\n'
+    )
+
+def test_render_escapes_labels():
+    families = metrics._Families()
+    families.add('vfnet_pf', 'info', 'The PFs', {'device': 'X550 "10G"\\\n'}, 1)
+
+    assert 'vfnet_pf_info{device="X550 \\"10G\\"\\\\\\n"} 1' in families.render()
+
+def test_render_empty():
+    assert metrics._Families().render() == "# EOF\n"
+
+def test_build_metrics(scrape):
+    lines = metrics.build_metrics().splitlines()
+
+    assert lines[-1] == "# EOF"
+    assert 'vfnet_pf_sriov_numvfs{pf="enp1s0f0"} 3' in lines
+    assert 'vfnet_pf_configured_vfs{pf="enp1s0f0"} 3' in lines
+    assert 'vfnet_pf_configured_vfs{pf="enp1s0f1"} 3' not in lines
+    # the VF on vfio-pci is bound too
+    assert 'vfnet_pf_active_vfs{pf="enp1s0f1"} 3' in lines
+    assert ('vfnet_vf_info{pf="enp1s0f0",vf="2",pci_address="0000:02:00.2",interface="",'
+            'mac="02:00:00:00:00:02",driver="vfio-pci"} 1') in lines
+    assert [line for line in lines if line.startswith('vfnet_vf_link_state{')] == [
+        'vfnet_vf_link_state{pf="enp1s0f0",vf="0",vfnet_vf_link_state="auto"} 0',
+        'vfnet_vf_link_state{pf="enp1s0f0",vf="0",vfnet_vf_link_state="enable"} 1',
+        'vfnet_vf_link_state{pf="enp1s0f0",vf="0",vfnet_vf_link_state="disable"} 0',
+    ]
+    assert 'vfnet_vf_transmit_bytes_total{pf="enp1s0f0",vf="0"} 2000' in lines
+    # counters the VF does not report are left out
+    assert not any(line.startswith('vfnet_vf_receive_dropped_packets_total') for line in lines)
+
+def test_build_metrics_with_a_malformed_config(scrape, monkeypatch, capsys):
+    def read_vf_config():
+        raise ValueError("Invalid line 2 in the vfnet config file: enp1s0f0 many")
+    monkeypatch.setattr(vfup, "read_vf_config", read_vf_config)
+
+    text = metrics.build_metrics()
+
+    assert "vfnet_pf_configured_vfs" not in text
+    assert 'vfnet_pf_sriov_numvfs{pf="enp1s0f0"} 3' in text
+    assert "Invalid line 2" in capsys.readouterr().err
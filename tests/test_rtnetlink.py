@@ -0,0 +1,113 @@
+import os
+import json
+import errno
+import socket
+import struct
+
+import pytest
+
+import rtnetlink as rtnetlink
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def _read_fixture(name, mode='rb'):
+    with open(os.path.join(FIXTURES_DIR, name), mode) as f:
+        return f.read()
+
+def _message(msg_type, body, flags=0):
+    header = rtnetlink._NLMSGHDR.pack(rtnetlink._NLMSGHDR.size + len(body), msg_type, flags, 1, 0)
+    return header + body + b'\0' * (rtnetlink._align(len(body)) - len(body))
+
+def _vf_info(vf, mac, vlan=0, qos=0, spoofchk=1, link_state=0, trust=0, stats=None):
+    attrs = rtnetlink._pack_attr(rtnetlink.IFLA_VF_MAC, struct.pack('=I32s', vf, bytes.fromhex(mac.replace(':', ''))))
+    attrs += rtnetlink._pack_attr(rtnetlink.IFLA_VF_VLAN, struct.pack('=III', vf, vlan, qos))
+    attrs += rtnetlink._pack_attr(rtnetlink.IFLA_VF_SPOOFCHK, struct.pack('=II', vf, spoofchk))
+    attrs += rtnetlink._pack_attr(rtnetlink.IFLA_VF_LINK_STATE, struct.pack('=II', vf, link_state))
+    attrs += rtnetlink._pack_attr(rtnetlink.IFLA_VF_TRUST, struct.pack('=II', vf, trust))
+    if stats is not None:
+        counters = b''.join(rtnetlink._pack_attr(counter, struct.pack('=Q', value)) for counter, value in stats.items())
+        attrs += rtnetlink._pack_attr(rtnetlink.IFLA_VF_STATS, counters)
+    return rtnetlink._pack_attr(rtnetlink.IFLA_VF_INFO, attrs)
+
+def _pf_message(vf_infos, flags=rtnetlink.NLM_F_MULTI):
+    body = rtnetlink._IFINFOMSG.pack(socket.AF_UNSPEC, 1, 4, 0x1 | 0x40, 0)
+    body += rtnetlink._pack_attr(rtnetlink.IFLA_IFNAME, b'enp1s0f0\0')
+    body += rtnetlink._pack_attr(rtnetlink.IFLA_MTU, struct.pack('=I', 1500))
+    body += rtnetlink._pack_attr(rtnetlink.IFLA_ADDRESS, bytes.fromhex('d02323234500'))
+    body += rtnetlink._pack_attr(rtnetlink.IFLA_NUM_VF, struct.pack('=I', len(vf_infos)))
+    body += rtnetlink._pack_attr(rtnetlink.IFLA_VFINFO_LIST, b''.join(vf_infos))
+    return _message(rtnetlink.RTM_NEWLINK, body, flags)
+
+def test_decode_recorded_link_matches_ip_json():
+    # RTM_GETLINK reply for lo, recorded from the kernel, next to `ip -j link show lo`
+    links, done = rtnetlink.decode_link_messages(_read_fixture("rtm_newlink_lo.bin"))
+
+    assert done
+    assert links == json.loads(_read_fixture("ip_link_lo.json", 'r'))
+
+def test_decode_pf_with_vfs_fixture():
+    # reply of an ixgbe PF with 2 VFs, in the kernel layout (see fixtures/build_pf_link.py)
+    links, done = rtnetlink.decode_link_messages(_read_fixture("rtm_newlink_pf.bin"))
+
+    assert done
+    assert len(links) == 1
+    pf = links[0]
+    assert pf['ifname'] == "enp1s0f0" and pf['address'] == "d0:23:23:23:45:00"
+    assert pf['flags'] == ['BROADCAST', 'MULTICAST', 'UP', 'LOWER_UP'] and pf['operstate'] == 'UP'
+    vf0, vf1 = pf['vfinfo_list']
+    assert vf0['vf'] == 0 and vf0['address'] == "02:00:00:00:00:01"
+    assert vf0['vlan_list'] == [{'vlan': 100}]
+    assert vf0['spoofchk'] is True and vf0['trust'] is False and vf0['link_state'] == 'auto'
+    assert vf0['stats'] == {
+        'rx': {'bytes': 1536000, 'packets': 1200, 'multicast': 40, 'broadcast': 3, 'dropped': 2},
+        'tx': {'bytes': 96000, 'packets': 800, 'dropped': 0},
+    }
+    assert vf1['vf'] == 1 and vf1['address'] == "02:00:00:00:00:02"
+    # VLAN 0 is reported as an empty entry, like `ip -j`
+    assert vf1['vlan_list'] == [{}]
+    assert vf1['spoofchk'] is False and vf1['trust'] is True and vf1['link_state'] == 'enable'
+    assert vf1['tx_rate'] == 1000 and vf1['rate'] == {'max_tx': 1000, 'min_tx': 0}
+    assert vf1['stats']['rx']['packets'] == 0 and vf1['stats']['tx']['dropped'] == 0
+
+def test_decode_vfinfo_list():
+    data = _pf_message([
+        _vf_info(0, "02:00:00:00:00:01", vlan=100, qos=2, trust=1),
+        _vf_info(1, "02:00:00:00:00:02", spoofchk=0, link_state=2),
+    ]) + _message(rtnetlink.NLMSG_DONE, struct.pack('=i', 0))
+
+    links, done = rtnetlink.decode_link_messages(data)
+
+    assert done
+    assert links[0]['ifname'] == "enp1s0f0"
+    assert links[0]['address'] == "d0:23:23:23:45:00"
+    vf0, vf1 = links[0]['vfinfo_list']
+    assert vf0 == {'vf': 0, 'link_type': 'ether', 'address': "02:00:00:00:00:01", 'vlan': 100, 'qos': 2,
+                   'spoofchk': True, 'link_state': 'auto', 'trust': True}
+    assert vf1['spoofchk'] is False and vf1['link_state'] == 'disable' and vf1['trust'] is False
+
+def test_decode_multipart_reply_is_not_done_without_nlmsg_done():
+    links, done = rtnetlink.decode_link_messages(_pf_message([_vf_info(0, "02:00:00:00:00:01")]))
+
+    assert len(links) == 1 and not done
+
+def test_decode_vf_stats():
+    data = _pf_message([_vf_info(0, "02:00:00:00:00:01", stats={
+        rtnetlink.IFLA_VF_STATS_RX_PACKETS: 10, rtnetlink.IFLA_VF_STATS_TX_PACKETS: 20,
+        rtnetlink.IFLA_VF_STATS_RX_BYTES: 1000, rtnetlink.IFLA_VF_STATS_TX_BYTES: 2000,
+        rtnetlink.IFLA_VF_STATS_BROADCAST: 1, rtnetlink.IFLA_VF_STATS_MULTICAST: 2,
+        rtnetlink.IFLA_VF_STATS_RX_DROPPED: 3,
+    })], flags=0)
+
+    links, done = rtnetlink.decode_link_messages(data)
+
+    assert done
+    assert links[0]['vfinfo_list'][0]['stats'] == {
+        'rx': {'bytes': 1000, 'packets': 10, 'multicast': 2, 'broadcast': 1, 'dropped': 3},
+        'tx': {'bytes': 2000, 'packets': 20},
+    }
+
+def test_decode_error_reply():
+    with pytest.raises(rtnetlink.NetlinkError) as error:
+        rtnetlink.decode_link_messages(_message(rtnetlink.NLMSG_ERROR, struct.pack('=i', -errno.ENODEV) + b'\0' * 16))
+
+    assert error.value.errno == errno.ENODEV
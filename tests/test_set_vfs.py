@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+import detection as detection
+import set_vfs as set_vfs
+
+@pytest.fixture
+def drivers_dir(fake_sysfs, monkeypatch):
+    drivers_dir = os.path.join(os.path.dirname(fake_sysfs['devices_dir']), "drivers")
+    monkeypatch.setattr(set_vfs, "PCI_DRIVERS_DIR", drivers_dir)
+    monkeypatch.setattr(detection, "invalidate_cache", lambda: None)
+    detection.detect_network_devices(use_cache=False)
+    return drivers_dir
+
+def _add_bind_files(drivers_dir, driver):
+    for name in ["unbind", "bind"]:
+        open(os.path.join(drivers_dir, driver, name), "w").close()
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+def test_rebinds_netdev_vfs_and_skips_passed_through_vfs(drivers_dir, monkeypatch, capsys):
+    _add_bind_files(drivers_dir, "ixgbevf")
+    _add_bind_files(drivers_dir, "vfio-pci")
+    reloaded = []
+    monkeypatch.setattr(set_vfs, "_reload_module", reloaded.append)
+
+    set_vfs.reset_vf_drivers(detection.get_pf("enp1s0f1"), [0, 2])
+
+    # VF 2 is the one bound to vfio-pci
+    assert _read(os.path.join(drivers_dir, "ixgbevf", "bind")) == "0000:02:00.3"
+    assert _read(os.path.join(drivers_dir, "vfio-pci", "bind")) == ""
+    assert reloaded == []
+    output = capsys.readouterr().out
+    assert "VF 2 (0000:02:00.5) is in use by vfio-pci" in output
+    assert "Rebinding 1 VFs" in output
+
+def test_reloads_the_module_of_each_vf(drivers_dir, monkeypatch):
+    reloaded = []
+    monkeypatch.setattr(set_vfs, "_reload_module", reloaded.append)
+
+    set_vfs.reset_vf_drivers(detection.get_pf("enp1s0f0"), [0, 1, 2])
+
+    # only the module of the netdev VFs, not the one of VF 0 for every VF
+    assert reloaded == ["ixgbevf"]
+
+def test_only_passed_through_vfs(drivers_dir, monkeypatch, capsys):
+    reloaded = []
+    monkeypatch.setattr(set_vfs, "_reload_module", reloaded.append)
+
+    set_vfs.reset_vf_drivers(detection.get_pf("enp1s0f0"), [2])
+
+    assert reloaded == []
+    assert "Rebinding" not in capsys.readouterr().out
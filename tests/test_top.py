@@ -0,0 +1,72 @@
+import json
+
+import detection as detection
+import top as top
+
+def _stats(rx_bytes, tx_bytes, rx_packets=0, tx_packets=0, rx_dropped=None):
+    stats = {'rx': {'bytes': rx_bytes, 'packets': rx_packets, 'multicast': 0, 'broadcast': 0},
+             'tx': {'bytes': tx_bytes, 'packets': tx_packets}}
+    if rx_dropped is not None:
+        stats['rx']['dropped'] = rx_dropped
+    return stats
+
+def test_compute_rates():
+    previous = {('enp1s0f0', 0): _stats(1000, 500, 10, 5, rx_dropped=1)}
+    current = {('enp1s0f0', 0): _stats(3000, 1500, 30, 5, rx_dropped=3)}
+
+    rates = top.compute_rates(previous, current, 2.0)
+
+    assert rates == {('enp1s0f0', 0): {'rx_bytes': 1000.0, 'tx_bytes': 500.0, 'rx_packets': 10.0, 'tx_packets': 0.0,
+                                       'rx_dropped': 1.0, 'tx_dropped': None}}
+
+def test_compute_rates_counter_reset():
+    # the VF was recreated, its counters restarted from 0
+    rates = top.compute_rates({('enp1s0f0', 0): _stats(5000, 5000)}, {('enp1s0f0', 0): _stats(400, 6000)}, 1.0)
+
+    assert rates[('enp1s0f0', 0)]['rx_bytes'] == 400.0
+    assert rates[('enp1s0f0', 0)]['tx_bytes'] == 1000.0
+
+def test_compute_rates_new_and_removed_vfs():
+    previous = {('enp1s0f0', 0): _stats(100, 100), ('enp1s0f0', 1): _stats(100, 100)}
+    current = {('enp1s0f0', 0): _stats(200, 100), ('enp1s0f0', 2): _stats(900, 900)}
+
+    rates = top.compute_rates(previous, current, 1.0)
+
+    # a new VF has no previous sample, it starts at 0
+    assert set(rates) == {('enp1s0f0', 0), ('enp1s0f0', 2)}
+    assert rates[('enp1s0f0', 2)]['rx_bytes'] == 0.0
+
+def test_sum_rates():
+    rates = {
+        ('enp1s0f0', 0): {'rx_bytes': 10.0, 'tx_bytes': 1.0, 'rx_packets': 1.0, 'tx_packets': 1.0, 'rx_dropped': None, 'tx_dropped': None},
+        ('enp1s0f0', 1): {'rx_bytes': 5.0, 'tx_bytes': 2.0, 'rx_packets': 1.0, 'tx_packets': 1.0, 'rx_dropped': 2.0, 'tx_dropped': None},
+        ('enp1s0f1', 0): {'rx_bytes': 7.0, 'tx_bytes': 0.0, 'rx_packets': 0.0, 'tx_packets': 0.0, 'rx_dropped': None, 'tx_dropped': None},
+    }
+
+    pf_rates = top.sum_rates(rates)
+
+    assert pf_rates['enp1s0f0'] == {'rx_bytes': 15.0, 'tx_bytes': 3.0, 'rx_packets': 2.0, 'tx_packets': 2.0,
+                                    'rx_dropped': 2.0, 'tx_dropped': None, 'vfs': 2}
+    assert pf_rates['enp1s0f1']['vfs'] == 1
+
+def test_format_rate():
+    assert [top._format_rate(value) for value in [None, 0.0, 999.0, 1500.0, 2500000.0, 3e12]] == ["-", "0", "999", "1.5K", "2.5M", "3.0T"]
+
+def test_sample(fake_sysfs):
+    fake_sysfs['links']['enp1s0f0']['vfinfo_list'][1]['stats'] = _stats(100, 200)
+
+    counters = top.sample(["enp1s0f0", "enp1s0f1"])
+
+    # the VFs whose driver does not report counters are left out
+    assert counters == {('enp1s0f0', 1): _stats(100, 200)}
+
+def test_print_json(fake_sysfs, capsys):
+    detection.detect_network_devices(use_cache=False)
+    rates = top.compute_rates({('enp1s0f0', 1): _stats(100, 200)}, {('enp1s0f0', 1): _stats(433, 200)}, 3.0)
+
+    top._print_json(rates, top._vf_interfaces())
+
+    pf, vf = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert pf['type'] == 'pf' and pf['pf'] == "enp1s0f0" and pf['vfs'] == 1 and pf['rx_bytes'] == 111.0
+    assert vf['type'] == 'vf' and vf['vf'] == 1 and vf['interface'] == "enp1s0f0v1"
+    assert vf['rx_bytes'] == 111.0 and vf['tx_bytes'] == 0.0 and vf['rx_dropped'] is None
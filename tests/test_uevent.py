@@ -0,0 +1,110 @@
+import errno
+import socket
+import time
+
+import pytest
+
+import uevent as uevent
+import set_vfs as set_vfs
+
+ADD_VF = (b"add@/devices/pci0000:00/0000:00:01.0/0000:02:10.0\0"
+          b"ACTION=add\0DEVPATH=/devices/pci0000:00/0000:00:01.0/0000:02:10.0\0"
+          b"SUBSYSTEM=pci\0PCI_SLOT_NAME=0000:02:10.0\0SEQNUM=4242\0")
+
+class _FailingSocket:
+    """A readable socket whose recv fails with an error"""
+
+    def __init__(self, sock, error):
+        self._sock = sock
+        self._error = error
+
+    def fileno(self):
+        return self._sock.fileno()
+
+    def recv(self, size):
+        raise OSError(self._error, "recv failed")
+
+@pytest.fixture
+def socket_pair():
+    sender, receiver = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    yield sender, receiver
+    sender.close()
+    receiver.close()
+
+def _source(sock):
+    # a UeventSource reading from sock instead of the netlink socket
+    source = uevent.UeventSource.__new__(uevent.UeventSource)
+    source._sock = sock
+    return source
+
+def test_parse_uevent():
+    event = uevent.parse_uevent(ADD_VF)
+
+    assert event == {
+        'ACTION': "add",
+        'DEVPATH': "/devices/pci0000:00/0000:00:01.0/0000:02:10.0",
+        'SUBSYSTEM': "pci",
+        'PCI_SLOT_NAME': "0000:02:10.0",
+        'SEQNUM': "4242",
+    }
+
+def test_parse_uevent_keeps_equal_signs_in_values():
+    event = uevent.parse_uevent(b"change@/devices/x\0ACTION=change\0MODALIAS=pci:v=1\0")
+
+    assert event['MODALIAS'] == "pci:v=1"
+
+def test_parse_uevent_skips_malformed_parts():
+    event = uevent.parse_uevent(b"remove@/devices/x\0ACTION=remove\0garbage\0\0INTERFACE=eth1")
+
+    assert event == {'ACTION': "remove", 'INTERFACE': "eth1"}
+
+def test_parse_uevent_header_only():
+    assert uevent.parse_uevent(b"add@/devices/x") == {}
+
+def test_wait_returns_event(socket_pair):
+    sender, receiver = socket_pair
+    sender.send(ADD_VF)
+
+    assert _source(receiver).wait(1.0)['PCI_SLOT_NAME'] == "0000:02:10.0"
+
+def test_wait_timeout(socket_pair):
+    _, receiver = socket_pair
+
+    started = time.monotonic()
+    assert _source(receiver).wait(0.05) is None
+    assert time.monotonic() - started >= 0.04
+
+def test_wait_reports_lost_events_as_resync(socket_pair):
+    sender, receiver = socket_pair
+    sender.send(ADD_VF)
+
+    event = _source(_FailingSocket(receiver, errno.ENOBUFS)).wait(1.0)
+
+    assert uevent.is_resync(event)
+    assert set_vfs._is_vf_event(event)
+
+def test_wait_raises_other_errors(socket_pair):
+    sender, receiver = socket_pair
+    sender.send(ADD_VF)
+
+    with pytest.raises(OSError):
+        _source(_FailingSocket(receiver, errno.EBADF)).wait(1.0)
+
+class _FakeFeed:
+    """An event source replaying a list of events, then timing out"""
+
+    def __init__(self, events):
+        self.events = list(events)
+        self.waits = 0
+
+    def wait(self, timeout):
+        self.waits += 1
+        return self.events.pop(0) if self.events else None
+
+def test_event_sleep_returns_on_vf_event():
+    feed = _FakeFeed([{'ACTION': "add", 'SUBSYSTEM': "block"}, uevent.parse_uevent(ADD_VF), {'ACTION': "add", 'SUBSYSTEM': "pci"}])
+
+    set_vfs._event_sleep(feed)(10.0)
+
+    # the unrelated event is skipped, the event after the VF is left
+    assert feed.waits == 2 and len(feed.events) == 1
@@ -0,0 +1,67 @@
+import wait as wait
+
+class _FakeClock:
+    """A clock that only moves when sleep is called, recording the sleeps"""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def test_returns_immediately_when_condition_is_true():
+    fake = _FakeClock()
+
+    assert wait.wait_until(lambda: True, 10, clock=fake.clock, sleep=fake.sleep)
+    assert fake.sleeps == []
+
+def test_success_after_backoff():
+    fake = _FakeClock()
+    ready_at = fake.now + 0.02
+
+    assert wait.wait_until(lambda: fake.now >= ready_at, 10, clock=fake.clock, sleep=fake.sleep)
+    assert fake.sleeps == [0.001, 0.002, 0.004, 0.008, 0.016]
+
+def test_interval_is_capped():
+    fake = _FakeClock()
+    checks = []
+
+    def condition():
+        checks.append(fake.now)
+        return len(checks) > 6
+
+    assert wait.wait_until(condition, 60, initial_interval=0.5, max_interval=2.0, clock=fake.clock, sleep=fake.sleep)
+    assert fake.sleeps == [0.5, 1.0, 2.0, 2.0, 2.0, 2.0]
+
+def test_timeout():
+    fake = _FakeClock()
+    started = fake.now
+
+    assert not wait.wait_until(lambda: False, 5, max_interval=2.0, clock=fake.clock, sleep=fake.sleep)
+    # the last sleep is cut short so the deadline is not overshot
+    assert fake.now == started + 5
+    assert max(fake.sleeps) == 2.0
+    assert fake.sleeps[-1] < 2.0
+
+def test_condition_checked_after_the_last_sleep():
+    fake = _FakeClock()
+    deadline = fake.now + 1
+
+    assert wait.wait_until(lambda: fake.now >= deadline, 1, clock=fake.clock, sleep=fake.sleep)
+
+def test_sleep_returning_early():
+    # the sleep returns without the clock moving, as when an event arrives
+    fake = _FakeClock()
+    checks = []
+
+    def condition():
+        checks.append(fake.now)
+        return len(checks) == 3
+
+    assert wait.wait_until(condition, 1, clock=fake.clock, sleep=lambda seconds: None)
+    assert checks == [100.0, 100.0, 100.0]